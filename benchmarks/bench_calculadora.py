@@ -0,0 +1,165 @@
+"""Benchmarks de la calculadora: cálculo, importación, exportación y formato de la tabla
+
+Uso:
+    python benchmarks/bench_calculadora.py [--tamanos 1000 100000 1000000] [--repeticiones 3]
+
+Genera catálogos sintéticos con todos los campos de CATEGORIAS_COSTOS y ambos métodos,
+mide filas/s y memoria máxima (tracemalloc) por etapa, y agrega una línea JSON por
+ejecución al historial para comparar corridas en el tiempo.
+"""
+import argparse
+import io
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from calculadora.catalogo import CatalogoProductos  # noqa: E402
+from calculadora.exportacion import (  # noqa: E402
+    crear_csv_bytes, crear_csv_productos, crear_parquet_productos, crear_xlsx_productos
+)
+from calculadora.formato import crear_tabla_productos  # noqa: E402
+from calculadora.importacion import importar_csv, importar_parquet  # noqa: E402
+from calculadora.precios import (  # noqa: E402
+    CAMPOS_COSTOS, calcular_precios, calcular_precios_enteros_lote, calcular_precios_lote
+)
+
+TAMANOS = [1_000, 100_000, 1_000_000]
+METODOS = ['margen', 'markup']
+HISTORIAL = RAIZ / 'benchmarks' / 'resultados' / 'historial.jsonl'
+
+# El cálculo escalar fila por fila solo se mide hasta este tamaño
+MAX_FILAS_ESCALAR = 100_000
+
+
+def catalogo_sintetico(filas, semilla=0):
+    """DataFrame con las columnas de importación: nombre, costo_base, margen y todos los campos de costo"""
+    rng = np.random.default_rng(semilla)
+    datos = {
+        'nombre': [f"Producto {i}" for i in range(filas)],
+        'costo_base': rng.integers(1_000, 2_000_000, filas).astype(np.float64),
+        'margen': rng.uniform(5, 80, filas).round(1),
+    }
+    for campo in CAMPOS_COSTOS:
+        # Alrededor de un tercio de las filas trae cada campo de costo
+        datos[campo] = np.where(rng.random(filas) < 0.3, rng.integers(0, 50_000, filas), 0).astype(np.float64)
+    return pd.DataFrame(datos)
+
+
+def medir(funcion, filas, repeticiones):
+    """Mejor tiempo de varias repeticiones y memoria máxima de la primera"""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    funcion()
+    tiempos = [time.perf_counter() - inicio]
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    for _ in range(repeticiones - 1):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    segundos = min(tiempos)
+    return {
+        'filas': filas,
+        'segundos': segundos,
+        'filas_por_segundo': filas / segundos if segundos > 0 else None,
+        'memoria_pico_mb': pico / 1024 ** 2,
+    }
+
+
+def etapas(df, metodo):
+    """Etapas a medir para un catálogo sintético y un método"""
+    costos = df[CAMPOS_COSTOS].to_numpy()
+    csv = df.to_csv(index=False).encode()
+    parquet = io.BytesIO()
+    df.to_parquet(parquet, index=False)
+    parquet = parquet.getvalue()
+
+    catalogo = CatalogoProductos()
+    importar_csv(io.BytesIO(csv), catalogo.agregar_lote, 30.0, 19.0, metodo)
+
+    ivas = itertools.cycle([21.0, 19.0])
+
+    def precios_escalar():
+        for base, fila, margen in zip(df['costo_base'].to_numpy(), costos, df['margen'].to_numpy()):
+            calcular_precios(base, sum(fila), margen, 19.0, metodo)
+
+    def importar(funcion, datos):
+        def etapa():
+            funcion(io.BytesIO(datos), CatalogoProductos().agregar_lote, 30.0, 19.0, metodo)
+        return etapa
+
+    resultado = {
+        'precios_lote': lambda: calcular_precios_lote(df['costo_base'], costos, df['margen'], 19.0, metodo),
+        'precios_enteros': lambda: calcular_precios_enteros_lote(df['costo_base'], costos, df['margen'], 19.0, metodo),
+        'importacion_csv': importar(importar_csv, csv),
+        'importacion_parquet': importar(importar_parquet, parquet),
+        'exportacion_csv': lambda: crear_csv_productos(catalogo).to_csv(index=False),
+        'exportacion_csv_bloques': lambda: crear_csv_bytes(catalogo),
+        'exportacion_parquet': lambda: crear_parquet_productos(catalogo),
+        'exportacion_xlsx': lambda: crear_xlsx_productos(catalogo),
+        'formato_tabla': lambda: crear_tabla_productos(catalogo),
+        # Alterna el IVA para que cada repetición recalcule todas las filas
+        'revalorar_iva': lambda: catalogo.revalorar(iva=next(ivas)),
+    }
+    if len(df) <= MAX_FILAS_ESCALAR:
+        resultado['precios_escalar'] = precios_escalar
+    return resultado
+
+
+def version_git():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks de la calculadora de precios')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=TAMANOS, help='Filas de cada catálogo sintético')
+    parser.add_argument('--repeticiones', type=int, default=3, help='Repeticiones por etapa (se usa la mejor)')
+    parser.add_argument('--salida', type=Path, default=HISTORIAL, help='Historial JSON lines donde agregar la corrida')
+    args = parser.parse_args(argv)
+
+    corrida = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': version_git(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'plataforma': platform.platform(),
+        'resultados': [],
+    }
+    for filas in args.tamanos:
+        df = catalogo_sintetico(filas)
+        for metodo in METODOS:
+            for etapa, funcion in etapas(df, metodo).items():
+                medicion = medir(funcion, filas, args.repeticiones)
+                medicion.update({'etapa': etapa, 'metodo': metodo})
+                corrida['resultados'].append(medicion)
+                print(
+                    f"{etapa:<24} {metodo:<7} {filas:>10,} filas  {medicion['filas_por_segundo'] or 0:>14,.0f} filas/s"
+                    f"  {medicion['memoria_pico_mb']:>9.1f} MB"
+                )
+
+    args.salida.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.salida, 'a', encoding='utf-8') as historial:
+        historial.write(json.dumps(corrida, ensure_ascii=False) + '\n')
+    print(f"Resultados agregados a {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+"""Núcleo de la Calculadora de Precios, independiente de la interfaz Streamlit"""
@@ -0,0 +1,106 @@
+"""Valoriza un CSV de productos desde la línea de comandos, sin Streamlit
+
+Uso:
+    python -m calculadora entrada.csv salida.csv [--iva 19] [--metodo margen] [--margen-defecto 30]
+                                                 [--trabajadores 4] [--enteros]
+
+El CSV de entrada usa las mismas columnas que la importación de la app
+(nombre, costo_base, margen opcional y campos de costo) y el de salida las
+mismas que su exportación. Use "-" para leer de stdin o escribir en stdout.
+"""
+import argparse
+import mmap
+import os
+import sys
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m calculadora',
+        description='Calcula precios de un CSV de productos y escribe el CSV exportado.'
+    )
+    parser.add_argument('entrada', help='CSV de entrada ("-" para stdin)')
+    parser.add_argument('salida', help='CSV de salida ("-" para stdout)')
+    parser.add_argument('--iva', type=float, default=19.0, help='IVA en %% (por defecto 19)')
+    parser.add_argument('--metodo', choices=['margen', 'markup'], default='margen', help='Metodología de cálculo')
+    parser.add_argument('--margen-defecto', type=float, default=30.0,
+                        help='Margen o markup %% para filas sin margen (por defecto 30)')
+    parser.add_argument('--bloque', type=int, default=None,
+                        help='Filas por bloque (por defecto el valor de la app)')
+    parser.add_argument('--trabajadores', type=int, default=1,
+                        help='Procesos para valorar en paralelo; 0 usa todos los núcleos (por defecto 1)')
+    parser.add_argument('--enteros', action='store_true',
+                        help='Calcula en pesos enteros con redondeo de factura (IVA sobre el neto redondeado)')
+    return parser
+
+
+def exportar(args, entrada, salida):
+    """Valora el CSV en un solo proceso, bloque por bloque"""
+    from .catalogo import CatalogoProductos
+    from .exportacion import crear_csv_productos
+    from .importacion import TAMANO_BLOQUE_IMPORTACION, leer_csv_importacion, valorar_columnas
+
+    productos_calculados = 0
+    # Cada bloque se valora y escribe antes de leer el siguiente
+    for _, columnas in leer_csv_importacion(entrada, args.bloque or TAMANO_BLOQUE_IMPORTACION):
+        catalogo = CatalogoProductos()
+        catalogo.agregar_lote(
+            columnas['nombre'],
+            valorar_columnas(columnas, args.margen_defecto, args.iva, args.metodo, args.enteros)
+        )
+        if catalogo:
+            crear_csv_productos(catalogo).to_csv(salida, header=productos_calculados == 0, index=False)
+            productos_calculados += len(catalogo)
+    return productos_calculados
+
+
+def exportar_en_paralelo(args, entrada, salida):
+    """Valora el CSV repartiendo fragmentos entre args.trabajadores procesos"""
+    from .paralelo import exportar_csv_paralelo
+
+    trabajadores = args.trabajadores or None
+    if entrada is sys.stdin:
+        return exportar_csv_paralelo(sys.stdin.buffer.read(), salida, args.margen_defecto, args.iva,
+                                     args.metodo, trabajadores, enteros=args.enteros)
+    with open(entrada, 'rb') as archivo:
+        if not archivo.seek(0, 2):
+            return 0
+        with mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+            return exportar_csv_paralelo(datos, salida, args.margen_defecto, args.iva, args.metodo, trabajadores,
+                                         enteros=args.enteros)
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+
+    entrada = sys.stdin if args.entrada == '-' else args.entrada
+    salida = sys.stdout if args.salida == '-' else open(args.salida, 'w', newline='', encoding='utf-8')
+
+    # Los módulos con pandas se importan recién aquí: --help no los carga
+    try:
+        if args.trabajadores == 1:
+            productos_calculados = exportar(args, entrada, salida)
+        else:
+            productos_calculados = exportar_en_paralelo(args, entrada, salida)
+        if salida is sys.stdout:
+            salida.flush()
+    except BrokenPipeError:
+        if salida is not sys.stdout:
+            raise
+        # Quien lee stdout (por ejemplo head) cerró la tubería: se termina sin traza. Lo que
+        # queda en el buffer se descarta, para que el cierre del intérprete no vuelva a fallar
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+
+    if productos_calculados == 0:
+        print('No se pudieron calcular productos. Verifica el formato del CSV.', file=sys.stderr)
+        return 1
+    print(f'{productos_calculados} productos calculados', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
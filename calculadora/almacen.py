@@ -0,0 +1,340 @@
+"""Catálogo persistente en SQLite, con la misma interfaz que CatalogoProductos
+
+Las filas viven en disco: la tabla se lee por páginas, el resumen se calcula con
+agregados SQL y solo se cargan en memoria las columnas que se piden.
+"""
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from .catalogo import (
+    COLUMNAS_ENTRADA, COLUMNAS_NUMERICAS, COLUMNAS_PRODUCTO, COLUMNAS_TOTALES,
+    DEPENDIENTES_IVA, DEPENDIENTES_METODO, METODOS, estructura_costos, resumen_catalogo
+)
+from .precios import (
+    CAMPOS_COSTOS, calcular_iva_enteros, calcular_iva_lote, calcular_neto_enteros, calcular_neto_lote,
+    calcular_precios_enteros_lote, calcular_precios_lote, subtotales_categorias
+)
+
+# Filas leídas por consulta al recalcular el catálogo
+TAMANO_BLOQUE_SQLITE = 100_000
+
+_COLUMNAS_REALES = COLUMNAS_NUMERICAS + COLUMNAS_ENTRADA
+
+_ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS productos (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    metodo_calculo TEXT NOT NULL,
+    {', '.join(f'{col} REAL' for col in _COLUMNAS_REALES)},
+    {', '.join(f'{campo_key} REAL NOT NULL DEFAULT 0' for campo_key in CAMPOS_COSTOS)}
+);
+CREATE INDEX IF NOT EXISTS idx_productos_nombre ON productos (nombre);
+CREATE INDEX IF NOT EXISTS idx_productos_metodo ON productos (metodo_calculo);
+CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta VALUES ('version', 0);
+"""
+
+
+class CatalogoSQLite:
+    """Catálogo guardado en un archivo SQLite; los ids son las posiciones 1..n"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        # Streamlit puede ejecutar cada rerun de la sesión en otro hilo
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute('PRAGMA journal_mode = WAL')
+        self._conexion.execute('PRAGMA synchronous = NORMAL')
+        with self._conexion:
+            self._conexion.executescript(_ESQUEMA)
+            # Archivos creados antes de guardar el desglose por campo, el redondeo y el costo base ingresado
+            existentes = {fila[1] for fila in self._conexion.execute('PRAGMA table_info(productos)')}
+            for col in CAMPOS_COSTOS + ['enteros']:
+                if col not in existentes:
+                    self._conexion.execute(f'ALTER TABLE productos ADD COLUMN {col} REAL NOT NULL DEFAULT 0')
+            if 'costo_base_original' not in existentes:
+                self._conexion.execute('ALTER TABLE productos ADD COLUMN costo_base_original REAL')
+                self._conexion.execute('UPDATE productos SET costo_base_original = costo_base')
+        # Resultados de consultas que recorren toda la tabla, válidos para una versión
+        self._calculados = (None, {})
+
+    @property
+    def version(self):
+        """Aumenta con cada modificación, también las hechas desde otras sesiones"""
+        return self._conexion.execute("SELECT valor FROM meta WHERE clave = 'version'").fetchone()[0]
+
+    def _nueva_version(self):
+        self._conexion.execute("UPDATE meta SET valor = valor + 1 WHERE clave = 'version'")
+
+    def _por_version(self, clave, calcular):
+        """Resultado de calcular(), reutilizado mientras no cambie la versión del catálogo"""
+        version = self.version
+        if self._calculados[0] != version:
+            self._calculados = (version, {})
+        calculados = self._calculados[1]
+        if clave not in calculados:
+            calculados[clave] = calcular()
+        return calculados[clave]
+
+    def __len__(self):
+        return self._conexion.execute('SELECT COUNT(*) FROM productos').fetchone()[0]
+
+    def agregar(self, producto):
+        """Agrega un producto con las claves de COLUMNAS_PRODUCTO, COLUMNAS_ENTRADA y 'costos' (uno por campo)"""
+        self.agregar_lote(
+            [producto['nombre']],
+            {col: [producto[col]] for col in _COLUMNAS_REALES + ['metodo_calculo', 'costos']}
+        )
+
+    def agregar_lote(self, nombres, columnas):
+        """Agrega un lote completo en una sola transacción"""
+        filas = len(nombres)
+        if filas == 0:
+            return
+        metodos = np.where(np.asarray(columnas['metodo_calculo']) == 'margen', 'margen', 'markup')
+        valores = [np.broadcast_to(np.asarray(columnas[col], dtype=np.float64), filas).tolist() for col in _COLUMNAS_REALES]
+        costos = np.asarray(columnas['costos'], dtype=np.float64).reshape(filas, len(CAMPOS_COSTOS))
+        valores += [costos[:, j].tolist() for j in range(len(CAMPOS_COSTOS))]
+        insertadas = _COLUMNAS_REALES + CAMPOS_COSTOS
+        marcadores = ', '.join('?' * (len(insertadas) + 3))
+        with self._conexion:
+            # El candado de escritura se toma antes de leer el último id: otra sesión
+            # que agregue a la vez espera en vez de reutilizar los mismos ids
+            self._conexion.execute('BEGIN IMMEDIATE')
+            inicio = self._conexion.execute('SELECT COALESCE(MAX(id), 0) FROM productos').fetchone()[0]
+            self._conexion.executemany(
+                f"INSERT INTO productos (id, nombre, metodo_calculo, {', '.join(insertadas)}) VALUES ({marcadores})",
+                zip(range(inicio + 1, inicio + filas + 1), map(str, nombres), metodos.tolist(), *valores)
+            )
+            self._nueva_version()
+
+    def limpiar(self):
+        """Elimina todos los productos"""
+        with self._conexion:
+            self._conexion.execute('DELETE FROM productos')
+            self._nueva_version()
+
+    def desactualizados(self, iva, metodo_calculo, enteros=False):
+        """Cantidad de productos calculados con otro IVA, otra metodología u otro redondeo"""
+        parametros = (float(iva), metodo_calculo, float(bool(enteros)))
+        return self._por_version(('desactualizados', *parametros), lambda: self._conexion.execute(
+            'SELECT COUNT(*) FROM productos WHERE iva != ? OR metodo_calculo != ? OR enteros != ?', parametros
+        ).fetchone()[0])
+
+    def revalorar(self, iva=None, metodo_calculo=None, enteros=None):
+        """Recalcula el catálogo con otro IVA, metodología y/o redondeo, por bloques de filas
+
+        Igual que CatalogoProductos.revalorar: solo las filas cuyo parámetro cambió y solo
+        las columnas que dependen de él, con el motor de cada fila; las filas de otro
+        redondeo se recalculan completas. Devuelve las columnas recalculadas.
+        """
+        condiciones, parametros = [], []
+        if iva is not None:
+            condiciones.append('iva != ?')
+            parametros.append(float(iva))
+        if metodo_calculo is not None:
+            condiciones.append('metodo_calculo != ?')
+            METODOS.index(metodo_calculo)  # ValueError si la metodología no existe
+            parametros.append(metodo_calculo)
+        if enteros is not None:
+            condiciones.append('enteros != ?')
+            parametros.append(float(bool(enteros)))
+        if not condiciones:
+            return []
+
+        # Los costos ingresados solo hacen falta para recalcular filas completas
+        leidas = ['id', 'metodo_calculo', 'costo_total', 'margen', 'iva', 'enteros', 'precio_sin_iva']
+        if enteros is not None:
+            leidas += ['costo_base_original'] + CAMPOS_COSTOS
+        consulta = (
+            f"SELECT {', '.join(leidas)} FROM productos "
+            f"WHERE id > ? AND ({' OR '.join(condiciones)}) ORDER BY id LIMIT ?"
+        )
+        actualizar_completa = (
+            f"UPDATE productos SET metodo_calculo = ?, {', '.join(f'{col} = ?' for col in COLUMNAS_NUMERICAS)}, "
+            'iva = ?, enteros = ? WHERE id = ?'
+        )
+        actualizar_metodo = (
+            f"UPDATE productos SET metodo_calculo = ?, {', '.join(f'{col} = ?' for col in DEPENDIENTES_METODO + DEPENDIENTES_IVA)}, "
+            'iva = ? WHERE id = ?'
+        )
+        actualizar_iva = f"UPDATE productos SET {', '.join(f'{col} = ?' for col in DEPENDIENTES_IVA)}, iva = ? WHERE id = ?"
+
+        recalculadas = set()
+        ultimo = 0
+        with self._conexion:
+            # Como en agregar_lote: el candado de escritura se toma antes de leer el primer
+            # bloque, así otra sesión que escriba a la vez espera y no cambia filas ya leídas
+            self._conexion.execute('BEGIN IMMEDIATE')
+            while True:
+                bloque = pd.read_sql_query(consulta, self._conexion, params=(ultimo, *parametros, TAMANO_BLOQUE_SQLITE))
+                if bloque.empty:
+                    break
+                ultimo = int(bloque['id'].iloc[-1])
+
+                ids = bloque['id'].to_numpy()
+                costo_total = bloque['costo_total'].to_numpy()
+                margen = bloque['margen'].to_numpy()
+                ivas = bloque['iva'].to_numpy() if iva is None else np.full(len(bloque), float(iva))
+                metodos = bloque['metodo_calculo'].to_numpy(dtype=object)
+                sin_cambio = np.zeros(len(bloque), dtype=bool)
+                cambio_metodo = sin_cambio if metodo_calculo is None else metodos != metodo_calculo
+                if metodo_calculo is not None:
+                    metodos = np.full(len(bloque), metodo_calculo, dtype=object)
+                redondeo = bloque['enteros'].to_numpy() != 0
+                cambio_redondeo = sin_cambio if enteros is None else redondeo != bool(enteros)
+
+                if cambio_redondeo.any():
+                    filas = np.flatnonzero(cambio_redondeo)
+                    resultado = (calcular_precios_enteros_lote if enteros else calcular_precios_lote)(
+                        bloque['costo_base_original'].to_numpy()[filas],
+                        bloque[CAMPOS_COSTOS].to_numpy(dtype=np.float64)[filas],
+                        margen[filas],
+                        ivas[filas],
+                        metodos[filas].astype(str)
+                    )
+                    self._conexion.executemany(actualizar_completa, zip(
+                        metodos[filas].tolist(),
+                        *[resultado[col].tolist() for col in COLUMNAS_NUMERICAS],
+                        ivas[filas].tolist(),
+                        [float(bool(enteros))] * len(filas),
+                        ids[filas].tolist()
+                    ))
+                    recalculadas.update(COLUMNAS_NUMERICAS)
+
+                # El resto, por etapas, con el motor de cada fila
+                for en_enteros, calcular_neto, calcular_iva in (
+                    (False, calcular_neto_lote, calcular_iva_lote), (True, calcular_neto_enteros, calcular_iva_enteros)
+                ):
+                    del_motor = (redondeo == en_enteros) & ~cambio_redondeo
+                    if not del_motor.any():
+                        continue
+                    precio_sin_iva = bloque['precio_sin_iva'].to_numpy().copy()
+                    por_metodo = cambio_metodo & del_motor
+                    if por_metodo.any():
+                        neto = calcular_neto(costo_total[por_metodo], margen[por_metodo], metodo_calculo == 'margen')
+                        precio_sin_iva[por_metodo] = neto['precio_sin_iva']
+                        recalculadas.update(DEPENDIENTES_METODO)
+
+                    filas = np.flatnonzero(del_motor)
+                    final = calcular_iva(costo_total[filas], precio_sin_iva[filas], ivas[filas])
+                    recalculadas.update(DEPENDIENTES_IVA)
+                    columnas_iva = [final[col] for col in DEPENDIENTES_IVA] + [ivas[filas]]
+
+                    con_metodo = por_metodo[filas]
+                    if con_metodo.any():
+                        self._conexion.executemany(actualizar_metodo, zip(
+                            [metodo_calculo] * int(np.count_nonzero(con_metodo)),
+                            *[neto[col].tolist() for col in DEPENDIENTES_METODO],
+                            *[columna[con_metodo].tolist() for columna in columnas_iva],
+                            ids[filas][con_metodo].tolist()
+                        ))
+                    self._conexion.executemany(actualizar_iva, zip(
+                        *[columna[~con_metodo].tolist() for columna in columnas_iva], ids[filas][~con_metodo].tolist()
+                    ))
+            if recalculadas:
+                self._nueva_version()
+
+        return [col for col in COLUMNAS_NUMERICAS if col in recalculadas]
+
+    def resumen(self):
+        """Totales y promedios calculados con una consulta de agregados, reutilizada mientras no cambie la versión"""
+        def calcular():
+            fila = self._conexion.execute(
+                f"SELECT COUNT(*), {', '.join(f'TOTAL({col})' for col in COLUMNAS_TOTALES)} FROM productos"
+            ).fetchone()
+            return resumen_catalogo(fila[0], dict(zip(COLUMNAS_TOTALES, fila[1:])))
+        return self._por_version('resumen', calcular)
+
+    def _leer_columna(self, col, permitidas):
+        if col not in permitidas:
+            raise KeyError(col)
+        return np.fromiter(
+            (fila[0] for fila in self._conexion.execute(f'SELECT {col} FROM productos ORDER BY id')),
+            dtype=np.float64
+        )
+
+    def columna(self, col):
+        """Copia en memoria de una columna numérica"""
+        return self._leer_columna(col, COLUMNAS_NUMERICAS)
+
+    def extremos(self, col):
+        """Mínimo y máximo finitos de una columna numérica, o None; con MIN y MAX en SQL, una vez por versión"""
+        if col not in COLUMNAS_NUMERICAS:
+            raise KeyError(col)
+        # Los NaN se guardan como NULL y quedan fuera; el BETWEEN descarta los infinitos
+        fila = self._por_version(('extremos', col), lambda: self._conexion.execute(
+            f'SELECT MIN({col}), MAX({col}) FROM productos WHERE {col} BETWEEN ? AND ?',
+            (-np.finfo(np.float64).max, np.finfo(np.float64).max)
+        ).fetchone())
+        return None if fila[0] is None else (float(fila[0]), float(fila[1]))
+
+    def entrada(self, col):
+        """Copia en memoria de una columna de COLUMNAS_ENTRADA"""
+        return self._leer_columna(col, COLUMNAS_ENTRADA)
+
+    def costos(self, inicio=0, fin=None):
+        """Matriz de costos por campo de las filas [inicio, fin)"""
+        fin = len(self) if fin is None else fin
+        filas = self._conexion.execute(
+            f"SELECT {', '.join(CAMPOS_COSTOS)} FROM productos WHERE id > ? AND id <= ? ORDER BY id", (inicio, fin)
+        ).fetchall()
+        return np.array(filas, dtype=np.float64).reshape(len(filas), len(CAMPOS_COSTOS))
+
+    def subtotales_categorias(self, inicio=0, fin=None):
+        """Matriz (filas × categorías) con el subtotal de cada categoría de costos por producto"""
+        return subtotales_categorias(self.costos(inicio, fin))
+
+    def estructura_costos(self):
+        """Estructura de costos del catálogo, con las sumas por campo calculadas en SQL una vez por versión"""
+        fila = self._por_version('estructura', lambda: self._conexion.execute(
+            f"SELECT TOTAL(costo_base), {', '.join(f'TOTAL({campo_key})' for campo_key in CAMPOS_COSTOS)} FROM productos"
+        ).fetchone())
+        return estructura_costos(fila[0], np.array(fila[1:]))
+
+    def a_dataframe(self, inicio=0, fin=None):
+        """DataFrame de las filas [inicio, fin), leídas por rango de id"""
+        n = len(self)
+        fin = n if fin is None else min(fin, n)
+        inicio = min(inicio, fin)
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(COLUMNAS_PRODUCTO)} FROM productos WHERE id > ? AND id <= ? ORDER BY id",
+            self._conexion,
+            params=(inicio, fin)
+        )
+        df.index = pd.RangeIndex(inicio, inicio + len(df))
+        return df
+
+    def seleccionar(self, filas):
+        """DataFrame de las filas en esas posiciones, en ese orden, leídas por id"""
+        filas = np.asarray(filas, dtype=np.int64)
+        df = pd.read_sql_query(
+            f"SELECT id, {', '.join(COLUMNAS_PRODUCTO)} FROM productos WHERE id IN ({', '.join('?' * len(filas))})",
+            self._conexion,
+            params=(filas + 1).tolist()
+        )
+        df = df.set_index(df['id'] - 1).drop(columns='id').reindex(filas)
+        df.index = pd.Index(filas)
+        return df
+
+    def nombres_codigos(self):
+        """Nombres distintos en orden de aparición y el código de cada fila"""
+        nombres = pd.read_sql_query('SELECT nombre FROM productos ORDER BY id', self._conexion)['nombre']
+        codigos, unicos = pd.factorize(nombres.to_numpy(dtype=object))
+        return list(unicos), codigos.astype(np.int32)
+
+    def buscar(self, nombre):
+        """Posiciones de los productos con ese nombre exacto (usa el índice por nombre)"""
+        return np.fromiter(
+            (fila[0] - 1 for fila in self._conexion.execute('SELECT id FROM productos WHERE nombre = ? ORDER BY id', (nombre,))),
+            dtype=np.int64
+        )
+
+    def memoria(self):
+        """Bytes que ocupa el archivo en disco (las filas no se guardan en memoria)"""
+        paginas = self._conexion.execute('PRAGMA page_count').fetchone()[0]
+        return paginas * self._conexion.execute('PRAGMA page_size').fetchone()[0]
+
+    def cerrar(self):
+        self._conexion.close()
@@ -0,0 +1,271 @@
+"""Búsqueda por nombre, filtros por rango y orden de varias columnas sobre el catálogo
+
+Los nombres se indexan por trigramas a medida que aparecen nombres nuevos, y cada columna
+numérica guarda su orden y rangos densos mientras el catálogo no cambie. Así cada consulta
+cuesta del orden de las filas que devuelve, no de todo el catálogo.
+"""
+import unicodedata
+from array import array
+
+import numpy as np
+
+# Columnas con filtro por rango en la tabla: clave -> rótulo
+COLUMNAS_FILTRO = {
+    'margen_real_sobre_ventas': 'Margen Real %',
+    'precio_con_iva': 'Precio Final',
+    'descuento_maximo': 'Desc. Máximo %'
+}
+
+# Columnas por las que se puede ordenar: clave -> rótulo
+COLUMNAS_ORDEN = {
+    'nombre': 'Producto/Servicio',
+    'costo_total': 'Costo Total',
+    'margen_real_sobre_ventas': 'Margen Real',
+    'markup_real_sobre_costo': 'Markup Real',
+    'precio_sin_iva': 'Precio Neto',
+    'precio_con_iva': 'Precio Final',
+    'ganancia': 'Ganancia',
+    'descuento_maximo': 'Desc. Máximo'
+}
+
+# Marcas de inicio y fin de nombre: toda subcadena de 1 o 2 caracteres queda dentro de un trigrama
+_INICIO, _FIN = '\x02', '\x03'
+
+# Con más nombres coincidentes que esto, las filas se marcan con una máscara en vez de por rangos
+_MAX_NOMBRES_POR_RANGO = 256
+
+
+def normalizar(texto):
+    """Texto en minúsculas y sin tildes, para comparar nombres"""
+    texto = str(texto)
+    if texto.isascii():
+        return texto.lower()
+    texto = unicodedata.normalize('NFKD', texto.casefold())
+    return ''.join(caracter for caracter in texto if not unicodedata.combining(caracter))
+
+
+def trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceNombres:
+    """Índice de trigramas sobre una lista de nombres que solo crece; los códigos son posiciones"""
+
+    def __init__(self):
+        self.nombres = []
+        self._normalizados = []
+        # trigrama -> códigos de los nombres que lo contienen, en orden creciente
+        self._listas = {}
+        # subcadena de 1 o 2 caracteres -> trigramas que la tienen a partir de su segundo caracter
+        self._por_subcadena = {}
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def agregar(self, nombres):
+        """Indexa nombres nuevos; reciben los códigos siguientes a los ya indexados"""
+        for nombre in nombres:
+            codigo = len(self.nombres)
+            normalizado = normalizar(nombre)
+            self.nombres.append(nombre)
+            self._normalizados.append(normalizado)
+            for trigrama in trigramas(_INICIO + normalizado + _FIN):
+                lista = self._listas.get(trigrama)
+                if lista is None:
+                    lista = self._listas[trigrama] = array('i')
+                    for subcadena in (trigrama[1], trigrama[1:]):
+                        self._por_subcadena.setdefault(subcadena, []).append(trigrama)
+                lista.append(codigo)
+
+    def _lista(self, trigrama):
+        lista = self._listas.get(trigrama)
+        # Copia: una vista impediría seguir agregando códigos a la lista
+        return np.frombuffer(lista, dtype=np.int32).copy() if lista is not None else np.empty(0, dtype=np.int32)
+
+    def buscar(self, texto):
+        """Códigos (ordenados) de los nombres que contienen texto, sin distinguir mayúsculas ni tildes"""
+        consulta = normalizar(texto)
+        if not consulta:
+            return np.arange(len(self.nombres), dtype=np.int32)
+        if len(consulta) < 3:
+            # Unión de las listas de todos los trigramas que contienen la consulta
+            marcados = np.zeros(len(self.nombres), dtype=bool)
+            for trigrama in self._por_subcadena.get(consulta, []):
+                marcados[np.frombuffer(self._listas[trigrama], dtype=np.int32)] = True
+            return np.flatnonzero(marcados).astype(np.int32)
+
+        # Se intersectan primero las listas más cortas
+        listas = sorted((self._lista(trigrama) for trigrama in trigramas(consulta)), key=len)
+        codigos = listas[0]
+        for lista in listas[1:]:
+            if not len(codigos):
+                break
+            codigos = np.intersect1d(codigos, lista, assume_unique=True)
+        if len(consulta) > 3:
+            # Los trigramas pueden estar en otro orden: se confirma la subcadena completa
+            codigos = codigos[[consulta in self._normalizados[codigo] for codigo in codigos.tolist()]]
+        return codigos
+
+
+class IndiceCatalogo:
+    """Consultas sobre un catálogo (CatalogoProductos o CatalogoSQLite)
+
+    El índice de nombres se pone al día solo con los nombres nuevos; los órdenes por columna
+    y las filas de cada nombre se recalculan la primera vez que se usan tras un cambio.
+    """
+
+    def __init__(self, catalogo):
+        self.catalogo = catalogo
+        self.nombres = IndiceNombres()
+        self._fuente_nombres = None
+        self._codigos = None
+        self._version = None
+        self._ordenes = {}
+        self._columnas = {}
+        self._filas_nombre = None
+        self._rango_nombre = None
+        self._ultima = None
+        self._extremos = (None, {})
+
+    def _actualizar(self):
+        version = self.catalogo.version
+        if version == self._version:
+            return
+        nombres, codigos = self.catalogo.nombres_codigos()
+        indexados = len(self.nombres)
+        # Con la misma lista (o una que empieza igual) basta indexar los nombres nuevos
+        if nombres is not self._fuente_nombres and list(nombres[:indexados]) != self.nombres.nombres:
+            self.nombres = IndiceNombres()
+            indexados = 0
+            self._rango_nombre = None
+        self.nombres.agregar(nombres[indexados:])
+        if len(self.nombres) != indexados:
+            self._rango_nombre = None
+        self._fuente_nombres = nombres
+        # Los códigos de filas ya existentes pueden cambiar (por ejemplo tras limpiar el catálogo)
+        self._filas_nombre = None
+        self._codigos = codigos
+        self._ordenes = {}
+        self._columnas = {}
+        self._ultima = None
+        self._version = version
+
+    def _columna(self, col):
+        """Columna numérica del catálogo, leída una vez por versión (en SQLite viene del disco)"""
+        if col not in self._columnas:
+            self._columnas[col] = self.catalogo.columna(col)
+        return self._columnas[col]
+
+    def orden(self, col):
+        """(orden de las filas por col, valores ordenados, rango denso de cada fila) de una columna"""
+        ordenado = self._ordenes.get(col)
+        if ordenado is None:
+            if col == 'nombre':
+                rangos = self._rangos_nombre()[self._codigos]
+                orden = np.argsort(rangos, kind='stable')
+                valores = rangos[orden]
+            else:
+                columna = self._columna(col)
+                orden = np.argsort(columna, kind='stable')
+                valores = columna[orden]
+                rangos = np.empty(len(orden), dtype=np.int64)
+                rangos[orden] = np.concatenate([[0], np.cumsum(valores[1:] != valores[:-1])]) if len(orden) else []
+            ordenado = self._ordenes[col] = (orden, valores, rangos)
+        return ordenado
+
+    def _rangos_nombre(self):
+        """Rango alfabético (sin mayúsculas ni tildes) de cada código de nombre"""
+        if self._rango_nombre is None:
+            normalizados = np.asarray(self.nombres._normalizados, dtype=object)
+            orden = np.argsort(normalizados, kind='stable')
+            ordenados = normalizados[orden]
+            self._rango_nombre = np.empty(len(orden), dtype=np.int64)
+            self._rango_nombre[orden] = np.concatenate([[0], np.cumsum(ordenados[1:] != ordenados[:-1])]) if len(orden) else []
+        return self._rango_nombre
+
+    def extremos(self, col):
+        """Mínimo y máximo finitos de una columna, o None si no hay valores
+
+        No pone al día el índice de nombres ni ordena la columna: se pide al catálogo una
+        vez por versión.
+        """
+        version = self.catalogo.version
+        if self._extremos[0] != version:
+            self._extremos = (version, {})
+        calculados = self._extremos[1]
+        if col not in calculados:
+            calculados[col] = self.catalogo.extremos(col)
+        return calculados[col]
+
+    def _filas_de_nombres(self, codigos):
+        """Filas (en orden del catálogo) cuyos nombres tienen esos códigos"""
+        if len(codigos) > _MAX_NOMBRES_POR_RANGO:
+            marcados = np.zeros(len(self.nombres), dtype=bool)
+            marcados[codigos] = True
+            return np.flatnonzero(marcados[self._codigos])
+        if self._filas_nombre is None:
+            orden = np.argsort(self._codigos, kind='stable')
+            limites = np.searchsorted(self._codigos[orden], np.arange(len(self.nombres) + 1))
+            self._filas_nombre = (orden, limites)
+        orden, limites = self._filas_nombre
+        if not len(codigos):
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate([orden[limites[codigo]:limites[codigo + 1]] for codigo in codigos.tolist()]))
+
+    def _filtrar_rango(self, col, minimo, maximo, filas):
+        """Filas con minimo <= col <= maximo; sobre todo el catálogo usa el orden de la columna"""
+        if filas is None:
+            orden, valores, _ = self.orden(col)
+            desde = np.searchsorted(valores, minimo, side='left')
+            hasta = np.searchsorted(valores, maximo, side='right')
+            return np.sort(orden[desde:hasta])
+        valores = self._columna(col)[filas]
+        return filas[(valores >= minimo) & (valores <= maximo)]
+
+    def _ordenar(self, filas, orden):
+        """Ordena las filas por varias columnas, combinando los rangos densos precalculados"""
+        if filas is None and len(orden) == 1 and orden[0][1]:
+            return self.orden(orden[0][0])[0]
+        claves = []
+        for col, ascendente in reversed(orden):
+            rangos = self.orden(col)[2]
+            rango = rangos if filas is None else rangos[filas]
+            claves.append(rango if ascendente else -rango)
+        posiciones = np.lexsort(claves)
+        return posiciones if filas is None else filas[posiciones]
+
+    def consultar(self, texto='', rangos=None, orden=None):
+        """Posiciones de las filas cuyo nombre contiene texto y cuyos valores caen en rangos
+
+        rangos es {columna: (mínimo, máximo)}, inclusivos; orden es una lista de (columna,
+        ascendente) por prioridad. Sin orden se mantiene el orden del catálogo. El último
+        resultado se reutiliza mientras no cambien la consulta ni el catálogo.
+        """
+        self._actualizar()
+        rangos = dict(rangos or {})
+        orden = list(orden or [])
+        clave = (normalizar(texto), tuple(sorted(rangos.items())), tuple(orden))
+        if self._ultima is not None and self._ultima[0] == clave:
+            return self._ultima[1]
+
+        filas = None
+        if clave[0]:
+            filas = self._filas_de_nombres(self.nombres.buscar(texto))
+        if rangos and filas is None:
+            # Se parte del filtro más selectivo, que cuesta dos búsquedas binarias contarlo
+            def cantidad(item):
+                col, (minimo, maximo) = item
+                valores = self.orden(col)[1]
+                return np.searchsorted(valores, maximo, side='right') - np.searchsorted(valores, minimo, side='left')
+            primero = min(rangos.items(), key=cantidad)
+            filas = self._filtrar_rango(primero[0], *primero[1], None)
+            del rangos[primero[0]]
+        for col, (minimo, maximo) in rangos.items():
+            filas = self._filtrar_rango(col, minimo, maximo, filas)
+
+        if orden:
+            filas = self._ordenar(filas, orden)
+        elif filas is None:
+            filas = np.arange(len(self._codigos))
+        self._ultima = (clave, filas)
+        return filas
@@ -0,0 +1,359 @@
+"""Catálogo de productos en columnas tipadas"""
+import numpy as np
+import pandas as pd
+
+from .precios import (
+    CAMPOS_COSTOS, CATEGORIAS_COSTOS, calcular_iva_enteros, calcular_iva_lote, calcular_neto_enteros,
+    calcular_neto_lote, calcular_precios_enteros_lote, calcular_precios_lote, subtotales_categorias
+)
+
+# Columnas de cada producto guardado
+COLUMNAS_PRODUCTO = [
+    'nombre', 'costo_base', 'costos_adicionales', 'costo_total', 'metodo_calculo',
+    'margen_real_sobre_ventas', 'markup_real_sobre_costo', 'precio_sin_iva',
+    'valor_iva', 'precio_con_iva', 'ganancia', 'descuento_maximo'
+]
+
+# Columnas guardadas como float64
+COLUMNAS_NUMERICAS = [col for col in COLUMNAS_PRODUCTO if col not in ('nombre', 'metodo_calculo')]
+
+# Columnas cuyos totales se mantienen al agregar productos
+COLUMNAS_TOTALES = [
+    'costo_base', 'costos_adicionales', 'costo_total', 'precio_sin_iva',
+    'valor_iva', 'precio_con_iva', 'ganancia', 'margen_real_sobre_ventas', 'descuento_maximo'
+]
+
+# Metodologías, en el orden de sus códigos
+METODOS = ['margen', 'markup']
+
+# Entradas del cálculo guardadas por producto, para poder recalcular el catálogo:
+# costo_base_original es el costo base tal como se ingresó (en pesos enteros la columna
+# costo_base queda redondeada) y enteros es 1.0 si la fila se calculó con el motor de
+# pesos enteros y 0.0 si no
+COLUMNAS_ENTRADA = ['costo_base_original', 'margen', 'iva', 'enteros']
+
+# Columnas que cambian con la metodología (el precio neto) y con el IVA; un cambio de
+# metodología recalcula ambas, uno de IVA solo las segundas
+DEPENDIENTES_METODO = ['precio_sin_iva', 'ganancia', 'margen_real_sobre_ventas', 'markup_real_sobre_costo']
+DEPENDIENTES_IVA = ['precio_con_iva', 'valor_iva', 'descuento_maximo']
+
+
+class CatalogoProductos:
+    """Catálogo en columnas: un arreglo float64 por columna y nombres/métodos como códigos
+
+    Los costos por campo se guardan en una matriz float64 de una columna por campo de
+    CAMPOS_COSTOS (8 bytes por campo y producto).
+    """
+
+    CAPACIDAD_INICIAL = 1024
+
+    def __init__(self):
+        # Aumenta con cada modificación; sirve de llave para cachés derivadas
+        self.version = 0
+        self._vaciar()
+
+    def _vaciar(self):
+        self._n = 0
+        self._capacidad = self.CAPACIDAD_INICIAL
+        self._columnas = {col: np.empty(self._capacidad) for col in COLUMNAS_NUMERICAS + COLUMNAS_ENTRADA}
+        self._costos = np.empty((self._capacidad, len(CAMPOS_COSTOS)))
+        self._codigos_nombre = np.empty(self._capacidad, dtype=np.int32)
+        self._codigos_metodo = np.empty(self._capacidad, dtype=np.int8)
+        self._nombres = []
+        self._codigo_por_nombre = {}
+        self._totales = dict.fromkeys(COLUMNAS_TOTALES, 0.0)
+        self._totales_campos = np.zeros(len(CAMPOS_COSTOS))
+
+    def __len__(self):
+        return self._n
+
+    def _reservar(self, filas):
+        """Asegura espacio para filas nuevas, duplicando la capacidad (append O(1) amortizado)"""
+        necesaria = self._n + filas
+        if necesaria <= self._capacidad:
+            return
+        capacidad = max(necesaria, 2 * self._capacidad)
+        for col, arreglo in self._columnas.items():
+            nuevo = np.empty(capacidad)
+            nuevo[:self._n] = arreglo[:self._n]
+            self._columnas[col] = nuevo
+        for atributo in ('_costos', '_codigos_nombre', '_codigos_metodo'):
+            arreglo = getattr(self, atributo)
+            nuevo = np.empty((capacidad,) + arreglo.shape[1:], dtype=arreglo.dtype)
+            nuevo[:self._n] = arreglo[:self._n]
+            setattr(self, atributo, nuevo)
+        self._capacidad = capacidad
+
+    def _codigo_nombre(self, nombre):
+        """Devuelve el código del nombre, internándolo si es nuevo"""
+        codigo = self._codigo_por_nombre.get(nombre)
+        if codigo is None:
+            codigo = len(self._nombres)
+            self._nombres.append(nombre)
+            self._codigo_por_nombre[nombre] = codigo
+        return codigo
+
+    def agregar(self, producto):
+        """Agrega un producto con las claves de COLUMNAS_PRODUCTO, COLUMNAS_ENTRADA y 'costos' (uno por campo)"""
+        self._reservar(1)
+        i = self._n
+        for col in COLUMNAS_NUMERICAS + COLUMNAS_ENTRADA:
+            self._columnas[col][i] = producto[col]
+        self._costos[i] = producto['costos']
+        self._totales_campos += self._costos[i]
+        self._codigos_nombre[i] = self._codigo_nombre(str(producto['nombre']))
+        self._codigos_metodo[i] = 0 if producto['metodo_calculo'] == 'margen' else 1
+        for col in COLUMNAS_TOTALES:
+            self._totales[col] += float(self._columnas[col][i])
+        self._n += 1
+        self.version += 1
+
+    def agregar_lote(self, nombres, columnas):
+        """Agrega un lote completo, p. ej. el resultado de valorar_columnas
+
+        columnas trae COLUMNAS_PRODUCTO, COLUMNAS_ENTRADA (costo base ingresado, margen
+        pedido, IVA y redondeo de cada fila) y 'costos', la matriz de costos por campo
+        ingresados.
+        """
+        filas = len(nombres)
+        if filas == 0:
+            return
+        self._reservar(filas)
+        inicio, fin = self._n, self._n + filas
+        for col in COLUMNAS_NUMERICAS + COLUMNAS_ENTRADA:
+            self._columnas[col][inicio:fin] = columnas[col]
+        self._costos[inicio:fin] = columnas['costos']
+        self._totales_campos += self._costos[inicio:fin].sum(axis=0)
+
+        # Solo se internan los nombres distintos del lote
+        codigos_lote, unicos = pd.factorize(np.asarray(nombres, dtype=object))
+        mapa = np.fromiter((self._codigo_nombre(str(nombre)) for nombre in unicos), dtype=np.int32, count=len(unicos))
+        self._codigos_nombre[inicio:fin] = mapa[codigos_lote]
+        self._codigos_metodo[inicio:fin] = np.asarray(columnas['metodo_calculo']) != 'margen'
+        for col in COLUMNAS_TOTALES:
+            self._totales[col] += float(self._columnas[col][inicio:fin].sum())
+
+        self._n = fin
+        self.version += 1
+
+    def limpiar(self):
+        """Elimina todos los productos"""
+        self._vaciar()
+        self.version += 1
+
+    def desactualizados(self, iva, metodo_calculo, enteros=False):
+        """Cantidad de productos calculados con otro IVA, otra metodología u otro redondeo"""
+        n = self._n
+        distintos = self._columnas['iva'][:n] != iva
+        distintos |= self._codigos_metodo[:n] != METODOS.index(metodo_calculo)
+        distintos |= (self._columnas['enteros'][:n] != 0) != bool(enteros)
+        return int(np.count_nonzero(distintos))
+
+    def revalorar(self, iva=None, metodo_calculo=None, enteros=None):
+        """Recalcula el catálogo con otro IVA, metodología y/o redondeo, manteniendo costos y márgenes
+
+        Solo se recalculan las filas cuyo parámetro cambió y solo las columnas que dependen
+        de él: un cambio de IVA no toca precio_sin_iva ni ganancia. Cada fila se recalcula
+        con el motor con que se calculó; con enteros (True o False) las filas de otro
+        redondeo se recalculan completas desde el costo base y los costos por campo tal como
+        se ingresaron, así que volver a decimales no arrastra el redondeo. Devuelve las
+        columnas recalculadas (vacía si no había nada que cambiar).
+        """
+        n = self._n
+        columnas = self._columnas
+        sin_cambio = np.zeros(n, dtype=bool)
+        cambio_iva = sin_cambio if iva is None else columnas['iva'][:n] != iva
+        if metodo_calculo is None:
+            cambio_metodo = sin_cambio
+        else:
+            codigo = METODOS.index(metodo_calculo)
+            cambio_metodo = self._codigos_metodo[:n] != codigo
+        redondeo = columnas['enteros'][:n] != 0
+        cambio_redondeo = sin_cambio if enteros is None else redondeo != bool(enteros)
+        if not (cambio_iva | cambio_metodo | cambio_redondeo).any():
+            return []
+
+        if iva is not None:
+            columnas['iva'][:n] = iva
+        if metodo_calculo is not None:
+            self._codigos_metodo[:n] = codigo
+        recalculadas = set()
+
+        filas_completas = _filas(cambio_redondeo)
+        if filas_completas is not None:
+            columnas['enteros'][filas_completas] = float(bool(enteros))
+            resultado = (calcular_precios_enteros_lote if enteros else calcular_precios_lote)(
+                columnas['costo_base_original'][filas_completas],
+                self._costos[filas_completas],
+                columnas['margen'][filas_completas],
+                columnas['iva'][filas_completas],
+                np.asarray(METODOS)[self._codigos_metodo[filas_completas]]
+            )
+            for col in COLUMNAS_NUMERICAS:
+                columnas[col][filas_completas] = resultado[col]
+            recalculadas.update(COLUMNAS_NUMERICAS)
+
+        # El resto, por etapas, con el motor de cada fila
+        for en_enteros, calcular_neto, calcular_iva in (
+            (False, calcular_neto_lote, calcular_iva_lote), (True, calcular_neto_enteros, calcular_iva_enteros)
+        ):
+            del_motor = (redondeo == en_enteros) & ~cambio_redondeo
+            filas_metodo = _filas(cambio_metodo & del_motor)
+            filas_iva = _filas((cambio_iva | cambio_metodo) & del_motor)
+            if filas_metodo is not None:
+                neto = calcular_neto(columnas['costo_total'][filas_metodo], columnas['margen'][filas_metodo], codigo == 0)
+                for col in DEPENDIENTES_METODO:
+                    columnas[col][filas_metodo] = neto[col]
+                recalculadas.update(DEPENDIENTES_METODO)
+            if filas_iva is not None:
+                final = calcular_iva(
+                    columnas['costo_total'][filas_iva], columnas['precio_sin_iva'][filas_iva], columnas['iva'][filas_iva]
+                )
+                for col in DEPENDIENTES_IVA:
+                    columnas[col][filas_iva] = final[col]
+                recalculadas.update(DEPENDIENTES_IVA)
+
+        for col in recalculadas:
+            if col in self._totales:
+                self._totales[col] = float(columnas[col][:n].sum())
+        self.version += 1
+        return [col for col in COLUMNAS_NUMERICAS if col in recalculadas]
+
+    def resumen(self):
+        """Totales y promedios del catálogo en O(1), a partir de los acumulados"""
+        return resumen_catalogo(self._n, self._totales)
+
+    def columna(self, col):
+        """Vista (sin copia) de una columna numérica"""
+        return self._columnas[col][:self._n]
+
+    def extremos(self, col):
+        """Mínimo y máximo finitos de una columna numérica, o None si no hay valores"""
+        valores = self.columna(col)
+        finitos = valores[np.isfinite(valores)]
+        return (float(finitos.min()), float(finitos.max())) if len(finitos) else None
+
+    def a_dataframe(self, inicio=0, fin=None):
+        """DataFrame de las filas [inicio, fin) con vistas de las columnas numéricas, sin copiar
+
+        Las vistas dejan de ser válidas cuando el catálogo se modifica. Los nombres se
+        decodifican solo para esas filas.
+        """
+        fin = self._n if fin is None else min(fin, self._n)
+        inicio = min(inicio, fin)
+
+        datos = {}
+        for col in COLUMNAS_PRODUCTO:
+            if col == 'nombre':
+                datos[col] = self._nombres_de(self._codigos_nombre[inicio:fin])
+            elif col == 'metodo_calculo':
+                datos[col] = pd.Categorical.from_codes(self._codigos_metodo[inicio:fin], categories=METODOS)
+            else:
+                datos[col] = self._columnas[col][inicio:fin]
+        return pd.DataFrame(datos, index=pd.RangeIndex(inicio, fin), copy=False)
+
+    def seleccionar(self, filas):
+        """DataFrame de las filas en esas posiciones (p. ej. una página de una búsqueda), en ese orden"""
+        filas = np.asarray(filas, dtype=np.int64)
+
+        datos = {}
+        for col in COLUMNAS_PRODUCTO:
+            if col == 'nombre':
+                datos[col] = self._nombres_de(self._codigos_nombre[filas])
+            elif col == 'metodo_calculo':
+                datos[col] = pd.Categorical.from_codes(self._codigos_metodo[filas], categories=METODOS)
+            else:
+                datos[col] = self._columnas[col][filas]
+        return pd.DataFrame(datos, index=pd.Index(filas))
+
+    def _nombres_de(self, codigos):
+        """Nombres (texto) de esos códigos, sin recorrer los demás nombres del catálogo
+
+        No se usa un Categorical: sus categorías serían todos los nombres del catálogo, y
+        una página de 50 filas cargaría la lista completa (Streamlit la envía al navegador).
+        """
+        nombres = self._nombres
+        return np.array([nombres[codigo] for codigo in codigos.tolist()], dtype=object)
+
+    def nombres_codigos(self):
+        """Nombres distintos en orden de aparición (la lista solo crece) y el código de cada fila"""
+        return self._nombres, self._codigos_nombre[:self._n]
+
+    def buscar(self, nombre):
+        """Posiciones de los productos con ese nombre exacto"""
+        codigo = self._codigo_por_nombre.get(nombre)
+        if codigo is None:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self._codigos_nombre[:self._n] == codigo)
+
+    def costos(self, inicio=0, fin=None):
+        """Vista (sin copia) de la matriz de costos por campo de las filas [inicio, fin)"""
+        fin = self._n if fin is None else min(fin, self._n)
+        return self._costos[min(inicio, fin):fin]
+
+    def subtotales_categorias(self, inicio=0, fin=None):
+        """Matriz (filas × categorías) con el subtotal de cada categoría de costos por producto"""
+        return subtotales_categorias(self.costos(inicio, fin))
+
+    def estructura_costos(self):
+        """Estructura de costos del catálogo en O(1), a partir de los totales por campo"""
+        return estructura_costos(self._totales['costo_base'], self._totales_campos)
+
+    def entrada(self, col):
+        """Vista (sin copia) de una columna de COLUMNAS_ENTRADA"""
+        return self._columnas[col][:self._n]
+
+    def como_lotes(self, tamano_bloque):
+        """Genera las filas en bloques (nombres, columnas), listos para agregar_lote de otro catálogo
+
+        Las columnas numéricas son vistas, sin copia; solo se arman los nombres y métodos del
+        bloque en curso.
+        """
+        for inicio in range(0, self._n, tamano_bloque):
+            fin = min(inicio + tamano_bloque, self._n)
+            columnas = {col: arreglo[inicio:fin] for col, arreglo in self._columnas.items()}
+            columnas['costos'] = self._costos[inicio:fin]
+            columnas['metodo_calculo'] = np.asarray(METODOS)[self._codigos_metodo[inicio:fin]]
+            yield self._nombres_de(self._codigos_nombre[inicio:fin]), columnas
+
+    def memoria(self):
+        """Bytes ocupados por las filas guardadas (sin contar los textos de nombres)"""
+        por_fila = sum(arreglo.itemsize for arreglo in self._columnas.values())
+        por_fila += self._costos.itemsize * self._costos.shape[1]
+        por_fila += self._codigos_nombre.itemsize + self._codigos_metodo.itemsize
+        return por_fila * self._n
+
+
+def resumen_catalogo(n, totales):
+    """Resumen ejecutivo a partir de la cantidad de productos y las sumas de COLUMNAS_TOTALES"""
+    return {
+        'cantidad': n,
+        'total_costo_base': totales['costo_base'],
+        'total_costos_adicionales': totales['costos_adicionales'],
+        'total_inversion': totales['costo_total'],
+        'total_neto': totales['precio_sin_iva'],
+        'total_iva': totales['valor_iva'],
+        'total_final': totales['precio_con_iva'],
+        'total_ganancia': totales['ganancia'],
+        'margen_promedio': totales['margen_real_sobre_ventas'] / n if n else 0.0,
+        'descuento_promedio': totales['descuento_maximo'] / n if n else 0.0,
+        'roi': ((totales['precio_con_iva'] / totales['costo_total']) - 1) * 100 if totales['costo_total'] > 0 else 0.0,
+        'precio_minimo_promedio': totales['costo_total'] / n if n else 0.0
+    }
+
+
+def estructura_costos(total_costo_base, totales_campos):
+    """DataFrame con el total del costo base y de cada categoría, y su participación en el costo total"""
+    totales = np.concatenate([[total_costo_base], subtotales_categorias(totales_campos)])
+    costo_total = totales.sum()
+    participacion = totales / costo_total * 100 if costo_total > 0 else np.zeros(len(totales))
+    titulos = ['Costo Base'] + [categoria['titulo'] for categoria in CATEGORIAS_COSTOS.values()]
+    return pd.DataFrame({'Total': totales, 'Participación %': participacion}, index=pd.Index(titulos, name='Categoría'))
+
+
+def _filas(mascara):
+    """Índice de las filas marcadas: un slice si son todas, None si ninguna"""
+    if mascara.all():
+        return slice(0, len(mascara)) if len(mascara) else None
+    filas = np.flatnonzero(mascara)
+    return filas if len(filas) else None
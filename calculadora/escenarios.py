@@ -0,0 +1,82 @@
+"""Análisis de sensibilidad del catálogo sobre una grilla de margen × IVA × metodología
+
+Con un mismo margen para todos los productos, cada precio es proporcional al costo total
+del producto. Por eso la grilla se evalúa con las fórmulas de calcular_neto_lote y
+calcular_iva_lote para costo 1 (broadcasting sobre los tres ejes) y luego se escala por
+la suma de costos del catálogo: el costo es O(productos + celdas) y no su producto.
+"""
+import numpy as np
+import pandas as pd
+
+from .catalogo import METODOS
+from .precios import calcular_iva_lote, calcular_neto_lote
+
+# Métricas de la grilla: clave del resultado -> título
+METRICAS_SENSIBILIDAD = {
+    'ganancia_total': 'Ganancia total ($)',
+    'total_final': 'Total con IVA ($)',
+    'roi': 'ROI (%)',
+    'descuento_promedio': 'Descuento máximo promedio (%)'
+}
+
+
+def rango_margenes(desde, hasta, paso):
+    """Márgenes de desde a hasta (inclusive) cada paso"""
+    if paso <= 0 or hasta < desde:
+        return np.array([float(desde)])
+    return np.round(np.arange(desde, hasta + paso / 2, paso), 10)
+
+
+def analizar_sensibilidad(costo_total, margenes, ivas, metodos=METODOS):
+    """Métricas agregadas del catálogo para cada combinación de metodología, margen e IVA
+
+    Devuelve un diccionario con los ejes ('metodos', 'margenes', 'ivas') y una matriz
+    (metodos × margenes × ivas) por cada clave de METRICAS_SENSIBILIDAD, con los mismos
+    criterios que CatalogoProductos.resumen().
+    """
+    costo_total = np.asarray(costo_total, dtype=np.float64)
+    n = len(costo_total)
+    suma_costos = float(costo_total.sum())
+    positivos = np.count_nonzero(costo_total > 0)
+    negativos = np.count_nonzero(costo_total < 0)
+
+    metodos = list(metodos)
+    margenes = np.asarray(margenes, dtype=np.float64)
+    ivas = np.asarray(ivas, dtype=np.float64)
+    forma = (len(metodos), len(margenes), len(ivas))
+
+    # Precios de un producto de costo 1 en toda la grilla
+    es_margen = (np.asarray(metodos) == 'margen')[:, None, None]
+    neto = calcular_neto_lote(1.0, margenes[None, :, None], es_margen)
+    final = calcular_iva_lote(1.0, neto['precio_sin_iva'], ivas[None, None, :])
+    factor_neto = np.broadcast_to(neto['precio_sin_iva'], forma)
+    factor_final = np.broadcast_to(final['precio_con_iva'], forma)
+
+    total_final = suma_costos * factor_final
+    with np.errstate(divide='ignore', invalid='ignore'):
+        roi = np.where(suma_costos > 0, (total_final / suma_costos - 1) * 100, 0.0)
+        # El descuento de cada fila con precio positivo es el mismo: 1 - 1 / factor
+        filas_con_precio = np.where(factor_final > 0, positivos, np.where(factor_final < 0, negativos, 0))
+        descuento = np.where(filas_con_precio > 0, (1 - 1 / factor_final) * 100, 0.0)
+    descuento_promedio = descuento * filas_con_precio / n if n else np.zeros(forma)
+
+    return {
+        'metodos': metodos,
+        'margenes': margenes,
+        'ivas': ivas,
+        'ganancia_total': suma_costos * (factor_neto - 1),
+        'total_final': total_final,
+        'roi': roi,
+        'descuento_promedio': descuento_promedio
+    }
+
+
+def tabla_sensibilidad(resultado, metrica):
+    """DataFrame de una métrica: una fila por margen y una columna por metodología e IVA"""
+    matriz = resultado[metrica]
+    datos = {
+        f"{metodo.title()} · IVA {iva:g}%": matriz[i, :, j]
+        for i, metodo in enumerate(resultado['metodos'])
+        for j, iva in enumerate(resultado['ivas'])
+    }
+    return pd.DataFrame(datos, index=pd.Index(resultado['margenes'], name='Margen (%)'))
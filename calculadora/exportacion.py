@@ -0,0 +1,141 @@
+"""Exportación del catálogo de productos"""
+from io import BytesIO
+
+# Encabezados del CSV exportado, en el orden de COLUMNAS_PRODUCTO
+COLUMNAS_EXPORTACION = [
+    'Nombre', 'Costo Base', 'Costos Adicionales', 'Costo Total',
+    'Método Cálculo', 'Margen Real Ventas %', 'Markup Real Costo %',
+    'Precio Neto', 'IVA', 'Precio Final', 'Ganancia', 'Descuento Máximo %'
+]
+
+# Filas leídas del catálogo por bloque al exportar por bloques
+TAMANO_BLOQUE_EXPORTACION = 50_000
+
+# Filas de datos por hoja de Excel (el máximo de una hoja, menos el encabezado)
+MAX_FILAS_XLSX = 1_048_575
+
+# Rótulos del resumen ejecutivo en la hoja Resumen, en el orden de resumen_catalogo
+ETIQUETAS_RESUMEN = {
+    'cantidad': 'Productos',
+    'total_costo_base': 'Total Costo Base',
+    'total_costos_adicionales': 'Total Costos Adicionales',
+    'total_inversion': 'Total Inversión',
+    'total_neto': 'Total Neto',
+    'total_iva': 'Total IVA',
+    'total_final': 'Total Final',
+    'total_ganancia': 'Ganancia Total',
+    'margen_promedio': 'Margen Promedio %',
+    'descuento_promedio': 'Descuento Máx. Promedio %',
+    'roi': 'ROI %',
+    'precio_minimo_promedio': 'Precio Mín. Promedio'
+}
+
+
+def crear_csv_productos(productos):
+    """Crea CSV para exportar"""
+    if not productos:
+        return None
+    
+    df = productos.a_dataframe()
+    df.columns = COLUMNAS_EXPORTACION
+    return df
+
+
+def crear_parquet_productos(productos):
+    """Crea Parquet para exportar, con las mismas columnas que el CSV y sus tipos originales"""
+    if not productos:
+        return None
+    
+    buffer = BytesIO()
+    crear_csv_productos(productos).to_parquet(buffer, index=False, compression='zstd')
+    return buffer.getvalue()
+
+
+def bloques_exportacion(productos, tamano_bloque=TAMANO_BLOQUE_EXPORTACION):
+    """Genera DataFrames de hasta tamano_bloque filas, con los encabezados exportados, leídos del catálogo por rangos"""
+    for inicio in range(0, len(productos), tamano_bloque):
+        df = productos.a_dataframe(inicio, inicio + tamano_bloque)
+        df.columns = COLUMNAS_EXPORTACION
+        yield df
+
+
+def escribir_csv_productos(productos, salida, tamano_bloque=TAMANO_BLOQUE_EXPORTACION):
+    """Escribe el CSV exportado en salida bloque por bloque; devuelve la cantidad de filas escritas
+
+    El resultado es idéntico a crear_csv_productos(productos).to_csv(index=False), pero en
+    memoria solo hay un bloque a la vez.
+    """
+    filas = 0
+    for df in bloques_exportacion(productos, tamano_bloque):
+        df.to_csv(salida, header=filas == 0, index=False, encoding='utf-8')
+        filas += len(df)
+    return filas
+
+
+def crear_csv_bytes(productos):
+    """CSV exportado como bytes UTF-8, escrito por bloques"""
+    if not productos:
+        return None
+    
+    buffer = BytesIO()
+    escribir_csv_productos(productos, buffer)
+    return buffer.getvalue()
+
+
+def escribir_xlsx_productos(productos, salida, tamano_bloque=TAMANO_BLOQUE_EXPORTACION):
+    """Escribe un libro XLSX con la hoja Resumen y las filas del catálogo; devuelve las filas escritas
+
+    Usa xlsxwriter en modo de memoria constante: cada fila se vuelca a disco al pasar a la
+    siguiente, así que la memoria no crece con el catálogo. Si las filas no caben en una hoja
+    siguen en "Productos (2)", "Productos (3)", etc. salida es una ruta o un archivo binario.
+    """
+    import xlsxwriter
+
+    libro = xlsxwriter.Workbook(salida, {'constant_memory': True, 'nan_inf_to_errors': True})
+    negrita = libro.add_format({'bold': True})
+    pesos = libro.add_format({'num_format': '#,##0'})
+    porcentaje = libro.add_format({'num_format': '0.0'})
+
+    hoja = libro.add_worksheet('Resumen')
+    hoja.set_column(0, 0, 28)
+    hoja.set_column(1, 2, 18)
+    hoja.write_row(0, 0, ['Resumen Ejecutivo'], negrita)
+    resumen = productos.resumen()
+    for fila, (clave, etiqueta) in enumerate(ETIQUETAS_RESUMEN.items(), start=1):
+        hoja.write(fila, 0, etiqueta)
+        hoja.write_number(fila, 1, resumen[clave], porcentaje if etiqueta.endswith('%') else pesos)
+    fila = len(ETIQUETAS_RESUMEN) + 2
+    hoja.write_row(fila, 0, ['Categoría', 'Total', 'Participación %'], negrita)
+    for categoria, total, participacion in productos.estructura_costos().itertuples():
+        fila += 1
+        hoja.write(fila, 0, categoria)
+        hoja.write_number(fila, 1, total, pesos)
+        hoja.write_number(fila, 2, participacion, porcentaje)
+
+    filas = 0
+    hoja = None
+    for df in bloques_exportacion(productos, tamano_bloque):
+        columnas = [df[col].tolist() for col in COLUMNAS_EXPORTACION]
+        for valores in zip(*columnas):
+            if filas % MAX_FILAS_XLSX == 0:
+                numero = filas // MAX_FILAS_XLSX + 1
+                hoja = libro.add_worksheet('Productos' if numero == 1 else f'Productos ({numero})')
+                hoja.freeze_panes(1, 1)
+                hoja.set_column(0, 0, 30)
+                hoja.set_column(1, len(COLUMNAS_EXPORTACION) - 1, 16)
+                hoja.write_row(0, 0, COLUMNAS_EXPORTACION, negrita)
+            hoja.write_row(filas % MAX_FILAS_XLSX + 1, 0, valores)
+            filas += 1
+
+    libro.close()
+    return filas
+
+
+def crear_xlsx_productos(productos):
+    """Crea el XLSX para exportar, con el resumen ejecutivo en su propia hoja"""
+    if not productos:
+        return None
+    
+    buffer = BytesIO()
+    escribir_xlsx_productos(productos, buffer)
+    return buffer.getvalue()
@@ -0,0 +1,99 @@
+"""Formateo de pesos chilenos y porcentajes, escalar y vectorizado"""
+import numpy as np
+import pandas as pd
+
+from .catalogo import COLUMNAS_PRODUCTO
+from .perfilado import fase
+
+# Columnas de la tabla que se muestran como pesos o porcentajes
+COLUMNAS_DINERO = ['costo_base', 'costos_adicionales', 'costo_total', 'precio_sin_iva', 'valor_iva', 'precio_con_iva', 'ganancia']
+COLUMNAS_PORCENTAJE = ['margen_real_sobre_ventas', 'markup_real_sobre_costo', 'descuento_maximo']
+
+
+def formatear_peso(valor):
+    """Formatea valores en pesos chilenos"""
+    return f"${valor:,.0f}".replace(",", ".")
+
+
+def agrupar_digitos(enteros, separador):
+    """Texto de un arreglo de enteros no negativos, con separador cada tres dígitos"""
+    # Tabla de grupos: "0".."999", separador + "000".."999" y el texto vacío
+    tabla = np.array([str(i) for i in range(1000)] + [f"{separador}{i:03d}" for i in range(1000)] + [''])
+
+    grupos = []
+    while True:
+        grupos.append(enteros % 1000)
+        enteros = enteros // 1000
+        if not enteros.any():
+            break
+    grupos.reverse()
+
+    texto = np.zeros(len(grupos[0]), dtype='<U1')
+    iniciado = np.zeros(len(grupos[0]), dtype=bool)
+    for k, grupo in enumerate(grupos):
+        ultimo = k == len(grupos) - 1
+        indice = np.where(iniciado, grupo + 1000, np.where((grupo > 0) | ultimo, grupo, 2000))
+        texto = np.char.add(texto, tabla[indice])
+        iniciado |= grupo > 0
+    return texto
+
+
+def formatear_pesos(valores):
+    """Versión vectorizada de formatear_peso: devuelve un arreglo con el mismo texto por valor"""
+    valores = np.asarray(valores, dtype=np.float64)
+    # NaN, infinitos y valores fuera del rango de int64 usan el formateo escalar
+    especiales = ~np.isfinite(valores) | (np.abs(valores) >= 2.0 ** 62)
+    redondeados = np.rint(np.where(especiales, 0.0, valores))
+    enteros = np.abs(redondeados).astype(np.int64)
+
+    texto = np.char.add(np.where(np.signbit(redondeados), '$-', '$'), agrupar_digitos(enteros, '.'))
+    texto = texto.astype(object)
+    if especiales.any():
+        texto[especiales] = [formatear_peso(valor) for valor in valores[especiales]]
+    return texto
+
+
+def formatear_porcentajes(valores):
+    """Formatea un arreglo de porcentajes con un decimal, igual que f"{valor:.1f}%" """
+    valores = np.asarray(valores, dtype=np.float64)
+    especiales = ~np.isfinite(valores) | (np.abs(valores) >= 2.0 ** 50)
+    decimas = np.where(especiales, 0.0, valores) * 10
+    # Cerca de un empate, valor * 10 puede redondear distinto que el formato de Python
+    especiales |= np.abs(np.abs(decimas - np.trunc(decimas)) - 0.5) < 1e-6
+    redondeadas = np.rint(np.where(especiales, 0.0, decimas))
+    enteros = np.abs(redondeadas).astype(np.int64)
+
+    texto = np.char.add(np.where(np.signbit(redondeadas), '-', ''), agrupar_digitos(enteros // 10, ''))
+    texto = np.char.add(texto, np.array([f".{i}%" for i in range(10)])[enteros % 10])
+    texto = texto.astype(object)
+    if especiales.any():
+        texto[especiales] = [f"{valor:.1f}%" for valor in valores[especiales]]
+    return texto
+
+
+def crear_tabla_productos(productos, inicio=0, fin=None, filas=None):
+    """DataFrame formateado para mostrar las filas [inicio, fin) del catálogo
+
+    Con filas (posiciones de una búsqueda) se muestran filas[inicio:fin].
+    """
+    with fase('tabla_dataframe'):
+        df = productos.a_dataframe(inicio, fin) if filas is None else productos.seleccionar(filas[inicio:fin])
+    
+    with fase('tabla_formato'):
+        datos = {}
+        for col in COLUMNAS_PRODUCTO:
+            if col in COLUMNAS_DINERO:
+                datos[col] = formatear_pesos(df[col].to_numpy())
+            elif col in COLUMNAS_PORCENTAJE:
+                datos[col] = formatear_porcentajes(df[col].to_numpy())
+            else:
+                datos[col] = df[col]
+    
+    df_display = pd.DataFrame(datos, index=df.index)
+    # Renombrar columnas para mejor visualización
+    df_display.columns = [
+        'Producto/Servicio', 'Costo Base', 'Costos Adic.', 'Costo Total',
+        'Método', 'Margen Real', 'Markup Real', 'Precio Neto', 'IVA',
+        'Precio Final', 'Ganancia', 'Desc. Máximo'
+    ]
+    return df_display
@@ -0,0 +1,383 @@
+"""Importación de catálogos CSV y Parquet, y caché de importaciones"""
+import hashlib
+import sys
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .catalogo import COLUMNAS_PRODUCTO
+from .exportacion import COLUMNAS_EXPORTACION
+from .perfilado import fase
+from .precios import CAMPOS_COSTOS, calcular_precios_enteros_lote, calcular_precios_lote, sumar_costos
+
+# Columnas que se leen de un CSV de importación
+COLUMNAS_IMPORTACION = {'nombre', 'costo_base', 'margen', *CAMPOS_COSTOS}
+
+# Filas por bloque en la importación por bloques
+TAMANO_BLOQUE_IMPORTACION = 50_000
+
+# Tope por defecto de la memoria de columnas leídas que guarda una CacheImportaciones propia
+MEMORIA_IMPORTACIONES = 512 * 1024 * 1024
+
+
+def columnas_importacion(df):
+    """Extrae las columnas válidas de un CSV de importación como arreglos
+
+    El margen queda en NaN donde el CSV no lo trae, para aplicar el margen por defecto al valorar.
+    """
+    nombres = df['nombre']
+    costo_base = pd.to_numeric(df['costo_base'], errors='coerce')
+    validos = (nombres.notna() & (nombres.astype(str) != '') & (costo_base > 0)).to_numpy()
+
+    if 'margen' in df.columns:
+        margen = pd.to_numeric(df['margen'], errors='coerce').to_numpy(dtype=np.float64)[validos]
+    else:
+        margen = np.full(int(validos.sum()), np.nan)
+
+    costos = np.zeros((int(validos.sum()), len(CAMPOS_COSTOS)))
+    for j, campo_key in enumerate(CAMPOS_COSTOS):
+        if campo_key in df.columns:
+            costos[:, j] = pd.to_numeric(df[campo_key], errors='coerce').fillna(0).to_numpy()[validos]
+
+    return {
+        'nombre': nombres.astype(str).to_numpy()[validos],
+        'costo_base': costo_base.to_numpy(dtype=np.float64)[validos],
+        'costos_adicionales': sumar_costos(costos),
+        'costos': costos,
+        'margen': margen
+    }
+
+
+def valorar_columnas(columnas, margen_defecto, iva, metodo_calculo, enteros=False):
+    """Calcula los precios de columnas leídas con columnas_importacion
+
+    Con enteros se usa el motor de pesos enteros (calcular_precios_enteros_lote). El resultado
+    incluye el costo base y los costos por campo tal como se leyeron, el margen pedido y el
+    redondeo usado, que el catálogo guarda para recalcular y para los reportes de estructura
+    de costos.
+    """
+    margen = np.where(np.isnan(columnas['margen']), margen_defecto, columnas['margen'])
+    if enteros:
+        productos = calcular_precios_enteros_lote(columnas['costo_base'], columnas['costos'], margen, iva, metodo_calculo)
+    else:
+        productos = calcular_precios_lote(
+            columnas['costo_base'], columnas['costos_adicionales'], margen, iva, metodo_calculo
+        )
+    productos['costo_base_original'] = columnas['costo_base']
+    productos['margen'] = margen
+    productos['enteros'] = np.full(len(margen), float(bool(enteros)))
+    productos['costos'] = columnas['costos']
+    return productos
+
+
+def leer_csv_importacion(archivo, tamano_bloque=None):
+    """Genera (filas_leidas, columnas) para un CSV de importación, completo o por bloques"""
+    lector = pd.read_csv(
+        archivo,
+        usecols=lambda col: col in COLUMNAS_IMPORTACION,
+        dtype={'nombre': str},
+        chunksize=tamano_bloque
+    )
+    bloques = [lector] if tamano_bloque is None else lector
+
+    try:
+        for df in bloques:
+            if 'nombre' not in df.columns or 'costo_base' not in df.columns:
+                return
+            yield len(df), columnas_importacion(df)
+    finally:
+        if tamano_bloque is not None:
+            lector.close()
+
+
+def leer_parquet_importacion(parquet, tamano_bloque=None):
+    """Genera (filas_leidas, columnas) para un Parquet con columnas de importación, por lotes de filas"""
+    presentes = [col for col in parquet.schema_arrow.names if col in COLUMNAS_IMPORTACION]
+    if 'nombre' not in presentes or 'costo_base' not in presentes:
+        return
+    for lote in parquet.iter_batches(batch_size=tamano_bloque or TAMANO_BLOQUE_IMPORTACION, columns=presentes):
+        yield lote.num_rows, columnas_importacion(lote.to_pandas())
+
+
+def leer_parquet_catalogo(parquet, tamano_bloque=None):
+    """Genera (filas_leidas, columnas, productos) de un Parquet exportado por la app, sin recalcular precios
+
+    Las columnas leídas se reconstruyen con el margen o markup de cada fila, para poder
+    volver a valorarlas con otra configuración. El archivo no trae el desglose por campo,
+    así que los costos adicionales quedan como gastos generales, ni el redondeo usado, así
+    que las filas quedan como calculadas en decimales.
+    """
+    columna_producto = dict(zip(COLUMNAS_EXPORTACION, COLUMNAS_PRODUCTO))
+    for lote in parquet.iter_batches(batch_size=tamano_bloque or TAMANO_BLOQUE_IMPORTACION, columns=COLUMNAS_EXPORTACION):
+        df = lote.to_pandas().rename(columns=columna_producto)
+        productos = {col: df[col].to_numpy() for col in COLUMNAS_PRODUCTO}
+        productos['nombre'] = df['nombre'].astype(str).to_numpy(dtype=object)
+        productos['metodo_calculo'] = df['metodo_calculo'].astype(str).to_numpy(dtype=object)
+        costos = np.zeros((len(df), len(CAMPOS_COSTOS)))
+        costos[:, CAMPOS_COSTOS.index('gastos_generales')] = productos['costos_adicionales']
+        columnas = {
+            'nombre': productos['nombre'],
+            'costo_base': productos['costo_base'],
+            'costos_adicionales': productos['costos_adicionales'],
+            'costos': costos,
+            'margen': np.where(
+                productos['metodo_calculo'] == 'margen',
+                productos['margen_real_sobre_ventas'],
+                productos['markup_real_sobre_costo']
+            )
+        }
+        productos['costo_base_original'] = productos['costo_base']
+        productos['margen'] = columnas['margen']
+        productos['enteros'] = np.zeros(len(df))
+        productos['costos'] = costos
+        # El IVA no se exporta: se deduce del precio neto y el valor del IVA
+        with np.errstate(divide='ignore', invalid='ignore'):
+            iva = np.round(productos['valor_iva'] / productos['precio_sin_iva'] * 100, 6)
+        productos['iva'] = np.where(np.isfinite(iva), iva, 0.0)
+        yield lote.num_rows, columnas, productos
+
+
+def memoria_columnas(columnas):
+    """Bytes aproximados que ocupan unas columnas leídas, incluidos los textos de los nombres"""
+    total = 0
+    for valores in columnas.values():
+        total += valores.nbytes
+        if valores.dtype == object:
+            total += sum(map(sys.getsizeof, valores))
+    return total
+
+
+class ColumnasLeidas:
+    """Junta las columnas leídas bloque a bloque mientras no superen limite bytes
+
+    Al superarlo se descartan y ya no se guardan más: la importación sigue, pero en memoria
+    solo queda el bloque en curso.
+    """
+
+    def __init__(self, unir=True, limite=None):
+        self.leidas = [] if unir else None
+        self.limite = limite
+        self.memoria = 0
+
+    def agregar(self, columnas):
+        if self.leidas is None:
+            return
+        self.leidas.append(columnas)
+        if self.limite is not None:
+            self.memoria += memoria_columnas(columnas)
+            if self.memoria > self.limite:
+                self.leidas = None
+
+    def unidas(self):
+        return concatenar_columnas(self.leidas) if self.leidas is not None else None
+
+
+def _importar(bloques, agregar_lote, al_avanzar, valorar=None, unir=True, limite_columnas=None):
+    """Agrega cada bloque leído al catálogo y devuelve las columnas leídas
+
+    bloques genera (filas, columnas) que se valoran con valorar, o bien
+    (filas, columnas, productos) ya calculados cuando valorar es None. Con unir=False, o
+    si las columnas leídas superan limite_columnas bytes, no se juntan y se devuelve None.
+    """
+    filas_leidas = 0
+    productos_importados = 0
+    leidas = ColumnasLeidas(unir, limite_columnas)
+    bloques = iter(bloques)
+    while True:
+        with fase('lectura'):
+            bloque = next(bloques, None)
+        if bloque is None:
+            break
+        if valorar is None:
+            filas, columnas, productos = bloque
+        else:
+            filas, columnas = bloque
+            with fase('calculo_precios'):
+                productos = valorar(columnas)
+        with fase('catalogo'):
+            agregar_lote(columnas['nombre'], productos)
+
+        filas_leidas += filas
+        productos_importados += len(columnas['nombre'])
+        leidas.agregar(columnas)
+        if al_avanzar is not None:
+            al_avanzar(filas_leidas, productos_importados)
+
+    return leidas.unidas()
+
+
+def concatenar_columnas(leidas):
+    """Une una lista de columnas leídas con columnas_importacion en una sola"""
+    if not leidas:
+        return {
+            'nombre': np.empty(0, dtype=object),
+            'costo_base': np.empty(0),
+            'costos_adicionales': np.empty(0),
+            'costos': np.empty((0, len(CAMPOS_COSTOS))),
+            'margen': np.empty(0)
+        }
+    return {col: np.concatenate([columnas[col] for columnas in leidas]) for col in leidas[0]}
+
+
+def importar_csv(archivo, agregar_lote, margen_defecto, iva, metodo_calculo, tamano_bloque=None, al_avanzar=None,
+                 enteros=False, limite_columnas=None):
+    """Lee y valora un CSV de importación, completo o por bloques de tamano_bloque filas
+
+    Devuelve las columnas leídas de todas las filas válidas, para guardarlas en la caché de
+    importaciones, o None si ocupan más de limite_columnas bytes: en ese caso, leyendo por
+    bloques, la memoria no depende del tamaño del archivo.
+    """
+    return _importar(
+        leer_csv_importacion(archivo, tamano_bloque),
+        agregar_lote,
+        al_avanzar,
+        valorar=lambda columnas: valorar_columnas(columnas, margen_defecto, iva, metodo_calculo, enteros),
+        limite_columnas=limite_columnas
+    )
+
+
+def importar_parquet(archivo, agregar_lote, margen_defecto, iva, metodo_calculo, tamano_bloque=None, al_avanzar=None,
+                     enteros=False, limite_columnas=None):
+    """Importa un Parquet por lotes de filas, sin pasar por texto
+
+    Un Parquet exportado por la app se restaura tal cual; uno con las columnas de importación
+    se valora igual que un CSV. Devuelve las columnas leídas (o None), como importar_csv.
+    """
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(archivo)
+    if all(col in parquet.schema_arrow.names for col in COLUMNAS_EXPORTACION):
+        return _importar(leer_parquet_catalogo(parquet, tamano_bloque), agregar_lote, al_avanzar,
+                         limite_columnas=limite_columnas)
+    return _importar(
+        leer_parquet_importacion(parquet, tamano_bloque),
+        agregar_lote,
+        al_avanzar,
+        valorar=lambda columnas: valorar_columnas(columnas, margen_defecto, iva, metodo_calculo, enteros),
+        limite_columnas=limite_columnas
+    )
+
+
+def importar_columnas(columnas, agregar_lote, margen_defecto, iva, metodo_calculo, tamano_bloque=None, al_avanzar=None,
+                      enteros=False):
+    """Valora columnas ya leídas por bloques de filas, como importar_csv, y las devuelve
+
+    columnas puede ser también una función sin argumentos que las lee, para que la lectura
+    corra en el mismo hilo que la valoración.
+    """
+    if callable(columnas):
+        columnas = columnas()
+    tamano_bloque = tamano_bloque or TAMANO_BLOQUE_IMPORTACION
+    filas = len(columnas['nombre'])
+    _importar(
+        (
+            (min(tamano_bloque, filas - inicio), {col: valores[inicio:inicio + tamano_bloque] for col, valores in columnas.items()})
+            for inicio in range(0, filas, tamano_bloque)
+        ),
+        agregar_lote,
+        al_avanzar,
+        valorar=lambda bloque: valorar_columnas(bloque, margen_defecto, iva, metodo_calculo, enteros),
+        unir=False
+    )
+    return columnas
+
+
+def leer_columnas(archivo, parquet=False, tamano_bloque=None):
+    """Columnas leídas de un CSV o Parquet de importación, sin calcular precios
+
+    De un Parquet exportado por la app se toman las columnas reconstruidas por
+    leer_parquet_catalogo.
+    """
+    if parquet:
+        import pyarrow.parquet as pq
+
+        archivo = pq.ParquetFile(archivo)
+        if all(col in archivo.schema_arrow.names for col in COLUMNAS_EXPORTACION):
+            leidas = [columnas for _, columnas, _ in leer_parquet_catalogo(archivo, tamano_bloque)]
+        else:
+            leidas = [columnas for _, columnas in leer_parquet_importacion(archivo, tamano_bloque)]
+    else:
+        leidas = [columnas for _, columnas in leer_csv_importacion(archivo, tamano_bloque or TAMANO_BLOQUE_IMPORTACION)]
+    return concatenar_columnas(leidas)
+
+
+def huella_contenido(datos):
+    """Huella SHA-256 del contenido de un archivo"""
+    return hashlib.sha256(datos).hexdigest()
+
+
+class CacheImportaciones:
+    """Recuerda qué archivos ya se importaron y guarda sus columnas leídas
+
+    Las columnas se indexan por huella de contenido; las importaciones hechas, por
+    huella más configuración de precios (IVA, método, margen por defecto y redondeo).
+    Con compartida (una referencias.CacheReferencias) las columnas se guardan ahí, para
+    que otras sesiones que suban el mismo archivo no lo vuelvan a leer. Las columnas que
+    superan memoria_maxima no se guardan.
+    """
+
+    MAX_ARCHIVOS = 4
+
+    def __init__(self, max_archivos=MAX_ARCHIVOS, compartida=None, memoria_maxima=MEMORIA_IMPORTACIONES):
+        self.max_archivos = max_archivos
+        self.compartida = compartida
+        self._memoria_maxima = memoria_maxima
+        self._columnas = OrderedDict()
+        self._huella_por_archivo = {}
+        self._importadas = set()
+
+    @property
+    def memoria_maxima(self):
+        """Bytes que pueden ocupar las columnas de un archivo para guardarse en la caché"""
+        return self.compartida.memoria_maxima if self.compartida is not None else self._memoria_maxima
+
+    def admite(self, tamano_archivo):
+        """Indica si vale la pena juntar las columnas de un archivo de ese tamaño para guardarlas
+
+        Las columnas leídas ocupan al menos lo que el archivo, así que uno más grande que
+        el tope se importa sin juntarlas.
+        """
+        return tamano_archivo <= self.memoria_maxima
+
+    def huella(self, archivo):
+        """Huella de un archivo subido; se calcula una sola vez por subida"""
+        huella = self._huella_por_archivo.get(archivo.file_id)
+        if huella is None:
+            huella = huella_contenido(archivo.getbuffer())
+            self._huella_por_archivo[archivo.file_id] = huella
+        return huella
+
+    def columnas(self, huella, contar=True):
+        """Columnas leídas del archivo, o None si no están en caché
+
+        Con contar=False es solo una consulta: no cuenta como acierto o fallo en la caché
+        compartida ni renueva el uso.
+        """
+        if self.compartida is not None:
+            return self.compartida.obtener(huella, contar)
+        columnas = self._columnas.get(huella)
+        if columnas is not None and contar:
+            self._columnas.move_to_end(huella)
+        return columnas
+
+    def guardar(self, huella, columnas):
+        """Guarda las columnas leídas, descartando las del archivo usado hace más tiempo"""
+        if self.compartida is not None:
+            self.compartida.guardar(huella, columnas)
+            return
+        if memoria_columnas(columnas) > self._memoria_maxima:
+            return
+        self._columnas[huella] = columnas
+        self._columnas.move_to_end(huella)
+        while len(self._columnas) > self.max_archivos:
+            self._columnas.popitem(last=False)
+
+    def importada(self, huella, config=None):
+        """Indica si el archivo ya se importó, con la configuración dada o con cualquiera"""
+        if config is None:
+            return any(clave[0] == huella for clave in self._importadas)
+        return (huella, *config) in self._importadas
+
+    def marcar_importada(self, huella, config):
+        self._importadas.add((huella, *config))
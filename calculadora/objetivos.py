@@ -0,0 +1,77 @@
+"""Precios objetivo de mercado: margen implícito o costo máximo por fila"""
+import numpy as np
+import pandas as pd
+
+from .precios import CAMPOS_COSTOS, costo_maximo_lote, margen_para_precio_lote, sumar_costos
+
+# Columnas que se leen de un archivo de precios objetivo
+COLUMNAS_OBJETIVO = {'nombre', 'precio_objetivo', 'costo_base', 'margen', *CAMPOS_COSTOS}
+
+# Cálculos disponibles: clave -> descripción
+CALCULOS_OBJETIVO = {
+    'margen': 'Margen implícito (requiere costo_base)',
+    'costo': 'Costo máximo para el margen objetivo'
+}
+
+
+def leer_precios_objetivo(archivo, parquet=False):
+    """Lee un CSV o Parquet de precios objetivo como columnas; None si falta nombre o precio_objetivo
+
+    Se conservan las filas con precio no positivo para marcarlas como inalcanzables. El costo
+    total (costo_base más campos de costo) y el margen quedan en NaN donde no vienen.
+    """
+    if parquet:
+        df = pd.read_parquet(archivo)
+        df = df[[col for col in df.columns if col in COLUMNAS_OBJETIVO]]
+    else:
+        df = pd.read_csv(archivo, usecols=lambda col: col in COLUMNAS_OBJETIVO, dtype={'nombre': str})
+    if 'nombre' not in df.columns or 'precio_objetivo' not in df.columns:
+        return None
+
+    nombres = df['nombre']
+    precio = pd.to_numeric(df['precio_objetivo'], errors='coerce')
+    validos = (nombres.notna() & (nombres.astype(str) != '') & precio.notna()).to_numpy()
+    filas = int(validos.sum())
+
+    def numerica(col):
+        if col not in df.columns:
+            return np.full(filas, np.nan)
+        return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64)[validos]
+
+    costos = np.zeros((filas, len(CAMPOS_COSTOS)))
+    for j, campo_key in enumerate(CAMPOS_COSTOS):
+        if campo_key in df.columns:
+            costos[:, j] = np.nan_to_num(numerica(campo_key))
+
+    return {
+        'nombre': nombres.astype(str).to_numpy()[validos],
+        'precio_objetivo': precio.to_numpy(dtype=np.float64)[validos],
+        'costo_total': numerica('costo_base') + sumar_costos(costos),
+        'margen': numerica('margen')
+    }
+
+
+def resolver_precios_objetivo(columnas, calculo, iva, metodo_calculo, margen_defecto):
+    """DataFrame con el resultado del cálculo inverso de cada fila y si el objetivo es alcanzable
+
+    calculo es 'margen' (margen o markup implícito dado el costo) o 'costo' (costo total
+    máximo para el margen de la fila, o margen_defecto donde no viene).
+    """
+    etiqueta_margen = 'Margen %' if metodo_calculo == 'margen' else 'Markup %'
+    tabla = {'Nombre': columnas['nombre'], 'Precio Objetivo': columnas['precio_objetivo']}
+
+    if calculo == 'margen':
+        resultado = margen_para_precio_lote(columnas['precio_objetivo'], columnas['costo_total'], iva, metodo_calculo)
+        tabla['Precio Neto'] = resultado['precio_sin_iva']
+        tabla['Costo Total'] = columnas['costo_total']
+        tabla[f'{etiqueta_margen} Implícito'] = resultado['margen']
+    else:
+        margen = np.where(np.isnan(columnas['margen']), margen_defecto, columnas['margen'])
+        resultado = costo_maximo_lote(columnas['precio_objetivo'], margen, iva, metodo_calculo)
+        tabla['Precio Neto'] = resultado['precio_sin_iva']
+        tabla[f'{etiqueta_margen} Objetivo'] = margen
+        tabla['Costo Máximo'] = resultado['costo_maximo']
+
+    tabla['Ganancia'] = resultado['ganancia']
+    tabla['Alcanzable'] = resultado['alcanzable']
+    return pd.DataFrame(tabla)
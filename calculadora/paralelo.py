@@ -0,0 +1,140 @@
+"""Valoración de CSV grandes en paralelo, repartiendo rangos de filas entre procesos"""
+import io
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from .catalogo import CatalogoProductos
+from .exportacion import COLUMNAS_EXPORTACION, crear_csv_productos
+from .importacion import ColumnasLeidas, leer_csv_importacion, valorar_columnas
+
+# Bytes de CSV por fragmento enviado a cada proceso
+TAMANO_FRAGMENTO = 8 * 1024 * 1024
+
+
+def fragmentar_csv(datos, tamano_fragmento=TAMANO_FRAGMENTO):
+    """Divide un CSV en (encabezado, rangos de bytes) cortando siempre en un salto de línea
+
+    Un corte que cae dentro de un campo entre comillas se corre al siguiente salto de línea.
+    """
+    datos = memoryview(datos).cast('B')
+    fin_encabezado = bytes(datos[:1024 * 1024]).find(b'\n') + 1 or len(datos)
+    encabezado = bytes(datos[:fin_encabezado])
+
+    rangos = []
+    inicio = fin_encabezado
+    comillas = 0
+    while inicio < len(datos):
+        fin = min(inicio + tamano_fragmento, len(datos))
+        while fin < len(datos):
+            salto = bytes(datos[fin:fin + 65536]).find(b'\n')
+            if salto < 0:
+                fin += 65536
+                continue
+            fin += salto + 1
+            # Con una cantidad impar de comillas el corte queda dentro de un campo
+            if (comillas + bytes(datos[inicio:fin]).count(b'"')) % 2 == 0:
+                break
+        fin = min(fin, len(datos))
+        comillas += bytes(datos[inicio:fin]).count(b'"')
+        rangos.append((inicio, fin))
+        inicio = fin
+    return encabezado, rangos
+
+
+def _leer_fragmento(encabezado, fragmento):
+    """Columnas válidas de un fragmento; None si faltan las columnas obligatorias"""
+    for filas, columnas in leer_csv_importacion(io.BytesIO(encabezado + fragmento)):
+        return filas, columnas
+    return None
+
+
+def _valorar_fragmento(encabezado, fragmento, margen_defecto, iva, metodo_calculo, enteros):
+    leido = _leer_fragmento(encabezado, fragmento)
+    if leido is None:
+        return None
+    filas, columnas = leido
+    return filas, columnas, valorar_columnas(columnas, margen_defecto, iva, metodo_calculo, enteros)
+
+
+def _exportar_fragmento(encabezado, fragmento, margen_defecto, iva, metodo_calculo, enteros):
+    valorado = _valorar_fragmento(encabezado, fragmento, margen_defecto, iva, metodo_calculo, enteros)
+    if valorado is None:
+        return None
+    _, columnas, resultado = valorado
+    catalogo = CatalogoProductos()
+    catalogo.agregar_lote(columnas['nombre'], resultado)
+    if not catalogo:
+        return 0, ''
+    return len(catalogo), crear_csv_productos(catalogo).to_csv(header=False, index=False)
+
+
+def _en_orden(funcion, datos, argumentos, trabajadores, tamano_fragmento):
+    """Aplica funcion a cada fragmento en un pool de procesos y entrega los resultados en orden
+
+    Se mantienen como máximo dos fragmentos pendientes por proceso, para acotar la memoria.
+    """
+    encabezado, rangos = fragmentar_csv(datos, tamano_fragmento)
+    trabajadores = trabajadores or os.cpu_count() or 1
+    datos = memoryview(datos).cast('B')
+
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=trabajadores, mp_context=contexto) as pool:
+        pendientes = deque()
+        for inicio, fin in rangos:
+            pendientes.append(pool.submit(funcion, encabezado, bytes(datos[inicio:fin]), *argumentos))
+            if len(pendientes) >= 2 * trabajadores:
+                yield pendientes.popleft().result()
+        while pendientes:
+            yield pendientes.popleft().result()
+
+
+def importar_csv_paralelo(datos, agregar_lote, margen_defecto, iva, metodo_calculo,
+                          trabajadores=None, tamano_fragmento=TAMANO_FRAGMENTO, al_avanzar=None, enteros=False,
+                          limite_columnas=None):
+    """Como importar_csv, pero leyendo y valorando fragmentos del CSV en varios procesos
+
+    datos es el contenido completo del CSV (bytes, memoryview o mmap). Los lotes se agregan
+    en el orden original, así que el catálogo resultante es idéntico al de importar_csv.
+    Devuelve las columnas leídas, o None si superan limite_columnas bytes.
+    """
+    filas_leidas = 0
+    productos_importados = 0
+    leidas = ColumnasLeidas(limite=limite_columnas)
+    argumentos = (margen_defecto, iva, metodo_calculo, enteros)
+    for valorado in _en_orden(_valorar_fragmento, datos, argumentos, trabajadores, tamano_fragmento):
+        if valorado is None:
+            break
+        filas, columnas, resultado = valorado
+        filas_leidas += filas
+        agregar_lote(columnas['nombre'], resultado)
+        productos_importados += len(columnas['nombre'])
+        leidas.agregar(columnas)
+
+        if al_avanzar is not None:
+            al_avanzar(filas_leidas, productos_importados)
+
+    return leidas.unidas()
+
+
+def exportar_csv_paralelo(datos, salida, margen_defecto, iva, metodo_calculo,
+                          trabajadores=None, tamano_fragmento=TAMANO_FRAGMENTO, enteros=False):
+    """Valora un CSV de importación en varios procesos y escribe el CSV exportado en salida
+
+    Cada proceso también da formato a su parte del CSV de salida; el resultado es idéntico
+    al de la valoración en un solo proceso. Devuelve la cantidad de productos escritos.
+    """
+    productos_escritos = 0
+    argumentos = (margen_defecto, iva, metodo_calculo, enteros)
+    for exportado in _en_orden(_exportar_fragmento, datos, argumentos, trabajadores, tamano_fragmento):
+        if exportado is None:
+            break
+        productos, texto = exportado
+        if productos and productos_escritos == 0:
+            pd.DataFrame(columns=COLUMNAS_EXPORTACION).to_csv(salida, index=False)
+        salida.write(texto)
+        productos_escritos += productos
+    return productos_escritos
@@ -0,0 +1,86 @@
+"""Medición opcional del tiempo de cada fase de una ejecución
+
+Las funciones del paquete marcan sus fases con `with fase('nombre'):`. Si el perfilado
+no está activo en el hilo actual, fase() devuelve un contexto vacío compartido y el
+costo es una búsqueda de atributo.
+"""
+import json
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+_local = threading.local()
+_NULO = nullcontext()
+
+
+class _Medicion:
+    __slots__ = ('perfilador', 'nombre', 'inicio')
+
+    def __init__(self, perfilador, nombre):
+        self.perfilador = perfilador
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.perfilador.sumar(self.nombre, time.perf_counter() - self.inicio)
+
+
+class Perfilador:
+    """Acumula segundos y llamadas por fase durante una ejecución del script"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fases = {}
+
+    def fase(self, nombre):
+        return _Medicion(self, nombre)
+
+    def sumar(self, nombre, segundos):
+        acumulado = self.fases.setdefault(nombre, [0.0, 0])
+        acumulado[0] += segundos
+        acumulado[1] += 1
+
+    def incorporar(self, otro):
+        """Suma las fases de otro perfilador (p. ej. el de un hilo de importación)"""
+        for nombre, (segundos, llamadas) in otro.fases.items():
+            acumulado = self.fases.setdefault(nombre, [0.0, 0])
+            acumulado[0] += segundos
+            acumulado[1] += llamadas
+
+    def total(self):
+        return time.perf_counter() - self.inicio
+
+    def resumen(self):
+        """Lista de {'fase', 'segundos', 'llamadas'} en el orden en que empezó cada fase"""
+        return [
+            {'fase': nombre, 'segundos': segundos, 'llamadas': llamadas}
+            for nombre, (segundos, llamadas) in self.fases.items()
+        ]
+
+    def escribir_jsonl(self, ruta, **contexto):
+        """Agrega la ejecución como una línea JSON al archivo ruta"""
+        registro = {
+            'fecha': datetime.now().isoformat(timespec='milliseconds'),
+            'total_segundos': self.total(),
+            'fases': self.resumen(),
+            **contexto
+        }
+        with open(ruta, 'a', encoding='utf-8') as archivo:
+            archivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+
+def iniciar_perfilado(activo):
+    """Activa o desactiva el perfilado en el hilo actual; devuelve el Perfilador o None"""
+    _local.perfilador = Perfilador() if activo else None
+    return _local.perfilador
+
+
+def fase(nombre):
+    """Contexto que mide la fase nombre si hay un perfilado activo en este hilo"""
+    perfilador = getattr(_local, 'perfilador', None)
+    if perfilador is None:
+        return _NULO
+    return perfilador.fase(nombre)
@@ -0,0 +1,416 @@
+"""Cálculo de precios: versión escalar, vectorizada sobre columnas NumPy e inversa"""
+import numpy as np
+
+# Categorías de costos
+CATEGORIAS_COSTOS = {
+    'logisticos': {
+        'titulo': 'Costos Logísticos',
+        'descripcion': 'Transporte, almacenamiento y distribución',
+        'campos': [
+            ('transporte', 'Transporte', 'Costo de traslado de mercancías'),
+            ('almacenamiento', 'Almacenamiento', 'Costo de bodegaje y manejo de inventario'),
+            ('combustible', 'Combustible', 'Gastos de combustible para transporte'),
+            ('envio', 'Envío', 'Costo de entrega al cliente final')
+        ]
+    },
+    'personal': {
+        'titulo': 'Costos de Personal',
+        'descripcion': 'Mano de obra y servicios profesionales',
+        'campos': [
+            ('mano_obra', 'Mano de Obra', 'Costo directo de trabajadores en producción'),
+            ('hora_hombre', 'Hora Hombre', 'Servicios profesionales y consultoría')
+        ]
+    },
+    'operativos': {
+        'titulo': 'Costos Operativos',
+        'descripcion': 'Marketing, seguros y promoción',
+        'campos': [
+            ('marketing', 'Marketing', 'Gastos en publicidad y promoción'),
+            ('publicidad', 'Publicidad Digital', 'Anuncios online y campañas digitales'),
+            ('seguros', 'Seguros', 'Pólizas de seguro para productos/servicios')
+        ]
+    },
+    'administrativos': {
+        'titulo': 'Costos Administrativos',
+        'descripcion': 'Gastos generales de funcionamiento',
+        'campos': [
+            ('alquiler', 'Alquiler/Instalaciones', 'Arriendo de oficinas o locales'),
+            ('servicios_basicos', 'Servicios Básicos', 'Luz, agua, gas'),
+            ('internet', 'Internet', 'Conexión a internet y telecomunicaciones'),
+            ('telefono', 'Teléfono', 'Servicios telefónicos')
+        ]
+    },
+    'financieros': {
+        'titulo': 'Costos Financieros',
+        'descripcion': 'Intereses y comisiones bancarias',
+        'campos': [
+            ('intereses', 'Intereses', 'Intereses por financiamiento'),
+            ('comisiones_bancarias', 'Comisiones Bancarias', 'Gastos bancarios y financieros')
+        ]
+    },
+    'otros': {
+        'titulo': 'Otros Costos',
+        'descripcion': 'Mantenimiento y gastos varios',
+        'campos': [
+            ('mantenimiento', 'Mantenimiento', 'Reparaciones y mantenimiento de equipos'),
+            ('depreciacion', 'Depreciación', 'Depreciación de equipos y maquinaria'),
+            ('gastos_generales', 'Gastos Generales', 'Otros gastos no categorizados')
+        ]
+    }
+}
+
+# Campos de costo en el orden en que se suman
+CAMPOS_COSTOS = [campo_key for categoria in CATEGORIAS_COSTOS.values() for campo_key, _, _ in categoria['campos']]
+
+# Indicadora campo × categoría: MATRIZ_CATEGORIAS[j, k] = 1 si CAMPOS_COSTOS[j] es de la k-ésima categoría
+MATRIZ_CATEGORIAS = np.array([
+    [float(any(campo_key == clave for clave, _, _ in categoria['campos'])) for categoria in CATEGORIAS_COSTOS.values()]
+    for campo_key in CAMPOS_COSTOS
+])
+
+
+def calcular_precios(costo_base, costos_adicionales, margen, iva, metodo_calculo):
+    """Calcula precios usando metodología empresarial correcta"""
+    costo_base = float(costo_base) if costo_base else 0
+    costos_adicionales = float(costos_adicionales) if costos_adicionales else 0
+    margen = float(margen) if margen else 0
+    iva = float(iva) if iva else 0
+    
+    # Costo total = Costo base + Costos adicionales
+    costo_total = costo_base + costos_adicionales
+    
+    if metodo_calculo == 'margen':
+        # MÉTODO MARGEN (sobre precio de venta) - Metodología profesional
+        # Precio = Costo / (1 - Margen%)
+        if margen >= 100:
+            margen = 99  # Evitar división por cero
+        precio_sin_iva = costo_total / (1 - margen / 100)
+        margen_real_sobre_ventas = margen
+        markup_real_sobre_costo = ((precio_sin_iva - costo_total) / costo_total) * 100 if costo_total > 0 else 0
+    else:
+        # MÉTODO MARKUP (sobre costo) - Metodología tradicional
+        # Precio = Costo × (1 + Markup%)
+        precio_sin_iva = costo_total * (1 + margen / 100)
+        markup_real_sobre_costo = margen
+        margen_real_sobre_ventas = ((precio_sin_iva - costo_total) / precio_sin_iva) * 100 if precio_sin_iva > 0 else 0
+    
+    # Precio con IVA
+    precio_con_iva = precio_sin_iva * (1 + iva / 100)
+    
+    # Ganancia bruta
+    ganancia = precio_sin_iva - costo_total
+    
+    # Valor del IVA
+    valor_iva = precio_con_iva - precio_sin_iva
+    
+    # Descuento máximo sin pérdidas
+    descuento_maximo = ((precio_con_iva - costo_total) / precio_con_iva) * 100 if precio_con_iva > 0 else 0
+    precio_con_descuento_maximo = precio_con_iva * (1 - descuento_maximo / 100)
+    
+    return {
+        'costo_base': costo_base,
+        'costos_adicionales': costos_adicionales,
+        'costo_total': costo_total,
+        'precio_sin_iva': precio_sin_iva,
+        'precio_con_iva': precio_con_iva,
+        'valor_iva': valor_iva,
+        'ganancia': ganancia,
+        'margen_porcentaje': margen,
+        'margen_real_sobre_ventas': margen_real_sobre_ventas,
+        'markup_real_sobre_costo': markup_real_sobre_costo,
+        'descuento_maximo': descuento_maximo,
+        'precio_con_descuento_maximo': precio_con_descuento_maximo,
+        'iva': iva,
+        'metodo_calculo': metodo_calculo
+    }
+
+
+def sumar_costos(costos):
+    """Suma una matriz de campos de costo por fila, en el mismo orden que sum(costos_adicionales.values())"""
+    total = np.zeros(costos.shape[0])
+    for j in range(costos.shape[1]):
+        total += costos[:, j]
+    return total
+
+
+def subtotales_categorias(costos):
+    """Subtotal de cada categoría (en el orden de CATEGORIAS_COSTOS) para una matriz de costos por campo"""
+    return np.asarray(costos, dtype=np.float64) @ MATRIZ_CATEGORIAS
+
+
+def calcular_neto_lote(costo_total, margen, es_margen):
+    """Etapa del precio neto: depende del costo total, el margen y la metodología (no del IVA)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # MÉTODO MARGEN: Precio = Costo / (1 - Margen%), con margen >= 100 acotado a 99
+        margen = np.where(es_margen & (margen >= 100), 99.0, margen)
+        precio_sin_iva = np.where(
+            es_margen,
+            costo_total / (1 - margen / 100),
+            costo_total * (1 + margen / 100)
+        )
+        margen_real_sobre_ventas = np.where(
+            es_margen,
+            margen,
+            np.where(precio_sin_iva > 0, ((precio_sin_iva - costo_total) / precio_sin_iva) * 100, 0.0)
+        )
+        markup_real_sobre_costo = np.where(
+            es_margen,
+            np.where(costo_total > 0, ((precio_sin_iva - costo_total) / costo_total) * 100, 0.0),
+            margen
+        )
+    return {
+        'precio_sin_iva': precio_sin_iva,
+        'ganancia': precio_sin_iva - costo_total,
+        'margen_porcentaje': margen,
+        'margen_real_sobre_ventas': margen_real_sobre_ventas,
+        'markup_real_sobre_costo': markup_real_sobre_costo
+    }
+
+
+def calcular_iva_lote(costo_total, precio_sin_iva, iva):
+    """Etapa del IVA: depende del precio neto y el IVA (no de la metodología)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precio_con_iva = precio_sin_iva * (1 + iva / 100)
+        valor_iva = precio_con_iva - precio_sin_iva
+        descuento_maximo = np.where(
+            precio_con_iva > 0, ((precio_con_iva - costo_total) / precio_con_iva) * 100, 0.0
+        )
+        precio_con_descuento_maximo = precio_con_iva * (1 - descuento_maximo / 100)
+    return {
+        'precio_con_iva': precio_con_iva,
+        'valor_iva': valor_iva,
+        'descuento_maximo': descuento_maximo,
+        'precio_con_descuento_maximo': precio_con_descuento_maximo
+    }
+
+
+def calcular_precios_lote(costo_base, costos_adicionales, margen, iva, metodo_calculo):
+    """Versión vectorizada de calcular_precios: opera sobre columnas completas"""
+    costo_base = np.asarray(costo_base, dtype=np.float64)
+    costos_adicionales = np.asarray(costos_adicionales, dtype=np.float64)
+    if costos_adicionales.ndim == 2:
+        costos_adicionales = sumar_costos(costos_adicionales)
+    margen = np.asarray(margen, dtype=np.float64)
+    iva = np.asarray(iva, dtype=np.float64)
+    es_margen = np.asarray(metodo_calculo) == 'margen'
+
+    costo_base, costos_adicionales, margen, iva, es_margen = np.broadcast_arrays(
+        costo_base, costos_adicionales, margen, iva, es_margen
+    )
+
+    # Costo total = Costo base + Costos adicionales
+    costo_total = costo_base + costos_adicionales
+
+    neto = calcular_neto_lote(costo_total, margen, es_margen)
+    final = calcular_iva_lote(costo_total, neto['precio_sin_iva'], iva)
+
+    return {
+        'costo_base': costo_base,
+        'costos_adicionales': costos_adicionales,
+        'costo_total': costo_total,
+        'precio_sin_iva': neto['precio_sin_iva'],
+        'precio_con_iva': final['precio_con_iva'],
+        'valor_iva': final['valor_iva'],
+        'ganancia': neto['ganancia'],
+        'margen_porcentaje': neto['margen_porcentaje'],
+        'margen_real_sobre_ventas': neto['margen_real_sobre_ventas'],
+        'markup_real_sobre_costo': neto['markup_real_sobre_costo'],
+        'descuento_maximo': final['descuento_maximo'],
+        'precio_con_descuento_maximo': final['precio_con_descuento_maximo'],
+        'iva': iva,
+        'metodo_calculo': np.where(es_margen, 'margen', 'markup')
+    }
+
+
+# Motor entero: unidades por peso (1 = pesos enteros, como el CLP; 100 = centésimos)
+ESCALA_PESOS = 1
+
+# Porcentajes del motor entero en centésimas de punto: 19% = 1900, 100% = 10000
+ESCALA_PORCENTAJE = 10_000
+
+
+def a_unidades(valores, escala):
+    """Redondea valores × escala al entero más cercano (mitades lejos de cero) como int64
+
+    Antes se redondea a 6 decimales, para que un 2.675 escrito por el usuario (que en binario
+    es 2.67499999...) cuente como la mitad exacta que es.
+    """
+    valores = np.round(np.asarray(valores, dtype=np.float64) * escala, 6)
+    return (np.sign(valores) * np.floor(np.abs(valores) + 0.5)).astype(np.int64)
+
+
+def dividir_redondeando(numerador, denominador):
+    """División entera al entero más cercano, mitades lejos de cero (ROUND_HALF_UP); denominador > 0"""
+    cociente = (2 * np.abs(numerador) + denominador) // (2 * denominador)
+    return np.sign(numerador) * cociente
+
+
+def calcular_neto_enteros(costo_total, margen, es_margen, escala=ESCALA_PESOS):
+    """Etapa del precio neto en aritmética entera; mismas claves que calcular_neto_lote
+
+    El costo se lleva a unidades de escala y el margen a centésimas de punto, y el precio
+    neto se redondea una sola vez, al dividir. Los montos vuelven en pesos (float64 exactos
+    con escala 1) y los porcentajes reales se calculan desde los montos ya redondeados.
+    """
+    costo = a_unidades(costo_total, escala)
+    margen = a_unidades(margen, 100)
+    es_margen = np.asarray(es_margen)
+    costo, margen, es_margen = np.broadcast_arrays(costo, margen, es_margen)
+
+    # MÉTODO MARGEN: Precio = Costo × 100% / (100% - Margen%), con margen >= 100% acotado a 99%
+    margen = np.where(es_margen & (margen >= ESCALA_PORCENTAJE), 99 * 100, margen)
+    # MÉTODO MARKUP: Precio = Costo × (100% + Markup%) / 100%
+    precio = dividir_redondeando(
+        np.where(es_margen, costo * ESCALA_PORCENTAJE, costo * (ESCALA_PORCENTAJE + margen)),
+        np.where(es_margen, ESCALA_PORCENTAJE - margen, ESCALA_PORCENTAJE)
+    )
+    ganancia = precio - costo
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margen_real_sobre_ventas = np.where(
+            es_margen, margen / 100, np.where(precio > 0, ganancia / precio * 100, 0.0)
+        )
+        markup_real_sobre_costo = np.where(
+            es_margen, np.where(costo > 0, ganancia / costo * 100, 0.0), margen / 100
+        )
+    return {
+        'precio_sin_iva': precio / escala,
+        'ganancia': ganancia / escala,
+        'margen_porcentaje': margen / 100,
+        'margen_real_sobre_ventas': margen_real_sobre_ventas,
+        'markup_real_sobre_costo': markup_real_sobre_costo
+    }
+
+
+def calcular_iva_enteros(costo_total, precio_sin_iva, iva, escala=ESCALA_PESOS):
+    """Etapa del IVA en aritmética entera, como en una factura: IVA = redondeo(Neto × IVA%), Total = Neto + IVA"""
+    costo = a_unidades(costo_total, escala)
+    precio = a_unidades(precio_sin_iva, escala)
+    iva = a_unidades(iva, 100)
+    valor_iva = dividir_redondeando(precio * iva, ESCALA_PORCENTAJE)
+    precio_con_iva = precio + valor_iva
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        descuento_maximo = np.where(precio_con_iva > 0, (precio_con_iva - costo) / precio_con_iva * 100, 0.0)
+    return {
+        'precio_con_iva': precio_con_iva / escala,
+        'valor_iva': valor_iva / escala,
+        'descuento_maximo': descuento_maximo,
+        'precio_con_descuento_maximo': precio_con_iva / escala * (1 - descuento_maximo / 100)
+    }
+
+
+def calcular_precios_enteros_lote(costo_base, costos_adicionales, margen, iva, metodo_calculo, escala=ESCALA_PESOS):
+    """Como calcular_precios_lote, pero con montos enteros en unidades de escala y redondeo definido
+
+    Cada costo se redondea a unidades antes de sumarse, así que costo_total es exactamente
+    la suma de lo facturado. Con escala 1 todos los montos son pesos enteros y los totales
+    del catálogo cuadran exactamente mientras no superen 2**53.
+    """
+    costo_base = a_unidades(costo_base, escala)
+    costos_adicionales = a_unidades(costos_adicionales, escala)
+    if costos_adicionales.ndim == 2:
+        costos_adicionales = costos_adicionales.sum(axis=1)
+    es_margen = np.asarray(metodo_calculo) == 'margen'
+    costo_base, costos_adicionales, margen, iva, es_margen = np.broadcast_arrays(
+        costo_base, costos_adicionales, np.asarray(margen, dtype=np.float64), np.asarray(iva, dtype=np.float64), es_margen
+    )
+
+    costo_total = (costo_base + costos_adicionales) / escala
+    neto = calcular_neto_enteros(costo_total, margen, es_margen, escala)
+    final = calcular_iva_enteros(costo_total, neto['precio_sin_iva'], iva, escala)
+
+    return {
+        'costo_base': costo_base / escala,
+        'costos_adicionales': costos_adicionales / escala,
+        'costo_total': costo_total,
+        'precio_sin_iva': neto['precio_sin_iva'],
+        'precio_con_iva': final['precio_con_iva'],
+        'valor_iva': final['valor_iva'],
+        'ganancia': neto['ganancia'],
+        'margen_porcentaje': neto['margen_porcentaje'],
+        'margen_real_sobre_ventas': neto['margen_real_sobre_ventas'],
+        'markup_real_sobre_costo': neto['markup_real_sobre_costo'],
+        'descuento_maximo': final['descuento_maximo'],
+        'precio_con_descuento_maximo': final['precio_con_descuento_maximo'],
+        'iva': iva,
+        'metodo_calculo': np.where(es_margen, 'margen', 'markup')
+    }
+
+
+def calcular_precios_enteros(costo_base, costos_adicionales, margen, iva, metodo_calculo, escala=ESCALA_PESOS):
+    """Versión escalar del motor entero, con las mismas claves que calcular_precios
+
+    costos_adicionales es el total o una lista (o arreglo) con el costo de cada campo de
+    CAMPOS_COSTOS; con la lista cada campo se redondea antes de sumarse, igual que al importar.
+    """
+    costos = np.asarray(0 if costos_adicionales is None else costos_adicionales, dtype=np.float64)
+    if costos.ndim == 1:
+        costos = costos[np.newaxis]
+    resultado = calcular_precios_enteros_lote(costo_base or 0, costos, margen or 0, iva or 0, metodo_calculo, escala)
+    return {clave: valor.item() for clave, valor in resultado.items()}
+
+
+def margen_para_precio_lote(precio_con_iva, costo_total, iva, metodo_calculo):
+    """Inversa de calcular_precios: margen (o markup) con que costo_total llega a precio_con_iva
+
+    'alcanzable' es False donde ningún margen da ese precio (precio neto o costo no
+    positivos); ahí el margen queda en NaN. Un margen negativo significa vender bajo costo.
+    """
+    precio_con_iva = np.asarray(precio_con_iva, dtype=np.float64)
+    costo_total = np.asarray(costo_total, dtype=np.float64)
+    iva = np.asarray(iva, dtype=np.float64)
+    es_margen = np.asarray(metodo_calculo) == 'margen'
+    precio_con_iva, costo_total, iva, es_margen = np.broadcast_arrays(precio_con_iva, costo_total, iva, es_margen)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precio_sin_iva = precio_con_iva / (1 + iva / 100)
+        # MARGEN: Margen% = 1 - Costo / Precio; MARKUP: Markup% = Precio / Costo - 1
+        margen = np.where(
+            es_margen,
+            (1 - costo_total / precio_sin_iva) * 100,
+            (precio_sin_iva / costo_total - 1) * 100
+        )
+    alcanzable = (precio_sin_iva > 0) & (costo_total > 0) & np.isfinite(margen)
+
+    return {
+        'precio_sin_iva': precio_sin_iva,
+        'margen': np.where(alcanzable, margen, np.nan),
+        'ganancia': precio_sin_iva - costo_total,
+        'alcanzable': alcanzable
+    }
+
+
+def costo_maximo_lote(precio_con_iva, margen, iva, metodo_calculo):
+    """Inversa de calcular_precios: costo total máximo con que precio_con_iva aún da el margen
+
+    'alcanzable' es False donde el margen no se puede lograr con ningún costo (precio neto
+    no positivo, margen sobre ventas de 100% o más, o markup de -100% o menos).
+    """
+    precio_con_iva = np.asarray(precio_con_iva, dtype=np.float64)
+    margen = np.asarray(margen, dtype=np.float64)
+    iva = np.asarray(iva, dtype=np.float64)
+    es_margen = np.asarray(metodo_calculo) == 'margen'
+    precio_con_iva, margen, iva, es_margen = np.broadcast_arrays(precio_con_iva, margen, iva, es_margen)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precio_sin_iva = precio_con_iva / (1 + iva / 100)
+        # MARGEN: Costo = Precio × (1 - Margen%); MARKUP: Costo = Precio / (1 + Markup%)
+        costo_maximo = np.where(
+            es_margen,
+            precio_sin_iva * (1 - margen / 100),
+            precio_sin_iva / (1 + margen / 100)
+        )
+        alcanzable = (
+            (precio_sin_iva > 0)
+            & np.where(es_margen, margen < 100, margen > -100)
+            & np.isfinite(costo_maximo)
+        )
+
+    costo_maximo = np.where(alcanzable, costo_maximo, np.nan)
+    return {
+        'precio_sin_iva': precio_sin_iva,
+        'costo_maximo': costo_maximo,
+        'ganancia': precio_sin_iva - costo_maximo,
+        'alcanzable': alcanzable
+    }
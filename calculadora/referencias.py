@@ -0,0 +1,129 @@
+"""Listas de referencia compartidas entre sesiones, en una caché LRU con tope de memoria
+
+Las columnas leídas de una lista (las de columnas_importacion, sin precios) se guardan una
+sola vez por proceso y se comparten en modo solo lectura: cada sesión las valora con su
+propia configuración de IVA, metodología y margen.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from .importacion import leer_columnas, memoria_columnas
+
+# Tope por defecto de la memoria ocupada por las listas en caché
+MEMORIA_REFERENCIAS = 512 * 1024 * 1024
+
+EXTENSIONES_REFERENCIA = ('.csv', '.parquet')
+
+
+class CacheReferencias:
+    """Caché de columnas leídas, segura entre hilos, que descarta las usadas hace más tiempo
+
+    Las columnas guardadas quedan de solo lectura. Cuenta aciertos, fallos y desalojos para
+    poder monitorear si el tope de memoria alcanza.
+    """
+
+    def __init__(self, memoria_maxima=MEMORIA_REFERENCIAS):
+        self.memoria_maxima = memoria_maxima
+        self.memoria = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self._entradas = OrderedDict()
+        self._candado = threading.Lock()
+        # Un candado por clave en carga, para que dos sesiones no lean la misma lista a la vez
+        self._cargando = {}
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def _buscar(self, clave):
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        self._entradas.move_to_end(clave)
+        return entrada[0]
+
+    def obtener(self, clave, contar=True):
+        """Columnas guardadas con esa clave, o None si no están en caché
+
+        Con contar=False es solo una consulta: no cuenta como acierto o fallo ni renueva el uso.
+        """
+        with self._candado:
+            if not contar:
+                entrada = self._entradas.get(clave)
+                return None if entrada is None else entrada[0]
+            columnas = self._buscar(clave)
+            if columnas is None:
+                self.fallos += 1
+            else:
+                self.aciertos += 1
+            return columnas
+
+    def guardar(self, clave, columnas):
+        """Guarda las columnas y desaloja las menos usadas hasta respetar el tope; las devuelve
+
+        Una lista más grande que el tope se devuelve igual, sin guardarla ni desalojar otras.
+        """
+        for valores in columnas.values():
+            valores.setflags(write=False)
+        tamano = memoria_columnas(columnas)
+        if tamano > self.memoria_maxima:
+            return columnas
+        with self._candado:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self.memoria -= anterior[1]
+            self._entradas[clave] = (columnas, tamano)
+            self.memoria += tamano
+            while self.memoria > self.memoria_maxima:
+                _, (_, liberada) = self._entradas.popitem(last=False)
+                self.memoria -= liberada
+                self.desalojos += 1
+        return columnas
+
+    def cargar(self, clave, leer):
+        """Columnas de la clave; si no están, las obtiene con leer() una sola vez por proceso"""
+        columnas = self.obtener(clave)
+        if columnas is not None:
+            return columnas
+        with self._candado:
+            candado = self._cargando.setdefault(clave, threading.Lock())
+        with candado:
+            # Otra sesión pudo terminar de leerla mientras se esperaba el candado
+            with self._candado:
+                columnas = self._buscar(clave)
+            if columnas is None:
+                columnas = self.guardar(clave, leer())
+        with self._candado:
+            self._cargando.pop(clave, None)
+        return columnas
+
+    def contadores(self):
+        """Aciertos, fallos, desalojos, listas y memoria en uso, para monitoreo"""
+        with self._candado:
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'desalojos': self.desalojos,
+                'listas': len(self._entradas),
+                'memoria': self.memoria,
+                'memoria_maxima': self.memoria_maxima
+            }
+
+
+def listar_referencias(directorio):
+    """Nombres de los archivos CSV y Parquet del directorio de listas de referencia"""
+    if not directorio or not os.path.isdir(directorio):
+        return []
+    return sorted(
+        nombre for nombre in os.listdir(directorio)
+        if nombre.lower().endswith(EXTENSIONES_REFERENCIA) and os.path.isfile(os.path.join(directorio, nombre))
+    )
+
+
+def columnas_referencia(cache, ruta):
+    """Columnas leídas de una lista en disco, leída una sola vez mientras no cambie el archivo"""
+    estado = os.stat(ruta)
+    clave = ('archivo', os.path.abspath(ruta), estado.st_mtime_ns, estado.st_size)
+    return cache.cargar(clave, lambda: leer_columnas(ruta, parquet=ruta.lower().endswith('.parquet')))
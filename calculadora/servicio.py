@@ -0,0 +1,363 @@
+"""Servicio HTTP local de precios, sin Streamlit, para cajas (POS) y tiendas en línea
+
+Uso:
+    python -m calculadora.servicio [--host 127.0.0.1] [--puerto 8765] [--iva 19] [--metodo margen]
+                                   [--margen-defecto 30] [--enteros] [--lote-maximo 256] [--espera-ms 2]
+
+Rutas:
+    POST /precios        un producto -> las claves de calcular_precios
+    POST /precios/lote   {"productos": [...]} -> {"productos": [...]}, en el mismo orden
+    GET  /campos         categorías y campos de costo aceptados
+    GET  /metricas       latencia por ruta (p50, p90, p99) y tamaño de los micro-lotes
+    GET  /salud
+
+Cada producto trae costo_base, costos ({campo: valor} con claves de CAMPOS_COSTOS) o
+costos_adicionales (el total), y opcionalmente margen, iva, metodo_calculo y nombre; lo que
+falta toma la configuración del servicio. Las solicitudes de un producto que llegan a la vez
+se agrupan en micro-lotes para el cálculo vectorizado; el resultado es idéntico al escalar.
+"""
+import argparse
+import json
+import math
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from .precios import CAMPOS_COSTOS, CATEGORIAS_COSTOS, calcular_precios_enteros_lote, calcular_precios_lote
+
+# Productos por micro-lote y espera máxima para completarlo
+LOTE_MAXIMO = 256
+ESPERA_LOTE = 0.002
+
+# Latencias guardadas por ruta para calcular los percentiles
+MUESTRAS_LATENCIA = 10_000
+
+# Tamaño máximo del cuerpo de una solicitud
+MAX_CUERPO = 16 * 1024 * 1024
+
+
+def _numero(producto, clave, defecto=None):
+    """Valor numérico de clave; un null en el JSON cuenta como ausente y toma el defecto"""
+    valor = producto.get(clave)
+    if valor is None:
+        valor = defecto
+    if valor is None:
+        raise ValueError(f"falta '{clave}'")
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not math.isfinite(valor):
+        raise ValueError(f"'{clave}' debe ser un número")
+    return float(valor)
+
+
+def leer_producto(producto, margen_defecto, iva, metodo_calculo):
+    """Valida un producto del JSON y lo devuelve como (costo_base, costos, margen, iva, metodo, nombre)
+
+    costos es una fila con un valor por campo de CAMPOS_COSTOS; un costos_adicionales total
+    se guarda como gastos generales. Lanza ValueError con un mensaje para el cliente.
+    """
+    if not isinstance(producto, dict):
+        raise ValueError("cada producto debe ser un objeto JSON")
+    costos = [0.0] * len(CAMPOS_COSTOS)
+    por_campo = producto.get('costos', {})
+    if not isinstance(por_campo, dict):
+        raise ValueError("'costos' debe ser un objeto {campo: valor}")
+    for campo_key in por_campo:
+        if campo_key not in CAMPOS_COSTOS:
+            raise ValueError(f"campo de costo desconocido: '{campo_key}'")
+        costos[CAMPOS_COSTOS.index(campo_key)] = _numero(por_campo, campo_key)
+    if 'costos_adicionales' in producto:
+        if por_campo:
+            raise ValueError("use 'costos' o 'costos_adicionales', no ambos")
+        costos[CAMPOS_COSTOS.index('gastos_generales')] = _numero(producto, 'costos_adicionales')
+
+    metodo = producto.get('metodo_calculo')
+    if metodo is None:
+        metodo = metodo_calculo
+    if metodo not in ('margen', 'markup'):
+        raise ValueError("'metodo_calculo' debe ser 'margen' o 'markup'")
+    nombre = producto.get('nombre')
+    return (
+        _numero(producto, 'costo_base'),
+        costos,
+        _numero(producto, 'margen', margen_defecto),
+        _numero(producto, 'iva', iva),
+        metodo,
+        None if nombre is None else str(nombre)
+    )
+
+
+def valorar_productos(filas, enteros=False):
+    """Precios de una lista de productos leídos con leer_producto, con una sola llamada vectorizada"""
+    costo_base, costos, margen, iva, metodo, nombres = zip(*filas)
+    calcular = calcular_precios_enteros_lote if enteros else calcular_precios_lote
+    resultado = calcular(np.array(costo_base), np.array(costos), np.array(margen), np.array(iva), np.array(metodo))
+    claves = list(resultado)
+    columnas = [resultado[clave].tolist() for clave in claves]
+    productos = []
+    for nombre, valores in zip(nombres, zip(*columnas)):
+        producto = {} if nombre is None else {'nombre': nombre}
+        # JSON no admite NaN ni infinitos
+        producto.update(
+            (clave, valor if not isinstance(valor, float) or math.isfinite(valor) else None)
+            for clave, valor in zip(claves, valores)
+        )
+        productos.append(producto)
+    return productos
+
+
+class AgrupadorPrecios:
+    """Junta solicitudes de un producto que llegan a la vez en micro-lotes, en un hilo propio
+
+    Un lote se cierra al llegar a lote_maximo productos o al pasar espera segundos desde su
+    primer producto; con una sola solicitud en curso la espera extra es como máximo espera.
+    """
+
+    def __init__(self, enteros=False, lote_maximo=LOTE_MAXIMO, espera=ESPERA_LOTE):
+        self.enteros = enteros
+        self.lote_maximo = lote_maximo
+        self.espera = espera
+        self.lotes = 0
+        self.productos = 0
+        self.mayor_lote = 0
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(target=self._ejecutar, name='micro_lotes', daemon=True)
+        self._hilo.start()
+
+    def enviar(self, fila):
+        """Encola un producto leído con leer_producto; devuelve un Future con su resultado"""
+        futuro = Future()
+        self._cola.put((fila, futuro))
+        return futuro
+
+    def cerrar(self):
+        self._cola.put(None)
+        self._hilo.join()
+
+    def _ejecutar(self):
+        while True:
+            primero = self._cola.get()
+            if primero is None:
+                return
+            lote = [primero]
+            limite = time.perf_counter() + self.espera
+            while len(lote) < self.lote_maximo:
+                restante = limite - time.perf_counter()
+                try:
+                    siguiente = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    self._cola.put(None)
+                    break
+                lote.append(siguiente)
+
+            try:
+                resultados = valorar_productos([fila for fila, _ in lote], self.enteros)
+            except Exception as e:
+                for _, futuro in lote:
+                    futuro.set_exception(e)
+            else:
+                for (_, futuro), resultado in zip(lote, resultados):
+                    futuro.set_result(resultado)
+            self.lotes += 1
+            self.productos += len(lote)
+            self.mayor_lote = max(self.mayor_lote, len(lote))
+
+    def resumen(self):
+        return {
+            'lotes': self.lotes,
+            'productos': self.productos,
+            'promedio_lote': self.productos / self.lotes if self.lotes else 0.0,
+            'mayor_lote': self.mayor_lote
+        }
+
+
+class Latencias:
+    """Últimas latencias por ruta, para reportar percentiles"""
+
+    def __init__(self, muestras=MUESTRAS_LATENCIA):
+        self.muestras = muestras
+        self._por_ruta = {}
+        self._solicitudes = {}
+        self._candado = threading.Lock()
+
+    def registrar(self, ruta, segundos):
+        with self._candado:
+            if ruta not in self._por_ruta:
+                self._por_ruta[ruta] = deque(maxlen=self.muestras)
+                self._solicitudes[ruta] = 0
+            self._por_ruta[ruta].append(segundos)
+            self._solicitudes[ruta] += 1
+
+    def resumen(self):
+        """{ruta: solicitudes y percentiles 50, 90 y 99 en milisegundos sobre las últimas muestras}"""
+        with self._candado:
+            copias = {ruta: (self._solicitudes[ruta], np.array(muestras)) for ruta, muestras in self._por_ruta.items()}
+        resumen = {}
+        for ruta, (solicitudes, muestras) in copias.items():
+            p50, p90, p99 = np.percentile(muestras, [50, 90, 99]) * 1000
+            resumen[ruta] = {
+                'solicitudes': solicitudes,
+                'p50_ms': round(float(p50), 3),
+                'p90_ms': round(float(p90), 3),
+                'p99_ms': round(float(p99), 3),
+                'max_ms': round(float(muestras.max()) * 1000, 3)
+            }
+        return resumen
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    # Conexiones persistentes: un POS reutiliza la misma conexión para cada venta
+    protocol_version = 'HTTP/1.1'
+    server_version = 'CalculadoraPrecios/1.0'
+
+    def log_message(self, formato, *args):
+        if self.server.registrar_solicitudes:
+            super().log_message(formato, *args)
+
+    def _responder(self, estado, datos):
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _leer_json(self):
+        try:
+            largo = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            largo = -1
+        if largo < 0 or largo > MAX_CUERPO:
+            # El cuerpo no se lee: la conexión no se puede reutilizar
+            self.close_connection = True
+            if largo < 0:
+                raise ValueError("Content-Length inválido")
+            raise ValueError("el cuerpo de la solicitud es demasiado grande")
+        try:
+            return json.loads(self.rfile.read(largo) or b'null')
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise ValueError("el cuerpo no es JSON válido")
+
+    def _atender(self, atender):
+        inicio = time.perf_counter()
+        ruta = self.path.split('?', 1)[0]
+        try:
+            estado, datos = atender(ruta)
+        except ValueError as e:
+            estado, datos = 400, {'error': str(e)}
+        except Exception as e:
+            estado, datos = 500, {'error': str(e)}
+        self._responder(estado, datos)
+        if estado != 404:
+            self.server.latencias.registrar(f'{self.command} {ruta}', time.perf_counter() - inicio)
+
+    def do_GET(self):
+        self._atender(self.server.atender_get)
+
+    def do_POST(self):
+        self._atender(lambda ruta: self.server.atender_post(ruta, self._leer_json()))
+
+
+class ServidorPrecios(ThreadingHTTPServer):
+    """Servidor HTTP con un hilo por conexión y un agrupador de micro-lotes compartido"""
+
+    daemon_threads = True
+    # Conexiones pendientes de aceptar; con el valor por defecto (5) una ráfaga de clientes
+    # recibe conexiones rechazadas
+    request_queue_size = 128
+
+    def __init__(self, direccion, iva=19.0, metodo_calculo='margen', margen_defecto=30.0, enteros=False,
+                 lote_maximo=LOTE_MAXIMO, espera=ESPERA_LOTE, registrar_solicitudes=False):
+        super().__init__(direccion, _Manejador)
+        self.config = {'iva': iva, 'metodo_calculo': metodo_calculo, 'margen_defecto': margen_defecto}
+        self.enteros = enteros
+        self.registrar_solicitudes = registrar_solicitudes
+        self.agrupador = AgrupadorPrecios(enteros, lote_maximo, espera)
+        self.latencias = Latencias()
+
+    def _leer(self, producto):
+        return leer_producto(producto, self.config['margen_defecto'], self.config['iva'], self.config['metodo_calculo'])
+
+    def atender_get(self, ruta):
+        if ruta == '/salud':
+            return 200, {'estado': 'ok'}
+        if ruta == '/campos':
+            return 200, {
+                clave: {'titulo': categoria['titulo'], 'campos': {campo_key: nombre for campo_key, nombre, _ in categoria['campos']}}
+                for clave, categoria in CATEGORIAS_COSTOS.items()
+            }
+        if ruta == '/metricas':
+            return 200, {
+                'configuracion': dict(self.config, enteros=self.enteros),
+                'latencias': self.latencias.resumen(),
+                'micro_lotes': self.agrupador.resumen()
+            }
+        return 404, {'error': f'ruta desconocida: {ruta}'}
+
+    def atender_post(self, ruta, datos):
+        if ruta == '/precios':
+            return 200, self.agrupador.enviar(self._leer(datos)).result()
+        if ruta == '/precios/lote':
+            if not isinstance(datos, dict) or not isinstance(datos.get('productos'), list):
+                raise ValueError("se espera {\"productos\": [...]}")
+            filas = []
+            for i, producto in enumerate(datos['productos']):
+                try:
+                    filas.append(self._leer(producto))
+                except ValueError as e:
+                    raise ValueError(f"producto {i}: {e}")
+            return 200, {'productos': valorar_productos(filas, self.enteros) if filas else []}
+        return 404, {'error': f'ruta desconocida: {ruta}'}
+
+    def server_close(self):
+        super().server_close()
+        self.agrupador.cerrar()
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m calculadora.servicio',
+        description='Servicio HTTP local que calcula precios con la misma lógica de la app.'
+    )
+    parser.add_argument('--host', default='127.0.0.1', help='Dirección donde escuchar (por defecto 127.0.0.1)')
+    parser.add_argument('--puerto', type=int, default=8765, help='Puerto (por defecto 8765)')
+    parser.add_argument('--iva', type=float, default=19.0, help='IVA en %% por defecto (por defecto 19)')
+    parser.add_argument('--metodo', choices=['margen', 'markup'], default='margen', help='Metodología por defecto')
+    parser.add_argument('--margen-defecto', type=float, default=30.0,
+                        help='Margen o markup %% para productos sin margen (por defecto 30)')
+    parser.add_argument('--enteros', action='store_true',
+                        help='Calcula en pesos enteros con redondeo de factura (IVA sobre el neto redondeado)')
+    parser.add_argument('--lote-maximo', type=int, default=LOTE_MAXIMO,
+                        help=f'Productos por micro-lote (por defecto {LOTE_MAXIMO})')
+    parser.add_argument('--espera-ms', type=float, default=ESPERA_LOTE * 1000,
+                        help=f'Espera máxima para completar un micro-lote, en ms (por defecto {ESPERA_LOTE * 1000:g})')
+    parser.add_argument('--registrar', action='store_true', help='Escribe cada solicitud en stderr')
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    servidor = ServidorPrecios(
+        (args.host, args.puerto), args.iva, args.metodo, args.margen_defecto, args.enteros,
+        args.lote_maximo, args.espera_ms / 1000, args.registrar
+    )
+    print(f'Servicio de precios en http://{args.host}:{servidor.server_address[1]}', file=sys.stderr)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
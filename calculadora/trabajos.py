@@ -0,0 +1,118 @@
+"""Importaciones en segundo plano: un hilo lee y valora, la página consulta el avance
+
+El hilo agrega los lotes a un catálogo propio; el catálogo de la sesión solo cambia al
+confirmar, que le pasa esas filas por bloques, así que una importación cancelada o fallida
+no deja filas a medias.
+"""
+import threading
+import time
+
+from .catalogo import CatalogoProductos
+from .perfilado import iniciar_perfilado
+
+# Filas por bloque al pasar lo importado al catálogo de la sesión
+TAMANO_BLOQUE_CONFIRMACION = 50_000
+
+
+class ImportacionCancelada(Exception):
+    """Se lanza dentro del hilo de importación al pedir la cancelación"""
+
+
+class TrabajoImportacion:
+    """Importación en un hilo; estado es 'en_curso', 'lista', 'cancelada' o 'error'
+
+    funcion(agregar_lote=..., al_avanzar=...) hace la importación (p. ej. importar_csv con
+    los demás argumentos fijados con functools.partial) y devuelve las columnas leídas.
+    avance, opcional, devuelve la fracción del archivo leída hasta ahora. Con perfilar, el
+    hilo mide sus fases (lectura, calculo_precios, catalogo) en self.perfilador.
+    """
+
+    def __init__(self, funcion, avance=None, perfilar=False, **contexto):
+        self.funcion = funcion
+        self.avance = avance
+        self.perfilar = perfilar
+        self.perfilador = None
+        # Datos del llamador (huella, configuración...) para usarlos al confirmar
+        self.contexto = contexto
+        self.estado = 'en_curso'
+        self.error = None
+        self.filas_leidas = 0
+        self.productos = 0
+        self.columnas = None
+        self.confirmado = False
+        self.inicio = time.perf_counter()
+        self.fin = None
+        self._catalogo = CatalogoProductos()
+        self._cancelar = threading.Event()
+        self._hilo = threading.Thread(target=self._ejecutar, name='importacion', daemon=True)
+        self._hilo.start()
+
+    @property
+    def en_curso(self):
+        return self.estado == 'en_curso'
+
+    @property
+    def fraccion(self):
+        """Fracción leída del archivo (1.0 al terminar), o None si no se conoce"""
+        if not self.en_curso:
+            return 1.0
+        return min(self.avance(), 1.0) if self.avance is not None else None
+
+    @property
+    def segundos(self):
+        return (self.fin or time.perf_counter()) - self.inicio
+
+    @property
+    def descartadas(self):
+        """Filas leídas que no se pudieron valorar (sin nombre o con costo inválido)"""
+        return self.filas_leidas - self.productos
+
+    def cancelar(self):
+        """Pide detener la importación; el hilo se detiene al terminar el bloque en curso"""
+        self._cancelar.set()
+
+    def esperar(self, segundos=None):
+        self._hilo.join(segundos)
+        return not self.en_curso
+
+    def confirmar(self, catalogo):
+        """Agrega al catálogo todo lo importado; devuelve la cantidad de productos
+
+        Las filas pasan por bloques, leídos del catálogo propio sin copiarlo entero. Solo
+        tiene efecto una vez y cuando el estado es 'lista'.
+        """
+        if self.estado != 'lista' or self.confirmado:
+            return 0
+        for nombres, columnas in self._catalogo.como_lotes(TAMANO_BLOQUE_CONFIRMACION):
+            catalogo.agregar_lote(nombres, columnas)
+        self.confirmado = True
+        productos = len(self._catalogo)
+        self._catalogo = None
+        return productos
+
+    def _agregar_lote(self, nombres, productos):
+        if self._cancelar.is_set():
+            raise ImportacionCancelada()
+        self._catalogo.agregar_lote(nombres, productos)
+        self.productos = len(self._catalogo)
+
+    def _al_avanzar(self, filas_leidas, productos_importados):
+        self.filas_leidas = filas_leidas
+        if self._cancelar.is_set():
+            raise ImportacionCancelada()
+
+    def _ejecutar(self):
+        # El perfilado es por hilo: las fases de la importación quedan en su propio perfilador
+        self.perfilador = iniciar_perfilado(self.perfilar)
+        try:
+            self.columnas = self.funcion(agregar_lote=self._agregar_lote, al_avanzar=self._al_avanzar)
+            self.estado = 'cancelada' if self._cancelar.is_set() else 'lista'
+        except ImportacionCancelada:
+            self.estado = 'cancelada'
+        except Exception as e:
+            self.error = str(e)
+            self.estado = 'error'
+        finally:
+            if self.estado != 'lista':
+                self._catalogo = None
+            self.fin = time.perf_counter()
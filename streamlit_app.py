@@ -1,9 +1,28 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-from io import BytesIO
+import os
 import base64
 from datetime import datetime
+from functools import partial
+from importlib.util import find_spec
+
+from calculadora.almacen import CatalogoSQLite
+from calculadora.busqueda import COLUMNAS_FILTRO, COLUMNAS_ORDEN, IndiceCatalogo
+from calculadora.catalogo import COLUMNAS_PRODUCTO, CatalogoProductos
+from calculadora.escenarios import METRICAS_SENSIBILIDAD, analizar_sensibilidad, rango_margenes, tabla_sensibilidad
+from calculadora.exportacion import crear_csv_bytes, crear_parquet_productos, crear_xlsx_productos
+from calculadora.formato import crear_tabla_productos, formatear_peso
+from calculadora.importacion import (
+    TAMANO_BLOQUE_IMPORTACION, CacheImportaciones, importar_columnas, importar_csv, importar_parquet, valorar_columnas
+)
+from calculadora.objetivos import CALCULOS_OBJETIVO, leer_precios_objetivo, resolver_precios_objetivo
+from calculadora.paralelo import importar_csv_paralelo
+from calculadora.perfilado import fase, iniciar_perfilado
+from calculadora.precios import CAMPOS_COSTOS, CATEGORIAS_COSTOS, calcular_precios, calcular_precios_enteros
+from calculadora.referencias import MEMORIA_REFERENCIAS, CacheReferencias, columnas_referencia, listar_referencias
+from calculadora.trabajos import TrabajoImportacion
+
+# Perfilado opcional de esta ejecución del script (se activa en el panel lateral)
+perfilador = iniciar_perfilado(st.session_state.get('perfilar', False))
 
 # Configuración de la página
 st.set_page_config(
@@ -54,145 +73,40 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Catálogo en un archivo SQLite si se define CALCULADORA_SQLITE (sobrevive a recargar la
+# página y se comparte entre sesiones); si no, en la memoria de cada sesión
+RUTA_SQLITE = os.environ.get('CALCULADORA_SQLITE')
+
+# Listas de referencia compartidas por todas las sesiones: directorio con los CSV/Parquet
+# y tope de memoria de la caché que guarda las ya leídas
+DIRECTORIO_REFERENCIAS = os.environ.get('CALCULADORA_REFERENCIAS')
+MEMORIA_REFERENCIAS_MB = float(os.environ.get('CALCULADORA_REFERENCIAS_MB', MEMORIA_REFERENCIAS // 2**20))
+
+
+@st.cache_resource
+def cache_referencias():
+    """Una sola caché por proceso del servidor"""
+    return CacheReferencias(int(MEMORIA_REFERENCIAS_MB * 2**20))
+
+
 # Inicializar session state
 if 'productos' not in st.session_state:
-    st.session_state.productos = []
+    st.session_state.productos = CatalogoSQLite(RUTA_SQLITE) if RUTA_SQLITE else CatalogoProductos()
+if 'importaciones' not in st.session_state:
+    st.session_state.importaciones = CacheImportaciones(compartida=cache_referencias())
 if 'config' not in st.session_state:
     st.session_state.config = {
         'iva': 19.0,
         'margen_defecto': 30.0,
-        'metodo_calculo': 'margen'
+        'metodo_calculo': 'margen',
+        'enteros': False
     }
 
-# Categorías de costos
-CATEGORIAS_COSTOS = {
-    'logisticos': {
-        'titulo': 'Costos Logísticos',
-        'descripcion': 'Transporte, almacenamiento y distribución',
-        'campos': [
-            ('transporte', 'Transporte', 'Costo de traslado de mercancías'),
-            ('almacenamiento', 'Almacenamiento', 'Costo de bodegaje y manejo de inventario'),
-            ('combustible', 'Combustible', 'Gastos de combustible para transporte'),
-            ('envio', 'Envío', 'Costo de entrega al cliente final')
-        ]
-    },
-    'personal': {
-        'titulo': 'Costos de Personal',
-        'descripcion': 'Mano de obra y servicios profesionales',
-        'campos': [
-            ('mano_obra', 'Mano de Obra', 'Costo directo de trabajadores en producción'),
-            ('hora_hombre', 'Hora Hombre', 'Servicios profesionales y consultoría')
-        ]
-    },
-    'operativos': {
-        'titulo': 'Costos Operativos',
-        'descripcion': 'Marketing, seguros y promoción',
-        'campos': [
-            ('marketing', 'Marketing', 'Gastos en publicidad y promoción'),
-            ('publicidad', 'Publicidad Digital', 'Anuncios online y campañas digitales'),
-            ('seguros', 'Seguros', 'Pólizas de seguro para productos/servicios')
-        ]
-    },
-    'administrativos': {
-        'titulo': 'Costos Administrativos',
-        'descripcion': 'Gastos generales de funcionamiento',
-        'campos': [
-            ('alquiler', 'Alquiler/Instalaciones', 'Arriendo de oficinas o locales'),
-            ('servicios_basicos', 'Servicios Básicos', 'Luz, agua, gas'),
-            ('internet', 'Internet', 'Conexión a internet y telecomunicaciones'),
-            ('telefono', 'Teléfono', 'Servicios telefónicos')
-        ]
-    },
-    'financieros': {
-        'titulo': 'Costos Financieros',
-        'descripcion': 'Intereses y comisiones bancarias',
-        'campos': [
-            ('intereses', 'Intereses', 'Intereses por financiamiento'),
-            ('comisiones_bancarias', 'Comisiones Bancarias', 'Gastos bancarios y financieros')
-        ]
-    },
-    'otros': {
-        'titulo': 'Otros Costos',
-        'descripcion': 'Mantenimiento y gastos varios',
-        'campos': [
-            ('mantenimiento', 'Mantenimiento', 'Reparaciones y mantenimiento de equipos'),
-            ('depreciacion', 'Depreciación', 'Depreciación de equipos y maquinaria'),
-            ('gastos_generales', 'Gastos Generales', 'Otros gastos no categorizados')
-        ]
-    }
-}
+# Archivo JSON lines donde se agregan las ejecuciones perfiladas
+RUTA_PERFIL = os.environ.get('CALCULADORA_PERFIL', 'perfil_calculadora.jsonl')
 
-def calcular_precios(costo_base, costos_adicionales, margen, iva, metodo_calculo):
-    """Calcula precios usando metodología empresarial correcta"""
-    costo_base = float(costo_base) if costo_base else 0
-    costos_adicionales = float(costos_adicionales) if costos_adicionales else 0
-    margen = float(margen) if margen else 0
-    iva = float(iva) if iva else 0
-    
-    # Costo total = Costo base + Costos adicionales
-    costo_total = costo_base + costos_adicionales
-    
-    if metodo_calculo == 'margen':
-        # MÉTODO MARGEN (sobre precio de venta) - Metodología profesional
-        # Precio = Costo / (1 - Margen%)
-        if margen >= 100:
-            margen = 99  # Evitar división por cero
-        precio_sin_iva = costo_total / (1 - margen / 100)
-        margen_real_sobre_ventas = margen
-        markup_real_sobre_costo = ((precio_sin_iva - costo_total) / costo_total) * 100 if costo_total > 0 else 0
-    else:
-        # MÉTODO MARKUP (sobre costo) - Metodología tradicional
-        # Precio = Costo × (1 + Markup%)
-        precio_sin_iva = costo_total * (1 + margen / 100)
-        markup_real_sobre_costo = margen
-        margen_real_sobre_ventas = ((precio_sin_iva - costo_total) / precio_sin_iva) * 100 if precio_sin_iva > 0 else 0
-    
-    # Precio con IVA
-    precio_con_iva = precio_sin_iva * (1 + iva / 100)
-    
-    # Ganancia bruta
-    ganancia = precio_sin_iva - costo_total
-    
-    # Valor del IVA
-    valor_iva = precio_con_iva - precio_sin_iva
-    
-    # Descuento máximo sin pérdidas
-    descuento_maximo = ((precio_con_iva - costo_total) / precio_con_iva) * 100 if precio_con_iva > 0 else 0
-    precio_con_descuento_maximo = precio_con_iva * (1 - descuento_maximo / 100)
-    
-    return {
-        'costo_base': costo_base,
-        'costos_adicionales': costos_adicionales,
-        'costo_total': costo_total,
-        'precio_sin_iva': precio_sin_iva,
-        'precio_con_iva': precio_con_iva,
-        'valor_iva': valor_iva,
-        'ganancia': ganancia,
-        'margen_porcentaje': margen,
-        'margen_real_sobre_ventas': margen_real_sobre_ventas,
-        'markup_real_sobre_costo': markup_real_sobre_costo,
-        'descuento_maximo': descuento_maximo,
-        'precio_con_descuento_maximo': precio_con_descuento_maximo,
-        'iva': iva,
-        'metodo_calculo': metodo_calculo
-    }
-
-def formatear_peso(valor):
-    """Formatea valores en pesos chilenos"""
-    return f"${valor:,.0f}".replace(",", ".")
-
-def crear_csv_productos(productos):
-    """Crea CSV para exportar"""
-    if not productos:
-        return None
-    
-    df = pd.DataFrame(productos)
-    df.columns = [
-        'Nombre', 'Costo Base', 'Costos Adicionales', 'Costo Total',
-        'Método Cálculo', 'Margen Real Ventas %', 'Markup Real Costo %',
-        'Precio Neto', 'IVA', 'Precio Final', 'Ganancia', 'Descuento Máximo %'
-    ]
-    return df
+# Opciones de filas por página en la tabla de productos
+TAMANOS_PAGINA = [25, 50, 100, 250, 500, 1000]
 
 # HEADER
 st.markdown('<h1 class="main-header">🧮 Calculadora de Precios Avanzada - Chile</h1>', unsafe_allow_html=True)
@@ -230,6 +144,15 @@ with st.sidebar:
         step=1.0
     )
     
+    # Motor de cálculo en pesos enteros
+    st.session_state.config['enteros'] = st.checkbox(
+        "🔢 Pesos enteros (redondeo de factura)",
+        value=st.session_state.config.get('enteros', False),
+        help="Calcula con montos enteros: el neto se redondea al peso y el IVA se calcula sobre el neto "
+             "redondeado, como en una factura. Los totales cuadran exactamente con la contabilidad."
+    )
+    calcular = calcular_precios_enteros if st.session_state.config['enteros'] else calcular_precios
+    
     st.markdown("---")
     
     # Mostrar explicación
@@ -247,6 +170,15 @@ with st.sidebar:
         
         **⚠️ Importante:** Un Markup 50% = solo 33% de margen real sobre ventas
         """)
+    
+    if RUTA_SQLITE:
+        st.caption(f"💾 Catálogo guardado en disco: `{RUTA_SQLITE}`")
+    
+    st.checkbox(
+        "⏱️ Perfilar ejecución",
+        key='perfilar',
+        help=f"Mide cada fase de la ejecución, la muestra al final de este panel y la agrega a {RUTA_PERFIL}"
+    )
 
 # FORMULARIO PRINCIPAL
 st.header("➕ Agregar Producto/Servicio")
@@ -297,13 +229,14 @@ with st.form("producto_form"):
 # Procesar formulario
 if agregar_producto:
     if nombre and costo_base > 0:
-        # Calcular costos adicionales totales
+        # Calcular costos adicionales totales; en pesos enteros cada campo se redondea antes de sumarse
         total_costos_adicionales = sum(costos_adicionales.values())
+        costos_producto = [costos_adicionales.get(campo_key, 0) for campo_key in CAMPOS_COSTOS]
         
         # Calcular precios
-        resultado = calcular_precios(
+        resultado = calcular(
             costo_base, 
-            total_costos_adicionales, 
+            costos_producto if st.session_state.config['enteros'] else total_costos_adicionales, 
             margen_producto, 
             st.session_state.config['iva'],
             st.session_state.config['metodo_calculo']
@@ -312,20 +245,16 @@ if agregar_producto:
         # Agregar producto a la lista
         producto = {
             'nombre': nombre,
-            'costo_base': resultado['costo_base'],
-            'costos_adicionales': resultado['costos_adicionales'],
-            'costo_total': resultado['costo_total'],
-            'metodo_calculo': resultado['metodo_calculo'],
-            'margen_real_sobre_ventas': resultado['margen_real_sobre_ventas'],
-            'markup_real_sobre_costo': resultado['markup_real_sobre_costo'],
-            'precio_sin_iva': resultado['precio_sin_iva'],
-            'valor_iva': resultado['valor_iva'],
-            'precio_con_iva': resultado['precio_con_iva'],
-            'ganancia': resultado['ganancia'],
-            'descuento_maximo': resultado['descuento_maximo']
+            'costo_base_original': costo_base,
+            'margen': margen_producto,
+            'iva': resultado['iva'],
+            'enteros': float(st.session_state.config['enteros']),
+            'costos': costos_producto
         }
+        for col in COLUMNAS_PRODUCTO[1:]:
+            producto[col] = resultado[col]
         
-        st.session_state.productos.append(producto)
+        st.session_state.productos.agregar(producto)
         st.success(f"✅ {nombre} agregado correctamente!")
         st.rerun()
     else:
@@ -336,9 +265,10 @@ if nombre and costo_base > 0:
     st.markdown("### 👁️ Vista Previa del Cálculo")
     
     total_costos_adicionales = sum(costos_adicionales.values()) if costos_adicionales else 0
-    preview = calcular_precios(
+    preview = calcular(
         costo_base, 
-        total_costos_adicionales, 
+        [costos_adicionales.get(campo_key, 0) for campo_key in CAMPOS_COSTOS] if st.session_state.config['enteros']
+        else total_costos_adicionales, 
         margen_producto, 
         st.session_state.config['iva'],
         st.session_state.config['metodo_calculo']
@@ -389,83 +319,281 @@ if nombre and costo_base > 0:
         </div>
         """, unsafe_allow_html=True)
 
+# Avance de la importación en segundo plano: el fragmento se vuelve a ejecutar solo, sin
+# rehacer el resto de la página, hasta que el trabajo termina
+@st.fragment(run_every=0.5)
+def mostrar_avance_importacion():
+    trabajo = st.session_state.get('trabajo_importacion')
+    if trabajo is None or not trabajo.en_curso:
+        st.rerun()
+    texto = (
+        f"{trabajo.filas_leidas:,} filas leídas · {trabajo.productos:,} productos calculados · "
+        f"{trabajo.descartadas:,} descartadas · {trabajo.segundos:.0f} s"
+    ).replace(",", ".")
+    if trabajo.fraccion is None:
+        st.caption(f"⏳ {trabajo.contexto['mensaje']}... {texto}")
+    else:
+        st.progress(trabajo.fraccion, text=texto)
+    if st.button("⏹️ Cancelar importación"):
+        trabajo.cancelar()
+
+def atender_trabajo_importacion(trabajo):
+    """Muestra el avance del trabajo en curso o, si terminó, lo confirma en el catálogo"""
+    if trabajo.en_curso:
+        mostrar_avance_importacion()
+        return
+    
+    contexto = trabajo.contexto
+    if trabajo.estado == 'lista':
+        # El catálogo recibe lo importado solo ahora, por bloques y con el hilo ya terminado
+        with fase('confirmar_importacion'):
+            productos_importados = trabajo.confirmar(st.session_state.productos)
+        # Las fases medidas en el hilo se suman a la ejecución que confirma
+        if perfilador is not None and trabajo.perfilador is not None:
+            perfilador.incorporar(trabajo.perfilador)
+        del st.session_state.trabajo_importacion
+        if contexto['origen'] == 'referencia':
+            st.success(f"✅ {productos_importados} productos agregados desde {contexto['lista']}")
+            return
+        if contexto['guardar_columnas'] and trabajo.columnas is not None:
+            st.session_state.importaciones.guardar(contexto['huella'], trabajo.columnas)
+        st.session_state.importaciones.marcar_importada(contexto['huella'], contexto['config'])
+        if productos_importados > 0:
+            st.success(f"✅ {productos_importados} productos importados correctamente!")
+            # st.rerun() corta el script antes del registro final: esta ejecución, con las
+            # fases de la importación, se registra aquí
+            if perfilador is not None:
+                perfilador.escribir_jsonl(RUTA_PERFIL, productos=len(st.session_state.productos))
+            st.rerun()
+        else:
+            st.error("❌ No se pudieron importar productos. Verifica el formato del CSV.")
+        return
+    
+    if trabajo.estado == 'cancelada':
+        st.warning("⏹️ Importación cancelada; el catálogo no se modificó")
+    else:
+        st.error(f"❌ Error al importar: {trabajo.error}")
+    if contexto['origen'] != 'archivo':
+        # Se vuelve a ofrecer el botón que inició el trabajo
+        del st.session_state.trabajo_importacion
+    elif st.button("▶️ Importar de nuevo"):
+        del st.session_state.trabajo_importacion
+        st.rerun()
+
+def argumentos_importacion():
+    """Configuración actual, como argumentos de las funciones de importación"""
+    config = st.session_state.config
+    return dict(
+        margen_defecto=config['margen_defecto'],
+        iva=config['iva'],
+        metodo_calculo=config['metodo_calculo'],
+        enteros=config['enteros']
+    )
+
+def iniciar_importacion_archivo(archivo, huella, config_importacion, tamano_bloque, procesos, origen, mensaje):
+    """Importa el archivo subido en un hilo, leyéndolo por bloques directamente, sin copiarlo
+
+    Las columnas leídas se juntan para la caché solo mientras quepan en ella; si no, en
+    memoria queda solo el bloque en curso y el catálogo importado.
+    """
+    cache_importaciones = st.session_state.importaciones
+    guardar_columnas = cache_importaciones.admite(archivo.size)
+    argumentos = argumentos_importacion()
+    argumentos['limite_columnas'] = cache_importaciones.memoria_maxima if guardar_columnas else 0
+    archivo.seek(0)
+    tamano_archivo = max(archivo.size, 1)
+    avance = lambda: archivo.tell() / tamano_archivo
+    if archivo.name.lower().endswith('.parquet'):
+        funcion = partial(importar_parquet, archivo, tamano_bloque=tamano_bloque, **argumentos)
+    elif procesos > 1:
+        funcion = partial(importar_csv_paralelo, archivo.getbuffer(), trabajadores=procesos, **argumentos)
+        avance = None
+    else:
+        # Por bloques siempre, para informar el avance y poder cancelar entre bloques
+        funcion = partial(importar_csv, archivo, tamano_bloque=tamano_bloque, **argumentos)
+    st.session_state.trabajo_importacion = TrabajoImportacion(
+        funcion, avance, perfilar=perfilador is not None, origen=origen, huella=huella, config=config_importacion,
+        guardar_columnas=guardar_columnas, mensaje=mensaje
+    )
+
 # IMPORTAR/EXPORTAR
 st.markdown("---")
 col1, col2 = st.columns(2)
 
 with col1:
-    st.subheader("📤 Importar CSV")
-    uploaded_file = st.file_uploader("Seleccionar archivo CSV", type=['csv'])
+    st.subheader("📤 Importar CSV / Parquet")
+    uploaded_file = st.file_uploader("Seleccionar archivo CSV o Parquet", type=['csv', 'parquet'])
+    tamano_bloque = int(st.number_input(
+        "Filas por bloque",
+        min_value=1000,
+        value=TAMANO_BLOQUE_IMPORTACION,
+        step=10000,
+        help="El archivo se lee y calcula por bloques de estas filas. Las columnas leídas se guardan para "
+             "reimportar sin releer solo si caben en la caché; si no, la memoria de la lectura no depende del "
+             "tamaño del archivo."
+    ))
+    procesos_importacion = int(st.number_input(
+        "Procesos en paralelo",
+        min_value=1,
+        max_value=os.cpu_count() or 1,
+        value=1,
+        help="Con más de 1, el archivo se reparte por rangos de filas entre procesos. El resultado es idéntico."
+    ))
+    
+    trabajo = st.session_state.get('trabajo_importacion')
+    if uploaded_file is None and trabajo is not None and trabajo.contexto['origen'] != 'referencia':
+        # Se quitó el archivo: se descarta su importación
+        trabajo.cancelar()
+        del st.session_state.trabajo_importacion
     
     if uploaded_file is not None:
         try:
-            df = pd.read_csv(uploaded_file)
+            # Un archivo ya procesado solo cuesta buscar su huella
+            cache_importaciones = st.session_state.importaciones
+            with fase('huella'):
+                huella = cache_importaciones.huella(uploaded_file)
+            config_importacion = (
+                st.session_state.config['iva'],
+                st.session_state.config['metodo_calculo'],
+                st.session_state.config['margen_defecto'],
+                st.session_state.config['enteros']
+            )
             
-            # Procesar cada fila
-            productos_importados = 0
-            for _, row in df.iterrows():
-                if 'nombre' in df.columns and 'costo_base' in df.columns:
-                    nombre_imp = row.get('nombre', '')
-                    costo_base_imp = row.get('costo_base', 0)
-                    margen_imp = row.get('margen', st.session_state.config['margen_defecto'])
-                    
-                    if nombre_imp and costo_base_imp > 0:
-                        # Calcular costos adicionales de las columnas del CSV
-                        costos_add_imp = 0
-                        for categoria in CATEGORIAS_COSTOS.values():
-                            for campo_key, _, _ in categoria['campos']:
-                                costos_add_imp += row.get(campo_key, 0)
-                        
-                        resultado_imp = calcular_precios(
-                            costo_base_imp, 
-                            costos_add_imp, 
-                            margen_imp, 
-                            st.session_state.config['iva'],
-                            st.session_state.config['metodo_calculo']
-                        )
-                        
-                        producto_imp = {
-                            'nombre': nombre_imp,
-                            'costo_base': resultado_imp['costo_base'],
-                            'costos_adicionales': resultado_imp['costos_adicionales'],
-                            'costo_total': resultado_imp['costo_total'],
-                            'metodo_calculo': resultado_imp['metodo_calculo'],
-                            'margen_real_sobre_ventas': resultado_imp['margen_real_sobre_ventas'],
-                            'markup_real_sobre_costo': resultado_imp['markup_real_sobre_costo'],
-                            'precio_sin_iva': resultado_imp['precio_sin_iva'],
-                            'valor_iva': resultado_imp['valor_iva'],
-                            'precio_con_iva': resultado_imp['precio_con_iva'],
-                            'ganancia': resultado_imp['ganancia'],
-                            'descuento_maximo': resultado_imp['descuento_maximo']
-                        }
-                        
-                        st.session_state.productos.append(producto_imp)
-                        productos_importados += 1
+            trabajo = st.session_state.get('trabajo_importacion')
+            if trabajo is not None and trabajo.contexto['origen'] != 'referencia' and trabajo.contexto['huella'] != huella:
+                # Se cambió de archivo: la importación anterior ya no interesa
+                trabajo.cancelar()
+                del st.session_state.trabajo_importacion
+                trabajo = None
+            # Solo se atiende aquí el trabajo de este archivo; el de una lista de referencia, en su sección
+            trabajo_archivo = trabajo if trabajo is not None and trabajo.contexto['origen'] != 'referencia' else None
             
-            if productos_importados > 0:
-                st.success(f"✅ {productos_importados} productos importados correctamente!")
-                st.rerun()
+            if trabajo_archivo is not None:
+                atender_trabajo_importacion(trabajo_archivo)
+            elif not cache_importaciones.importada(huella):
+                columnas_compartidas = cache_importaciones.columnas(huella) if trabajo is None else None
+                if trabajo is not None:
+                    st.info("⏳ El archivo se importará cuando termine la importación en curso")
+                elif columnas_compartidas is not None:
+                    # Otra sesión ya leyó este archivo: solo se calculan los precios
+                    with fase('calculo_precios'):
+                        productos_valorados = valorar_columnas(columnas_compartidas, **argumentos_importacion())
+                    st.session_state.productos.agregar_lote(columnas_compartidas['nombre'], productos_valorados)
+                    cache_importaciones.marcar_importada(huella, config_importacion)
+                    
+                    if len(columnas_compartidas['nombre']) > 0:
+                        st.success(f"✅ {len(columnas_compartidas['nombre'])} productos importados correctamente!")
+                        st.rerun()
+                    else:
+                        st.error("❌ No se pudieron importar productos. Verifica el formato del CSV.")
+                else:
+                    # La importación corre en un hilo; la página solo consulta su avance
+                    iniciar_importacion_archivo(
+                        uploaded_file, huella, config_importacion, tamano_bloque, procesos_importacion,
+                        origen='archivo', mensaje=f"Importando en {procesos_importacion} procesos"
+                    )
+                    atender_trabajo_importacion(st.session_state.trabajo_importacion)
             else:
-                st.error("❌ No se pudieron importar productos. Verifica el formato del CSV.")
+                # Solo una consulta: se cuenta como uso de la caché al importar nuevamente
+                columnas_leidas = cache_importaciones.columnas(huella, contar=False)
+                if columnas_leidas is not None and len(columnas_leidas['nombre']) == 0:
+                    st.error("❌ No se pudieron importar productos. Verifica el formato del CSV.")
+                else:
+                    if cache_importaciones.importada(huella, config_importacion):
+                        st.info("✔️ Este archivo ya fue importado con la configuración actual")
+                    else:
+                        st.info("✔️ Este archivo ya fue importado con otra configuración de IVA, metodología, margen o redondeo")
+                    
+                    if st.button("🔁 Importar nuevamente con la configuración actual", disabled=trabajo is not None):
+                        columnas_leidas = cache_importaciones.columnas(huella)
+                        if columnas_leidas is None:
+                            # Las columnas no están en la caché: se vuelve a importar el archivo por bloques
+                            iniciar_importacion_archivo(
+                                uploaded_file, huella, config_importacion, tamano_bloque, procesos_importacion,
+                                origen='reimportacion', mensaje="Importando nuevamente"
+                            )
+                        else:
+                            # Solo se recalculan los precios de las columnas ya leídas, por bloques en un hilo
+                            st.session_state.trabajo_importacion = TrabajoImportacion(
+                                partial(importar_columnas, columnas_leidas, tamano_bloque=tamano_bloque, **argumentos_importacion()),
+                                perfilar=perfilador is not None,
+                                origen='reimportacion',
+                                huella=huella,
+                                config=config_importacion,
+                                guardar_columnas=False,
+                                mensaje="Importando nuevamente"
+                            )
+                        st.rerun()
                 
         except Exception as e:
-            st.error(f"❌ Error al importar CSV: {str(e)}")
+            st.error(f"❌ Error al importar archivo: {str(e)}")
+    
+    with st.expander("📚 Listas de referencia compartidas"):
+        referencias = listar_referencias(DIRECTORIO_REFERENCIAS)
+        if referencias:
+            lista_referencia = st.selectbox("Lista de proveedor", referencias)
+            trabajo = st.session_state.get('trabajo_importacion')
+            if trabajo is not None and trabajo.contexto['origen'] == 'referencia':
+                atender_trabajo_importacion(trabajo)
+            if st.button("➕ Agregar lista al catálogo", disabled='trabajo_importacion' in st.session_state):
+                # La lista se lee una vez por proceso; el hilo solo calcula los precios con la configuración actual
+                st.session_state.trabajo_importacion = TrabajoImportacion(
+                    partial(
+                        importar_columnas,
+                        partial(columnas_referencia, cache_referencias(), os.path.join(DIRECTORIO_REFERENCIAS, lista_referencia)),
+                        **argumentos_importacion()
+                    ),
+                    perfilar=perfilador is not None,
+                    origen='referencia',
+                    lista=lista_referencia,
+                    mensaje=f"Agregando {lista_referencia}"
+                )
+                st.rerun()
+        else:
+            st.caption("Define CALCULADORA_REFERENCIAS con un directorio de CSV/Parquet para compartir listas entre sesiones.")
+        
+        contadores = cache_referencias().contadores()
+        st.caption(
+            f"Caché compartida: {contadores['listas']} archivos · "
+            f"{contadores['memoria'] / 2**20:.1f} de {contadores['memoria_maxima'] / 2**20:.0f} MB · "
+            f"{contadores['aciertos']} aciertos · {contadores['fallos']} fallos · {contadores['desalojos']} desalojos"
+        )
 
 with col2:
-    st.subheader("📥 Exportar CSV")
+    st.subheader("📥 Exportar CSV / Excel / Parquet")
     
     if st.session_state.productos:
-        df_productos = crear_csv_productos(st.session_state.productos)
-        csv = df_productos.to_csv(index=False)
-        
+        # Los archivos se generan recién al hacer clic; CSV y Excel, por bloques leídos del catálogo
         st.download_button(
             label="⬇️ Descargar CSV",
-            data=csv,
+            data=partial(crear_csv_bytes, st.session_state.productos),
             file_name=f"precios_calculados_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
             mime="text/csv",
             use_container_width=True
         )
         
+        if find_spec('xlsxwriter') is not None:
+            st.download_button(
+                label="⬇️ Descargar Excel",
+                data=partial(crear_xlsx_productos, st.session_state.productos),
+                file_name=f"precios_calculados_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                use_container_width=True
+            )
+        else:
+            st.caption("Instala xlsxwriter para exportar en formato Excel")
+        
+        if find_spec('pyarrow') is not None:
+            st.download_button(
+                label="⬇️ Descargar Parquet",
+                data=partial(crear_parquet_productos, st.session_state.productos),
+                file_name=f"precios_calculados_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet",
+                mime="application/vnd.apache.parquet",
+                use_container_width=True
+            )
+        else:
+            st.caption("Instala pyarrow para exportar en formato Parquet")
+        
         st.info(f"📊 {len(st.session_state.productos)} productos listos para exportar")
     else:
         st.info("📝 Agrega productos para poder exportar")
@@ -474,92 +602,202 @@ with col2:
 st.markdown("""
 **Formato CSV básico:** `nombre,costo_base,margen_opcional`  
 **Ejemplo:** `"Consultoría Web",500000,40`  
-El CSV exportado incluye: costos, precios, márgenes y **descuentos máximos**
+El CSV exportado incluye: costos, precios, márgenes y **descuentos máximos**  
+**Parquet:** acepta las mismas columnas que el CSV; un Parquet exportado por la app se restaura tal cual
 """)
 
+# PRECIOS OBJETIVO (cálculo inverso)
+with st.expander("🎯 Cálculo inverso desde precios de mercado"):
+    st.markdown("""
+    **Formato:** `nombre,precio_objetivo,costo_base,margen` (precio con IVA; campos de costo opcionales)  
+    Calcula el margen o markup que implica cada precio objetivo dado su costo, o el costo total máximo
+    que aún permite el margen objetivo (el de la fila o el margen por defecto), con el IVA y la metodología actuales.
+    """)
+    archivo_objetivos = st.file_uploader("Archivo de precios objetivo", type=['csv', 'parquet'], key='archivo_objetivos')
+    calculo_objetivo = st.radio(
+        "Calcular",
+        list(CALCULOS_OBJETIVO),
+        format_func=CALCULOS_OBJETIVO.get,
+        horizontal=True
+    )
+    if archivo_objetivos is not None:
+        try:
+            objetivos = leer_precios_objetivo(archivo_objetivos, parquet=archivo_objetivos.name.lower().endswith('.parquet'))
+        except Exception as e:
+            objetivos = None
+            st.error(f"❌ Error al leer el archivo: {str(e)}")
+        else:
+            if objetivos is None:
+                st.error("❌ El archivo debe tener las columnas nombre y precio_objetivo")
+        if objetivos is not None:
+            df_objetivos = resolver_precios_objetivo(
+                objetivos,
+                calculo_objetivo,
+                st.session_state.config['iva'],
+                st.session_state.config['metodo_calculo'],
+                st.session_state.config['margen_defecto']
+            )
+            inalcanzables = int((~df_objetivos['Alcanzable']).sum())
+            if inalcanzables:
+                st.warning(f"⚠️ {inalcanzables:,} de {len(df_objetivos):,} filas no pueden alcanzar su objetivo".replace(",", "."))
+            else:
+                st.success(f"✅ Las {len(df_objetivos):,} filas alcanzan su objetivo".replace(",", "."))
+            st.dataframe(df_objetivos.head(1000), use_container_width=True, hide_index=True)
+            if len(df_objetivos) > 1000:
+                st.caption("Mostrando las primeras 1.000 filas; descarga el CSV para verlas todas")
+            st.download_button(
+                label="⬇️ Descargar resultado CSV",
+                data=df_objetivos.to_csv(index=False),
+                file_name=f"precios_objetivo_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv"
+            )
+
 # TABLA DE PRODUCTOS
 if st.session_state.productos:
     st.markdown("---")
     st.header(f"📊 Productos/Servicios Calculados ({len(st.session_state.productos)})")
     
-    # Crear DataFrame para mostrar
-    df_display = pd.DataFrame(st.session_state.productos)
-    
-    # Formatear columnas monetarias
-    columnas_dinero = ['costo_base', 'costos_adicionales', 'costo_total', 'precio_sin_iva', 'valor_iva', 'precio_con_iva', 'ganancia']
-    for col in columnas_dinero:
-        if col in df_display.columns:
-            df_display[col] = df_display[col].apply(lambda x: formatear_peso(x))
-    
-    # Formatear columnas de porcentaje
-    columnas_porcentaje = ['margen_real_sobre_ventas', 'markup_real_sobre_costo', 'descuento_maximo']
-    for col in columnas_porcentaje:
-        if col in df_display.columns:
-            df_display[col] = df_display[col].apply(lambda x: f"{x:.1f}%")
-    
-    # Renombrar columnas para mejor visualización
-    df_display.columns = [
-        'Producto/Servicio', 'Costo Base', 'Costos Adic.', 'Costo Total',
-        'Método', 'Margen Real', 'Markup Real', 'Precio Neto', 'IVA',
-        'Precio Final', 'Ganancia', 'Desc. Máximo'
-    ]
-    
-    # Mostrar tabla
-    st.dataframe(df_display, use_container_width=True, hide_index=True)
-    
-    # Botón para limpiar productos
-    if st.button("🗑️ Limpiar todos los productos", type="secondary"):
-        st.session_state.productos = []
+    # Búsqueda, filtros y orden sobre un índice que se pone al día con el catálogo
+    productos = st.session_state.productos
+    indice = st.session_state.get('indice_productos')
+    if indice is None or indice.catalogo is not productos:
+        indice = IndiceCatalogo(productos)
+        st.session_state.indice_productos = indice
+    texto_busqueda = st.text_input(
+        "🔎 Buscar producto", placeholder="Parte del nombre, sin importar mayúsculas ni tildes"
+    ).strip()
+    rangos_filtro = {}
+    orden_tabla = []
+    with st.expander("Filtros y orden"):
+        for col, etiqueta in COLUMNAS_FILTRO.items():
+            extremos = indice.extremos(col)
+            if extremos is None or extremos[0] == extremos[1]:
+                continue
+            seleccion = st.slider(etiqueta, extremos[0], extremos[1], extremos)
+            if seleccion != extremos:
+                rangos_filtro[col] = seleccion
+        seleccion_orden = st.multiselect(
+            "Ordenar por",
+            [(col, ascendente) for col in COLUMNAS_ORDEN for ascendente in (True, False)],
+            format_func=lambda opcion: f"{COLUMNAS_ORDEN[opcion[0]]} {'↑' if opcion[1] else '↓'}",
+            help="Con varias columnas, cada una desempata la anterior"
+        )
+        for col, ascendente in seleccion_orden:
+            if col not in dict(orden_tabla):
+                orden_tabla.append((col, ascendente))
+    
+    consulta = (texto_busqueda, tuple(sorted(rangos_filtro.items())), tuple(orden_tabla))
+    filas_tabla = None
+    total_filas = len(productos)
+    if any(consulta):
+        with fase('busqueda'):
+            filas_tabla = indice.consultar(texto_busqueda, rangos_filtro, orden_tabla)
+        total_filas = len(filas_tabla)
+    
+    # Paginación: solo se formatea y envía al navegador la página visible
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        filas_por_pagina = st.selectbox("Filas por página", TAMANOS_PAGINA, index=1)
+    total_paginas = max((total_filas - 1) // filas_por_pagina + 1, 1)
+    if st.session_state.get('pagina_productos', 1) > total_paginas:
+        st.session_state.pagina_productos = total_paginas
+    with col2:
+        pagina = int(st.number_input("Página", min_value=1, max_value=total_paginas, step=1, key='pagina_productos'))
+    inicio = (pagina - 1) * filas_por_pagina
+    fin = min(inicio + filas_por_pagina, total_filas)
+    with col3:
+        if filas_tabla is None:
+            st.caption(f"Mostrando filas {inicio + 1:,}–{fin:,} de {total_filas:,} · página {pagina:,} de {total_paginas:,}".replace(",", "."))
+        else:
+            st.caption(
+                f"{total_filas:,} de {len(productos):,} productos coinciden · "
+                f"mostrando {min(inicio + 1, fin):,}–{fin:,} · página {pagina:,} de {total_paginas:,}".replace(",", ".")
+            )
+    
+    if total_filas == 0:
+        st.info("🔎 Ningún producto coincide con la búsqueda y los filtros")
+    else:
+        # La página formateada se reutiliza mientras no cambien el catálogo ni la consulta
+        clave_tabla = (id(productos), productos.version, consulta, inicio, fin)
+        cache_tabla = st.session_state.get('tabla_productos')
+        if cache_tabla is None or cache_tabla[0] != clave_tabla:
+            cache_tabla = (clave_tabla, crear_tabla_productos(productos, inicio, fin, filas_tabla))
+            st.session_state.tabla_productos = cache_tabla
+        df_display = cache_tabla[1]
+        
+        # Mostrar tabla
+        with fase('tabla_envio'):
+            st.dataframe(df_display, use_container_width=True, hide_index=True)
+    
+    # Productos calculados con otro IVA, metodología o redondeo que la configuración actual
+    desactualizados = productos.desactualizados(
+        st.session_state.config['iva'], st.session_state.config['metodo_calculo'], st.session_state.config['enteros']
+    )
+    if desactualizados:
+        cantidad = f"{desactualizados:,}".replace(",", ".")
+        st.warning(f"⚠️ {cantidad} productos fueron calculados con otro IVA, metodología o redondeo")
+        if st.button("🔄 Recalcular catálogo con la configuración actual", type="primary"):
+            with fase('revalorar'):
+                recalculadas = productos.revalorar(
+                    st.session_state.config['iva'],
+                    st.session_state.config['metodo_calculo'],
+                    enteros=st.session_state.config['enteros']
+                )
+            st.success(f"✅ Catálogo recalculado ({len(recalculadas)} columnas)")
+            st.rerun()
+    
+    # Botón para limpiar productos; el catálogo en SQLite es uno solo para todas las sesiones
+    limpieza_confirmada = True
+    if RUTA_SQLITE:
+        limpieza_confirmada = st.checkbox(
+            "Confirmo que se borrarán los productos de todas las sesiones",
+            key='confirmar_limpieza',
+            help=f"El catálogo se guarda en {RUTA_SQLITE} y lo comparten todas las sesiones"
+        )
+    if st.button("🗑️ Limpiar todos los productos", type="secondary", disabled=not limpieza_confirmada):
+        st.session_state.productos.limpiar()
+        st.session_state.pop('confirmar_limpieza', None)
         st.success("✅ Productos eliminados")
         st.rerun()
     
     # RESUMEN EJECUTIVO
     st.markdown("### 📈 Resumen Ejecutivo")
     
-    # Calcular totales
-    total_costo_base = sum(p['costo_base'] for p in st.session_state.productos)
-    total_costos_adicionales = sum(p['costos_adicionales'] for p in st.session_state.productos)
-    total_inversion = sum(p['costo_total'] for p in st.session_state.productos)
-    total_neto = sum(p['precio_sin_iva'] for p in st.session_state.productos)
-    total_iva = sum(p['valor_iva'] for p in st.session_state.productos)
-    total_final = sum(p['precio_con_iva'] for p in st.session_state.productos)
-    total_ganancia = sum(p['ganancia'] for p in st.session_state.productos)
+    # Totales mantenidos por el catálogo al agregar, importar o limpiar
+    with fase('resumen'):
+        resumen = st.session_state.productos.resumen()
     
     # Métricas del resumen
     col1, col2, col3, col4, col5, col6 = st.columns(6)
     
     with col1:
-        st.metric("Total Costo Base", formatear_peso(total_costo_base))
+        st.metric("Total Costo Base", formatear_peso(resumen['total_costo_base']))
     with col2:
-        st.metric("Total Costos Adic.", formatear_peso(total_costos_adicionales))
+        st.metric("Total Costos Adic.", formatear_peso(resumen['total_costos_adicionales']))
     with col3:
-        st.metric("Total Inversión", formatear_peso(total_inversion))
+        st.metric("Total Inversión", formatear_peso(resumen['total_inversion']))
     with col4:
-        st.metric("Total Neto", formatear_peso(total_neto))
+        st.metric("Total Neto", formatear_peso(resumen['total_neto']))
     with col5:
-        st.metric("Total IVA", formatear_peso(total_iva))
+        st.metric("Total IVA", formatear_peso(resumen['total_iva']))
     with col6:
-        st.metric("Total Final", formatear_peso(total_final))
+        st.metric("Total Final", formatear_peso(resumen['total_final']))
     
     # Métricas de rentabilidad
     col1, col2, col3 = st.columns(3)
     
-    margen_promedio = np.mean([p['margen_real_sobre_ventas'] for p in st.session_state.productos])
-    roi = ((total_final / total_inversion) - 1) * 100 if total_inversion > 0 else 0
-    descuento_promedio = np.mean([p['descuento_maximo'] for p in st.session_state.productos])
-    
     with col1:
         st.markdown(f"""
         <div class="success-card">
-            <strong>💰 Ganancia Total:</strong> {formatear_peso(total_ganancia)}<br>
-            <strong>📊 Margen Promedio:</strong> {margen_promedio:.1f}%
+            <strong>💰 Ganancia Total:</strong> {formatear_peso(resumen['total_ganancia'])}<br>
+            <strong>📊 Margen Promedio:</strong> {resumen['margen_promedio']:.1f}%
         </div>
         """, unsafe_allow_html=True)
     
     with col2:
         st.markdown(f"""
         <div class="metric-card">
-            <strong>📈 ROI:</strong> {roi:.1f}%<br>
+            <strong>📈 ROI:</strong> {resumen['roi']:.1f}%<br>
             <strong>🔧 Metodología:</strong> {st.session_state.config['metodo_calculo'].title()}
         </div>
         """, unsafe_allow_html=True)
@@ -567,10 +805,61 @@ if st.session_state.productos:
     with col3:
         st.markdown(f"""
         <div class="warning-card">
-            <strong>🎯 Descuento Máx. Promedio:</strong> {descuento_promedio:.1f}%<br>
-            <strong>💸 Precio Mín. Promedio:</strong> {formatear_peso(total_inversion / len(st.session_state.productos) if st.session_state.productos else 0)}
+            <strong>🎯 Descuento Máx. Promedio:</strong> {resumen['descuento_promedio']:.1f}%<br>
+            <strong>💸 Precio Mín. Promedio:</strong> {formatear_peso(resumen['precio_minimo_promedio'])}
         </div>
         """, unsafe_allow_html=True)
+    
+    # Estructura de costos: sumas por campo agregadas por categoría
+    with st.expander("🧱 Estructura de costos del catálogo"):
+        estructura = st.session_state.productos.estructura_costos()
+        st.bar_chart(estructura['Participación %'], y_label="Participación en el costo total (%)")
+        st.dataframe(
+            estructura.assign(
+                Total=[formatear_peso(total) for total in estructura['Total']],
+                **{'Participación %': [f"{p:.1f}%" for p in estructura['Participación %']]}
+            ),
+            use_container_width=True
+        )
+    
+    # ANÁLISIS DE SENSIBILIDAD
+    st.markdown("### 🔬 Análisis de Sensibilidad")
+    st.caption("Métricas del catálogo completo si todos los productos usaran el mismo margen o markup")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        margen_desde = st.number_input("Margen desde (%)", min_value=0.0, max_value=500.0, value=10.0, step=1.0)
+    with col2:
+        margen_hasta = st.number_input("Margen hasta (%)", min_value=0.0, max_value=500.0, value=60.0, step=1.0)
+    with col3:
+        margen_paso = st.number_input("Paso (%)", min_value=0.1, max_value=50.0, value=1.0, step=0.5)
+    with col4:
+        metrica = st.selectbox("Métrica", list(METRICAS_SENSIBILIDAD), format_func=METRICAS_SENSIBILIDAD.get)
+    
+    opciones_iva = sorted({0.0, 10.0, 19.0, 21.0, st.session_state.config['iva']})
+    ivas_escenario = st.multiselect(
+        "Tasas de IVA (%)", opciones_iva, default=[st.session_state.config['iva']], format_func=lambda x: f"{x:g}%"
+    )
+    
+    if ivas_escenario:
+        with fase('sensibilidad'):
+            # En SQLite la columna viene del disco: se lee una vez por versión del catálogo
+            clave_costos = (id(productos), productos.version)
+            costos_sensibilidad = st.session_state.get('costos_sensibilidad')
+            if costos_sensibilidad is None or costos_sensibilidad[0] != clave_costos:
+                costos_sensibilidad = (clave_costos, productos.columna('costo_total'))
+                st.session_state.costos_sensibilidad = costos_sensibilidad
+            sensibilidad = analizar_sensibilidad(
+                costos_sensibilidad[1],
+                rango_margenes(margen_desde, margen_hasta, margen_paso),
+                sorted(ivas_escenario)
+            )
+            tabla_escenarios = tabla_sensibilidad(sensibilidad, metrica)
+        st.line_chart(tabla_escenarios, x_label="Margen o markup (%)", y_label=METRICAS_SENSIBILIDAD[metrica])
+        with st.expander("📋 Ver matriz de resultados"):
+            st.dataframe(tabla_escenarios, use_container_width=True)
+    else:
+        st.info("Selecciona al menos una tasa de IVA")
 
 # FOOTER
 st.markdown("---")
@@ -581,3 +870,18 @@ st.markdown("""
     <p><em>Creado con Python + Streamlit</em></p>
 </div>
 """, unsafe_allow_html=True)
+
+# PERFILADO
+if perfilador is not None:
+    perfilador.escribir_jsonl(RUTA_PERFIL, productos=len(st.session_state.productos))
+    with st.sidebar:
+        st.markdown("### ⏱️ Tiempos de la ejecución")
+        st.dataframe(
+            [
+                {'Fase': fila['fase'], 'ms': round(fila['segundos'] * 1000, 2), 'Llamadas': fila['llamadas']}
+                for fila in perfilador.resumen()
+            ],
+            hide_index=True,
+            use_container_width=True
+        )
+        st.caption(f"Total: {perfilador.total() * 1000:.1f} ms · {len(st.session_state.productos):,} productos".replace(",", "."))
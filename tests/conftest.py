@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculadora.precios import CAMPOS_COSTOS
+
+
+def catalogo_prueba(filas=3000, semilla=7):
+    """CSV de importación con montos de hasta dos decimales, casos borde y filas inválidas"""
+    aleatorio = np.random.default_rng(semilla)
+    df = pd.DataFrame({
+        'nombre': [f'Producto {i % 700}, "ñandú" {i % 3}' for i in range(filas)],
+        'costo_base': np.round(aleatorio.uniform(0, 200_000, filas), 2),
+        'margen': np.round(aleatorio.uniform(0, 120, filas), 2)
+    })
+    for campo_key in CAMPOS_COSTOS[:4]:
+        df[campo_key] = np.round(aleatorio.uniform(0, 5_000, filas), 2)
+    # Mitades exactas, márgenes de 100% o más, costo cero, margen vacío y filas inválidas
+    df.loc[::7, CAMPOS_COSTOS[0]] = 2.675
+    df.loc[::11, 'costo_base'] = 1000.5
+    df.loc[::13, 'margen'] = 100
+    df.loc[::17, 'costo_base'] = 0
+    df.loc[::19, 'margen'] = np.nan
+    df.loc[::29, 'costo_base'] = np.nan
+    df.loc[::31, 'nombre'] = None
+    return df
+
+
+@pytest.fixture(scope='session')
+def csv_importacion():
+    return catalogo_prueba().to_csv(index=False).encode('utf-8')
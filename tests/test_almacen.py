@@ -0,0 +1,74 @@
+"""Catálogo en SQLite: mismo contenido que el catálogo en memoria, también con varias sesiones"""
+import io
+import threading
+
+import pandas as pd
+import pytest
+
+from calculadora.almacen import CatalogoSQLite
+from calculadora.catalogo import CatalogoProductos
+from calculadora.importacion import importar_csv
+
+
+def importar(catalogo, datos, **opciones):
+    importar_csv(io.BytesIO(datos), catalogo.agregar_lote, 30.0, 19.0, 'margen', tamano_bloque=700, **opciones)
+
+
+def test_igual_al_catalogo_en_memoria(tmp_path, csv_importacion):
+    memoria = CatalogoProductos()
+    sqlite = CatalogoSQLite(str(tmp_path / 'catalogo.db'))
+    for catalogo in (memoria, sqlite):
+        importar(catalogo, csv_importacion)
+        importar(catalogo, csv_importacion, enteros=True)
+
+    esperado = memoria.a_dataframe()
+    esperado['metodo_calculo'] = esperado['metodo_calculo'].astype(str)
+    pd.testing.assert_frame_equal(sqlite.a_dataframe(), esperado, check_dtype=False)
+    pd.testing.assert_frame_equal(sqlite.a_dataframe(500, 650), esperado.iloc[500:650], check_dtype=False)
+    filas = [7, 3, len(memoria) - 1]
+    pd.testing.assert_frame_equal(sqlite.seleccionar(filas), esperado.iloc[filas], check_dtype=False)
+    # Las sumas de SQLite se acumulan en otro orden que las de NumPy
+    assert sqlite.resumen() == {clave: pytest.approx(valor, rel=1e-12) for clave, valor in memoria.resumen().items()}
+    pd.testing.assert_frame_equal(sqlite.estructura_costos(), memoria.estructura_costos())
+    assert sqlite.extremos('precio_con_iva') == memoria.extremos('precio_con_iva')
+    assert sqlite.buscar(esperado['nombre'].iloc[10]).tolist() == memoria.buscar(esperado['nombre'].iloc[10]).tolist()
+
+    for catalogo in (memoria, sqlite):
+        catalogo.revalorar(iva=10.0, metodo_calculo='markup', enteros=False)
+    esperado = memoria.a_dataframe()
+    esperado['metodo_calculo'] = esperado['metodo_calculo'].astype(str)
+    pd.testing.assert_frame_equal(sqlite.a_dataframe(), esperado, check_dtype=False)
+    assert sqlite.desactualizados(10.0, 'markup') == 0
+
+
+def test_sesiones_que_escriben_a_la_vez(tmp_path, csv_importacion):
+    ruta = str(tmp_path / 'compartido.db')
+    catalogo = CatalogoSQLite(ruta)
+    importar(catalogo, csv_importacion)
+    por_importacion = len(catalogo)
+    errores = []
+
+    def sesion(trabajo):
+        catalogo = CatalogoSQLite(ruta)
+        try:
+            for vuelta in range(10):
+                trabajo(catalogo, vuelta)
+        except Exception as error:
+            errores.append(error)
+        finally:
+            catalogo.cerrar()
+
+    hilos = [
+        threading.Thread(target=sesion, args=(lambda catalogo, vuelta: catalogo.revalorar(iva=10.0 + vuelta),)),
+        threading.Thread(target=sesion, args=(lambda catalogo, vuelta: catalogo.revalorar(metodo_calculo=('margen', 'markup')[vuelta % 2]),)),
+        threading.Thread(target=sesion, args=(lambda catalogo, vuelta: importar(catalogo, csv_importacion),))
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert not errores
+    assert len(catalogo) == 11 * por_importacion
+    # Los ids siguen siendo las posiciones 1..n
+    assert len(catalogo.a_dataframe()) == len(catalogo)
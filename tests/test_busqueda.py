@@ -0,0 +1,109 @@
+"""Búsqueda, filtros y orden con índice: mismas filas que recorrer el catálogo entero"""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculadora.almacen import CatalogoSQLite
+from calculadora.busqueda import IndiceCatalogo, normalizar
+from calculadora.catalogo import CatalogoProductos
+from calculadora.importacion import importar_csv
+
+PALABRAS = ['Tornillo', 'tuerca', 'Café', 'CAFE', 'Ñandú', 'ñandu', 'Perno', 'ab', 'a', 'Árbol', 'arbol']
+
+
+def csv_prueba(filas, semilla):
+    """Nombres repetidos, con mayúsculas y tildes, y márgenes enteros para que haya empates"""
+    aleatorio = np.random.default_rng(semilla)
+    nombres = [
+        f"{PALABRAS[i]} {j}" if j else PALABRAS[i]
+        for i, j in zip(aleatorio.integers(len(PALABRAS), size=filas), aleatorio.integers(0, 60, size=filas))
+    ]
+    return pd.DataFrame({
+        'nombre': nombres,
+        'costo_base': np.round(aleatorio.choice([100.0, 250.0, 999.99, 5000.0], filas) * aleatorio.integers(1, 4, filas), 2),
+        'margen': aleatorio.integers(0, 40, filas).astype(float),
+        'transporte': aleatorio.choice([0.0, 10.0, 35.5], filas)
+    }).to_csv(index=False).encode('utf-8')
+
+
+def agregar(catalogo, filas, semilla):
+    importar_csv(io.BytesIO(csv_prueba(filas, semilla)), catalogo.agregar_lote, 30.0, 19.0, 'margen', tamano_bloque=500)
+
+
+def consultar_directo(catalogo, texto='', rangos=None, orden=None):
+    """Filtra y ordena recorriendo todas las filas; los empates quedan en el orden del catálogo"""
+    productos = catalogo.a_dataframe().to_dict('records')
+    consulta = normalizar(texto)
+    filas = [
+        i for i, producto in enumerate(productos)
+        if consulta in normalizar(producto['nombre'])
+        and all(minimo <= producto[col] <= maximo for col, (minimo, maximo) in (rangos or {}).items())
+    ]
+    # Ordenamientos estables desde la columna de menor prioridad
+    for col, ascendente in reversed(orden or []):
+        if col == 'nombre':
+            clave = lambda i: normalizar(productos[i]['nombre'])
+        else:
+            clave = lambda i, col=col: productos[i][col]
+        filas.sort(key=clave, reverse=not ascendente)
+    return filas
+
+
+CONSULTAS = [
+    {},
+    {'texto': 'a'},
+    {'texto': 'CA'},
+    {'texto': 'cafe'},
+    {'texto': 'Ñandu 1'},
+    {'texto': 'arbol 5'},
+    {'texto': 'no existe'},
+    {'rangos': {'margen_real_sobre_ventas': (10.0, 20.0)}},
+    {'rangos': {'margen_real_sobre_ventas': (5.0, 35.0), 'precio_con_iva': (0.0, 3000.0)}},
+    {'texto': 'tor', 'rangos': {'descuento_maximo': (0.0, 30.0)}},
+    {'orden': [('nombre', True)]},
+    {'orden': [('precio_con_iva', False)]},
+    {'orden': [('margen_real_sobre_ventas', True), ('nombre', False)]},
+    {'texto': 'n', 'orden': [('costo_total', False), ('ganancia', True), ('nombre', True)]},
+    {'texto': 'e', 'rangos': {'precio_con_iva': (500.0, 10_000.0)}, 'orden': [('descuento_maximo', True)]}
+]
+
+
+@pytest.mark.parametrize('tipo', ['memoria', 'sqlite'])
+def test_consultas_igual_a_recorrer(tipo, tmp_path):
+    catalogo = CatalogoProductos() if tipo == 'memoria' else CatalogoSQLite(str(tmp_path / 'catalogo.db'))
+    indice = IndiceCatalogo(catalogo)
+    agregar(catalogo, 1500, 1)
+
+    def comparar():
+        for consulta in CONSULTAS:
+            assert indice.consultar(**consulta).tolist() == consultar_directo(catalogo, **consulta), consulta
+
+    comparar()
+    # Con productos nuevos solo se indexan los nombres que no estaban
+    nombres = indice.nombres
+    indexados = len(nombres)
+    agregar(catalogo, 700, 2)
+    comparar()
+    assert indice.nombres is nombres
+    assert len(nombres) > indexados
+    # Tras limpiar, los códigos de nombre empiezan de nuevo
+    catalogo.limpiar()
+    assert indice.consultar('a').tolist() == []
+    agregar(catalogo, 400, 3)
+    comparar()
+
+
+def test_resultado_reutilizado_hasta_que_cambia_el_catalogo():
+    catalogo = CatalogoProductos()
+    agregar(catalogo, 300, 4)
+    indice = IndiceCatalogo(catalogo)
+
+    primero = indice.consultar('perno', orden=[('ganancia', False)])
+    assert indice.consultar('PERNO', orden=[('ganancia', False)]) is primero
+    agregar(catalogo, 300, 5)
+    segundo = indice.consultar('perno', orden=[('ganancia', False)])
+    assert segundo is not primero
+    assert segundo.tolist() == consultar_directo(catalogo, 'perno', orden=[('ganancia', False)])
+    assert indice.extremos('precio_con_iva') == catalogo.extremos('precio_con_iva')
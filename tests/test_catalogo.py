@@ -0,0 +1,275 @@
+"""Catálogo en columnas: mismo contenido, resumen y estructura de costos que la lista de diccionarios
+que guardaba la app, y recalcular igual que volver a importar"""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculadora.almacen import CatalogoSQLite
+from calculadora.catalogo import COLUMNAS_PRODUCTO, DEPENDIENTES_IVA, CatalogoProductos
+from calculadora.importacion import importar_csv
+from calculadora.precios import CAMPOS_COSTOS, CATEGORIAS_COSTOS, calcular_precios
+
+
+def productos_prueba(filas=2500, semilla=11):
+    """Productos como los arma el formulario de la app: resultado de calcular_precios más sus entradas"""
+    aleatorio = np.random.default_rng(semilla)
+    productos = []
+    for i in range(filas):
+        costos = np.round(aleatorio.uniform(0, 3_000, len(CAMPOS_COSTOS)), 2)
+        costos[aleatorio.random(len(CAMPOS_COSTOS)) < 0.7] = 0
+        costo_base = round(float(aleatorio.uniform(0, 200_000)), 2)
+        margen = round(float(aleatorio.uniform(0, 120)), 2)
+        metodo = 'margen' if i % 3 else 'markup'
+        producto = calcular_precios(costo_base, sum(costos.tolist()), margen, 19.0, metodo)
+        # Nombres repetidos, como en las listas de proveedores
+        producto.update({
+            'nombre': f'Producto {i % 400}', 'costo_base_original': costo_base, 'margen': margen,
+            'enteros': 0.0, 'costos': costos
+        })
+        productos.append(producto)
+    return productos
+
+
+def como_lote(productos):
+    columnas = {col: np.array([producto[col] for producto in productos]) for col in productos[0] if col != 'nombre'}
+    return [producto['nombre'] for producto in productos], columnas
+
+
+def esperado(productos):
+    """La tabla que se armaba con pd.DataFrame(lista de diccionarios)"""
+    return pd.DataFrame(productos)[COLUMNAS_PRODUCTO]
+
+
+def sin_categorias(df):
+    """El catálogo guarda la metodología como Categorical; la lista, como texto"""
+    return df.assign(metodo_calculo=df['metodo_calculo'].astype(str))
+
+
+def comparar(catalogo, productos, inicio=0, fin=None):
+    pd.testing.assert_frame_equal(sin_categorias(catalogo.a_dataframe(inicio, fin)), esperado(productos)[inicio:fin])
+
+
+@pytest.fixture(scope='module')
+def productos():
+    return productos_prueba()
+
+
+def test_agregar_igual_a_lista(productos):
+    catalogo = CatalogoProductos()
+    for producto in productos:
+        catalogo.agregar(producto)
+
+    assert len(catalogo) == len(productos)
+    assert catalogo.version == len(productos)
+    comparar(catalogo, productos)
+    comparar(catalogo, productos, 1000, 1050)
+    np.testing.assert_array_equal(catalogo.costos(), np.array([producto['costos'] for producto in productos]))
+
+
+@pytest.mark.parametrize('tamano_bloque', [1, 700, 5000])
+def test_agregar_lote_igual_a_agregar(productos, tamano_bloque):
+    catalogo = CatalogoProductos()
+    for inicio in range(0, len(productos), tamano_bloque):
+        catalogo.agregar_lote(*como_lote(productos[inicio:inicio + tamano_bloque]))
+
+    comparar(catalogo, productos)
+    # Un nombre repetido se guarda una sola vez
+    nombres, codigos = catalogo.nombres_codigos()
+    assert len(nombres) == 400
+    assert [nombres[codigo] for codigo in codigos] == [producto['nombre'] for producto in productos]
+
+
+def test_seleccionar_y_buscar(productos):
+    catalogo = CatalogoProductos()
+    catalogo.agregar_lote(*como_lote(productos))
+
+    filas = [2499, 3, 1200, 3]
+    pd.testing.assert_frame_equal(sin_categorias(catalogo.seleccionar(filas)), esperado(productos).iloc[filas],
+                                  check_index_type=False)
+
+    posiciones = [i for i, producto in enumerate(productos) if producto['nombre'] == 'Producto 17']
+    np.testing.assert_array_equal(catalogo.buscar('Producto 17'), posiciones)
+    assert len(catalogo.buscar('No existe')) == 0
+
+
+def test_como_lotes_copia_el_catalogo(productos):
+    origen = CatalogoProductos()
+    origen.agregar_lote(*como_lote(productos))
+    copia = CatalogoProductos()
+    for nombres, columnas in origen.como_lotes(333):
+        copia.agregar_lote(nombres, columnas)
+
+    comparar(copia, productos)
+    np.testing.assert_array_equal(copia.costos(), origen.costos())
+    for col in ('costo_base_original', 'margen', 'iva', 'enteros'):
+        np.testing.assert_array_equal(copia.entrada(col), origen.entrada(col))
+
+
+def test_limpiar(productos):
+    catalogo = CatalogoProductos()
+    catalogo.agregar_lote(*como_lote(productos))
+    version = catalogo.version
+    catalogo.limpiar()
+
+    assert len(catalogo) == 0
+    assert catalogo.version > version
+    assert len(catalogo.a_dataframe()) == 0
+    catalogo.agregar(productos[0])
+    comparar(catalogo, productos[:1])
+
+
+def resumen_directo(catalogo):
+    """Resumen como lo calculaba la app: sumas y promedios recorriendo todos los productos"""
+    df = catalogo.a_dataframe()
+    total_inversion = df['costo_total'].sum()
+    total_final = df['precio_con_iva'].sum()
+    return {
+        'cantidad': len(df),
+        'total_costo_base': df['costo_base'].sum(),
+        'total_costos_adicionales': df['costos_adicionales'].sum(),
+        'total_inversion': total_inversion,
+        'total_neto': df['precio_sin_iva'].sum(),
+        'total_iva': df['valor_iva'].sum(),
+        'total_final': total_final,
+        'total_ganancia': df['ganancia'].sum(),
+        'margen_promedio': df['margen_real_sobre_ventas'].mean() if len(df) else 0.0,
+        'descuento_promedio': df['descuento_maximo'].mean() if len(df) else 0.0,
+        'roi': ((total_final / total_inversion) - 1) * 100 if total_inversion > 0 else 0.0,
+        'precio_minimo_promedio': total_inversion / len(df) if len(df) else 0.0
+    }
+
+
+def comparar_resumen(catalogo):
+    # Los acumulados suman en otro orden que un recorrido completo
+    assert catalogo.resumen() == {
+        clave: pytest.approx(valor, rel=1e-12, abs=1e-9) for clave, valor in resumen_directo(catalogo).items()
+    }
+
+
+@pytest.mark.parametrize('tipo', ['memoria', 'sqlite'])
+def test_resumen_igual_a_recorrer(productos, tipo, tmp_path):
+    catalogo = CatalogoProductos() if tipo == 'memoria' else CatalogoSQLite(str(tmp_path / 'catalogo.db'))
+    comparar_resumen(catalogo)
+
+    catalogo.agregar_lote(*como_lote(productos[:1500]))
+    comparar_resumen(catalogo)
+    for producto in productos[1500:1600]:
+        catalogo.agregar(producto)
+    catalogo.agregar_lote(*como_lote(productos[1600:]))
+    comparar_resumen(catalogo)
+    assert catalogo.resumen()['cantidad'] == len(productos)
+
+    # Recalcular cambia los totales de precios; los de costos no
+    costos = catalogo.resumen()['total_inversion']
+    catalogo.revalorar(iva=10.0, metodo_calculo='markup')
+    comparar_resumen(catalogo)
+    assert catalogo.resumen()['total_inversion'] == pytest.approx(costos, rel=1e-12)
+    catalogo.revalorar(enteros=True)
+    comparar_resumen(catalogo)
+
+    catalogo.limpiar()
+    assert catalogo.resumen() == resumen_directo(catalogo)
+
+
+# Mitades del catálogo de prueba: (IVA, metodología, pesos enteros) con que se importa cada una
+MITADES = [(19.0, 'margen', False), (10.5, 'markup', True)]
+
+
+def importar_mitades(csv_importacion, iva=None, metodo_calculo=None, enteros=None):
+    """Catálogo con las dos mitades importadas; cada parámetro dado reemplaza al de ambas mitades"""
+    catalogo = CatalogoProductos()
+    for iva_mitad, metodo_mitad, enteros_mitad in MITADES:
+        importar_csv(
+            io.BytesIO(csv_importacion), catalogo.agregar_lote, 30.0,
+            iva_mitad if iva is None else iva,
+            metodo_mitad if metodo_calculo is None else metodo_calculo,
+            tamano_bloque=700, enteros=enteros_mitad if enteros is None else enteros
+        )
+    return catalogo
+
+
+@pytest.mark.parametrize('cambio', [
+    {'iva': 10.5},
+    {'metodo_calculo': 'markup'},
+    {'iva': 0.0, 'metodo_calculo': 'margen'},
+    {'enteros': True},
+    {'enteros': False, 'iva': 19.0},
+    {'iva': 10.5, 'metodo_calculo': 'markup', 'enteros': True}
+])
+def test_revalorar_igual_a_importar(csv_importacion, cambio):
+    catalogo = importar_mitades(csv_importacion)
+    version = catalogo.version
+    recalculadas = catalogo.revalorar(**cambio)
+
+    esperado = importar_mitades(csv_importacion, **cambio)
+    pd.testing.assert_frame_equal(catalogo.a_dataframe(), esperado.a_dataframe())
+    np.testing.assert_array_equal(catalogo.costos(), esperado.costos())
+    for col in ('costo_base_original', 'margen', 'iva', 'enteros'):
+        np.testing.assert_array_equal(catalogo.entrada(col), esperado.entrada(col))
+    assert catalogo.resumen() == pytest.approx(esperado.resumen(), rel=1e-12)
+    assert catalogo.version > version
+    if list(cambio) == ['iva']:
+        # Un cambio de IVA no toca el precio neto
+        assert sorted(recalculadas) == sorted(DEPENDIENTES_IVA)
+
+
+def test_desactualizados(csv_importacion):
+    catalogo = importar_mitades(csv_importacion)
+    mitad = len(catalogo) // 2
+    assert catalogo.desactualizados(19.0, 'margen', False) == mitad
+    assert catalogo.desactualizados(10.5, 'margen', False) == 2 * mitad
+    assert catalogo.desactualizados(10.5, 'markup', True) == mitad
+
+    catalogo.revalorar(iva=10.5, metodo_calculo='markup', enteros=True)
+    assert catalogo.desactualizados(10.5, 'markup', True) == 0
+    # Sin nada que cambiar no se recalcula ni cambia la versión
+    version = catalogo.version
+    assert catalogo.revalorar(iva=10.5, metodo_calculo='markup', enteros=True) == []
+    assert catalogo.version == version
+
+
+def estructura_directa(productos):
+    """Total del costo base y de cada categoría sumando campo por campo, y su participación"""
+    totales = {'Costo Base': sum(producto['costo_base'] for producto in productos)}
+    for categoria in CATEGORIAS_COSTOS.values():
+        totales[categoria['titulo']] = sum(
+            float(producto['costos'][CAMPOS_COSTOS.index(campo_key)])
+            for producto in productos
+            for campo_key, _, _ in categoria['campos']
+        )
+    costo_total = sum(totales.values())
+    return {titulo: (total, total / costo_total * 100 if costo_total > 0 else 0.0) for titulo, total in totales.items()}
+
+
+@pytest.mark.parametrize('tipo', ['memoria', 'sqlite'])
+def test_estructura_costos_igual_a_sumar_campos(productos, tipo, tmp_path):
+    catalogo = CatalogoProductos() if tipo == 'memoria' else CatalogoSQLite(str(tmp_path / 'catalogo.db'))
+    for parte in (productos[:0], productos[:1], productos):
+        catalogo.limpiar()
+        if parte:
+            catalogo.agregar_lote(*como_lote(parte))
+        estructura = catalogo.estructura_costos()
+        esperado = estructura_directa(parte)
+
+        assert list(estructura.index) == list(esperado)
+        for titulo, (total, participacion) in esperado.items():
+            assert estructura.loc[titulo, 'Total'] == pytest.approx(total, rel=1e-12)
+            assert estructura.loc[titulo, 'Participación %'] == pytest.approx(participacion, rel=1e-12)
+        assert estructura['Participación %'].sum() == pytest.approx(100.0 if parte else 0.0)
+
+
+def test_subtotales_por_producto(productos):
+    catalogo = CatalogoProductos()
+    catalogo.agregar_lote(*como_lote(productos))
+    subtotales = catalogo.subtotales_categorias(100, 400)
+
+    assert subtotales.shape == (300, len(CATEGORIAS_COSTOS))
+    for fila, producto in zip(subtotales, productos[100:400]):
+        costos = dict(zip(CAMPOS_COSTOS, producto['costos'].tolist()))
+        esperado = [sum(costos[campo_key] for campo_key, _, _ in categoria['campos'])
+                    for categoria in CATEGORIAS_COSTOS.values()]
+        assert fila.tolist() == pytest.approx(esperado, rel=1e-12)
+        # Las categorías suman los costos adicionales del producto
+        assert fila.sum() == pytest.approx(producto['costos_adicionales'], rel=1e-12)
@@ -0,0 +1,34 @@
+"""Línea de comandos: mismo CSV que la exportación de la app, y salida cortada sin traza"""
+import io
+import subprocess
+import sys
+
+from calculadora.__main__ import main
+from calculadora.catalogo import CatalogoProductos
+from calculadora.exportacion import crear_csv_productos
+from calculadora.importacion import importar_csv
+
+
+def test_csv_igual_a_la_app(tmp_path, csv_importacion):
+    entrada = tmp_path / 'entrada.csv'
+    salida = tmp_path / 'salida.csv'
+    entrada.write_bytes(csv_importacion)
+    assert main([str(entrada), str(salida), '--iva', '10', '--metodo', 'markup', '--bloque', '500']) == 0
+
+    catalogo = CatalogoProductos()
+    importar_csv(io.BytesIO(csv_importacion), catalogo.agregar_lote, 30.0, 10.0, 'markup')
+    assert salida.read_text(encoding='utf-8') == crear_csv_productos(catalogo).to_csv(index=False)
+
+
+def test_tuberia_cerrada(tmp_path, csv_importacion):
+    # La salida supera el buffer de la tubería, así que la escritura falla al cerrarla
+    entrada = tmp_path / 'entrada.csv'
+    entrada.write_bytes(csv_importacion)
+    proceso = subprocess.Popen([sys.executable, '-m', 'calculadora', str(entrada), '-'],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # Como head -1: lee una línea y cierra la tubería
+    proceso.stdout.readline()
+    proceso.stdout.close()
+    errores = proceso.stderr.read()
+    proceso.wait(timeout=60)
+    assert b'Traceback' not in errores
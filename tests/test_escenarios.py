@@ -0,0 +1,63 @@
+"""Grilla de sensibilidad: mismas métricas que valorar el catálogo con calcular_precios en cada celda"""
+import numpy as np
+import pytest
+
+from calculadora.escenarios import METRICAS_SENSIBILIDAD, analizar_sensibilidad, rango_margenes, tabla_sensibilidad
+from calculadora.precios import calcular_precios
+
+IVAS = [0.0, 10.5, 19.0]
+
+
+def metricas_directas(costo_total, margen, iva, metodo):
+    """Métricas de una celda como las calcula el resumen: cada producto con calcular_precios"""
+    productos = [calcular_precios(costo, 0, margen, iva, metodo) for costo in costo_total]
+    total_inversion = sum(producto['costo_total'] for producto in productos)
+    total_final = sum(producto['precio_con_iva'] for producto in productos)
+    return {
+        'ganancia_total': sum(producto['ganancia'] for producto in productos),
+        'total_final': total_final,
+        'roi': ((total_final / total_inversion) - 1) * 100 if total_inversion > 0 else 0.0,
+        'descuento_promedio': (
+            sum(producto['descuento_maximo'] for producto in productos) / len(productos) if productos else 0.0
+        )
+    }
+
+
+@pytest.mark.parametrize('costo_total', [
+    np.round(np.random.default_rng(5).uniform(0, 50_000, 300), 2),
+    np.array([0.0, 0.0, 1200.0, 0.0]),
+    np.array([0.0]),
+    np.array([])
+], ids=['aleatorio', 'con_ceros', 'solo_cero', 'vacio'])
+def test_grilla_igual_a_fuerza_bruta(costo_total):
+    # Incluye margen 0, márgenes de 99% o más (el método margen los limita a 99) y markups altos
+    margenes = np.concatenate([rango_margenes(0, 120, 7.5), [99.0, 99.5, 100.0]])
+    resultado = analizar_sensibilidad(costo_total, margenes, IVAS)
+
+    assert resultado['metodos'] == ['margen', 'markup']
+    for i, metodo in enumerate(resultado['metodos']):
+        for j, margen in enumerate(margenes):
+            for k, iva in enumerate(IVAS):
+                esperado = metricas_directas(costo_total, margen, iva, metodo)
+                for metrica in METRICAS_SENSIBILIDAD:
+                    # La grilla escala la suma de costos en vez de sumar producto por producto
+                    assert resultado[metrica][i, j, k] == pytest.approx(esperado[metrica], rel=1e-9, abs=1e-6), \
+                        (metodo, margen, iva, metrica)
+
+
+def test_tabla_sensibilidad():
+    resultado = analizar_sensibilidad([1000.0, 2500.0], [10.0, 20.0, 30.0], IVAS, metodos=['markup'])
+    tabla = tabla_sensibilidad(resultado, 'total_final')
+
+    assert list(tabla.index) == [10.0, 20.0, 30.0]
+    assert list(tabla.columns) == ['Markup · IVA 0%', 'Markup · IVA 10.5%', 'Markup · IVA 19%']
+    assert tabla.loc[20.0, 'Markup · IVA 19%'] == pytest.approx(3500 * 1.2 * 1.19)
+
+
+def test_rango_margenes():
+    np.testing.assert_array_equal(rango_margenes(10, 40, 10), [10.0, 20.0, 30.0, 40.0])
+    # Pasos decimales sin arrastrar el error de punto flotante
+    assert rango_margenes(0, 1, 0.1)[-1] == 1.0
+    assert len(rango_margenes(0, 1, 0.1)) == 11
+    np.testing.assert_array_equal(rango_margenes(25, 10, 5), [25.0])
+    np.testing.assert_array_equal(rango_margenes(25, 50, 0), [25.0])
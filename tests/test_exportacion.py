@@ -0,0 +1,32 @@
+"""CSV exportado por bloques igual al exportado desde un DataFrame completo"""
+import io
+
+import pytest
+
+from calculadora.almacen import CatalogoSQLite
+from calculadora.catalogo import CatalogoProductos
+from calculadora.exportacion import crear_csv_bytes, crear_csv_productos, escribir_csv_productos
+from calculadora.importacion import importar_csv
+
+
+@pytest.fixture(params=['memoria', 'sqlite'])
+def catalogo(request, tmp_path, csv_importacion):
+    if request.param == 'memoria':
+        catalogo = CatalogoProductos()
+    else:
+        catalogo = CatalogoSQLite(str(tmp_path / 'catalogo.db'))
+    importar_csv(io.BytesIO(csv_importacion), catalogo.agregar_lote, 30.0, 19.0, 'markup', tamano_bloque=700)
+    return catalogo
+
+
+@pytest.mark.parametrize('tamano_bloque', [7, 333, 1_000_000])
+def test_csv_por_bloques(catalogo, tamano_bloque):
+    salida = io.StringIO()
+    filas = escribir_csv_productos(catalogo, salida, tamano_bloque)
+
+    assert filas == len(catalogo)
+    assert salida.getvalue() == crear_csv_productos(catalogo).to_csv(index=False)
+
+
+def test_csv_bytes(catalogo):
+    assert crear_csv_bytes(catalogo) == crear_csv_productos(catalogo).to_csv(index=False).encode('utf-8')
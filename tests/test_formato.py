@@ -0,0 +1,28 @@
+"""Formateo vectorizado igual al formateo escalar, valor por valor"""
+import numpy as np
+
+from calculadora.formato import formatear_peso, formatear_pesos, formatear_porcentajes
+
+ESPECIALES = [0.0, -0.0, 0.5, 1.5, 2.5, -0.4, -0.5, -2.5, 999.5, 1000, 999_999.5, -1_234_567.49,
+              2.0 ** 53, 2.0 ** 62, -2.0 ** 63, 1e20, np.nan, np.inf, -np.inf]
+
+
+def test_pesos_igual_a_escalar():
+    aleatorio = np.random.default_rng(5)
+    valores = np.concatenate([
+        ESPECIALES,
+        np.round(aleatorio.uniform(-1e7, 1e9, 5000), 2),
+        aleatorio.integers(0, 2000, 2000) + 0.5
+    ])
+    assert formatear_pesos(valores).tolist() == [formatear_peso(valor) for valor in valores]
+
+
+def test_porcentajes_igual_a_escalar():
+    aleatorio = np.random.default_rng(6)
+    valores = np.concatenate([
+        ESPECIALES,
+        [0.05, 0.15, 0.25, -0.05, 12.345, 99.95, 1234.45],
+        np.round(aleatorio.uniform(-200, 200, 5000), 3),
+        (aleatorio.integers(-2000, 2000, 2000) + 0.5) / 10
+    ])
+    assert formatear_porcentajes(valores).tolist() == [f"{valor:.1f}%" for valor in valores]
@@ -0,0 +1,114 @@
+"""Importación de CSV: por bloques igual que de una vez, caché de importaciones y memoria acotada"""
+import io
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from calculadora.catalogo import CatalogoProductos
+from calculadora.importacion import (CacheImportaciones, concatenar_columnas, importar_columnas, importar_csv,
+                                     memoria_columnas)
+
+
+def importar(datos, tamano_bloque=None, al_avanzar=None):
+    catalogo = CatalogoProductos()
+    columnas = importar_csv(io.BytesIO(datos), catalogo.agregar_lote, 30.0, 19.0, 'margen', tamano_bloque, al_avanzar)
+    return catalogo, columnas
+
+
+def test_por_bloques_igual_a_completo(csv_importacion):
+    completo, columnas_completas = importar(csv_importacion)
+    avances = []
+    por_bloques, columnas = importar(csv_importacion, 400, lambda filas, productos: avances.append((filas, productos)))
+
+    pd.testing.assert_frame_equal(por_bloques.a_dataframe(), completo.a_dataframe())
+    for col in columnas_completas:
+        np.testing.assert_array_equal(columnas[col], columnas_completas[col])
+    # Un avance por bloque: filas leídas (incluidas las inválidas) y productos agregados
+    assert [filas for filas, _ in avances] == list(range(400, 3000, 400)) + [3000]
+    assert avances[-1][1] == len(completo)
+    assert len(completo) < 3000
+
+
+def test_sin_columnas_obligatorias():
+    catalogo, columnas = importar(b'producto,precio\na,1\n', 10)
+    assert len(catalogo) == 0
+    assert len(columnas['nombre']) == 0
+
+
+class Subido(io.BytesIO):
+    """Imita el archivo subido de Streamlit: contenido en memoria con un file_id"""
+
+    def __init__(self, datos, file_id):
+        super().__init__(datos)
+        self.file_id = file_id
+        self.size = len(datos)
+
+
+def test_cache_reutiliza_columnas_y_revalora(csv_importacion):
+    cache = CacheImportaciones()
+    huella = cache.huella(Subido(csv_importacion, 'a'))
+    assert cache.huella(Subido(csv_importacion, 'b')) == huella
+    assert cache.columnas(huella) is None
+
+    _, columnas = importar(csv_importacion)
+    cache.guardar(huella, columnas)
+    cache.marcar_importada(huella, (19.0, 'margen', 30.0, False))
+    assert cache.importada(huella)
+    assert cache.importada(huella, (19.0, 'margen', 30.0, False))
+    assert not cache.importada(huella, (10.0, 'margen', 30.0, False))
+
+    # Otra configuración: se valoran las columnas guardadas, sin volver a leer el archivo
+    revalorado = CatalogoProductos()
+    importar_columnas(cache.columnas(huella), revalorado.agregar_lote, 25.0, 10.0, 'markup', tamano_bloque=333, enteros=True)
+    esperado = CatalogoProductos()
+    importar_csv(io.BytesIO(csv_importacion), esperado.agregar_lote, 25.0, 10.0, 'markup', enteros=True)
+    pd.testing.assert_frame_equal(revalorado.a_dataframe(), esperado.a_dataframe())
+
+
+def test_cache_descarta_archivos_viejos_y_grandes(csv_importacion):
+    _, columnas = importar(csv_importacion)
+    cache = CacheImportaciones(max_archivos=2, memoria_maxima=memoria_columnas(columnas))
+    for huella in ('a', 'b', 'c'):
+        cache.guardar(huella, columnas)
+    assert cache.columnas('a') is None
+    assert cache.columnas('c') is columnas
+
+    grandes = concatenar_columnas([columnas, columnas])
+    cache.guardar('d', grandes)
+    assert cache.columnas('d') is None
+    assert cache.admite(len(csv_importacion))
+    assert not cache.admite(memoria_columnas(columnas) + 1)
+
+
+def test_limite_de_columnas(csv_importacion):
+    _, columnas = importar(csv_importacion)
+    catalogo = CatalogoProductos()
+    limite = memoria_columnas(columnas)
+    assert importar_csv(io.BytesIO(csv_importacion), catalogo.agregar_lote, 30.0, 19.0, 'margen', 400,
+                        limite_columnas=limite)['nombre'].tolist() == columnas['nombre'].tolist()
+    assert importar_csv(io.BytesIO(csv_importacion), catalogo.agregar_lote, 30.0, 19.0, 'margen', 400,
+                        limite_columnas=limite // 2) is None
+
+
+def test_memoria_acotada_sin_guardar_columnas(csv_importacion):
+    """Sin juntar columnas, la memoria de la lectura por bloques no crece con el archivo"""
+    encabezado, filas = csv_importacion.split(b'\n', 1)
+
+    def pico(repeticiones):
+        datos = io.BytesIO(encabezado + b'\n' + filas * repeticiones)
+        productos = []
+        tracemalloc.start()
+        importar_csv(datos, lambda nombres, _: productos.append(len(nombres)), 30.0, 19.0, 'margen', 500,
+                     limite_columnas=0)
+        maximo = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return maximo, sum(productos)
+
+    # La primera lectura reserva cachés internas de pandas y el lector
+    # de CSV usa un búfer fijo que se llena con los primeros megabytes
+    pico(1)
+    chico, productos_chico = pico(8)
+    grande, productos_grande = pico(48)
+    assert productos_grande == 6 * productos_chico
+    assert grande < 1.25 * chico
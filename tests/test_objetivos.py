@@ -0,0 +1,80 @@
+"""Cálculo inverso: el margen o costo obtenido vuelve a dar el precio objetivo con calcular_precios"""
+import io
+
+import numpy as np
+import pytest
+
+from calculadora.objetivos import leer_precios_objetivo, resolver_precios_objetivo
+from calculadora.precios import calcular_precios, calcular_precios_lote, costo_maximo_lote, margen_para_precio_lote
+
+
+def filas_prueba(filas=3000, semilla=13):
+    """Costos, márgenes (también negativos) e IVA; el método margen solo bajo 99%, donde no se recorta"""
+    aleatorio = np.random.default_rng(semilla)
+    metodo = np.where(np.arange(filas) % 2 == 0, 'margen', 'markup')
+    costo_total = np.round(aleatorio.uniform(1, 300_000, filas), 2)
+    margen = np.where(metodo == 'margen', aleatorio.uniform(-50, 98, filas), aleatorio.uniform(-90, 400, filas))
+    iva = np.where(np.arange(filas) % 3 == 0, 0.0, 19.0)
+    return costo_total, np.round(margen, 2), iva, metodo
+
+
+def test_margen_para_precio_ida_y_vuelta():
+    costo_total, margen, iva, metodo = filas_prueba()
+    precio = calcular_precios_lote(costo_total, np.zeros(len(costo_total)), margen, iva, metodo)['precio_con_iva']
+
+    resultado = margen_para_precio_lote(precio, costo_total, iva, metodo)
+    assert resultado['alcanzable'].all()
+    np.testing.assert_allclose(resultado['margen'], margen, rtol=1e-9, atol=1e-9)
+    # Y con el margen obtenido, calcular_precios llega de nuevo al precio objetivo
+    for i in range(0, len(precio), 97):
+        directo = calcular_precios(costo_total[i], 0, resultado['margen'][i], iva[i], metodo[i])
+        assert directo['precio_con_iva'] == pytest.approx(precio[i], rel=1e-12)
+        assert directo['precio_sin_iva'] == pytest.approx(resultado['precio_sin_iva'][i], rel=1e-12)
+        assert directo['ganancia'] == pytest.approx(resultado['ganancia'][i], rel=1e-9, abs=1e-6)
+
+
+def test_costo_maximo_ida_y_vuelta():
+    costo_total, margen, iva, metodo = filas_prueba()
+    precio = np.round(costo_total * 1.7, 2)
+
+    resultado = costo_maximo_lote(precio, margen, iva, metodo)
+    assert resultado['alcanzable'].all()
+    directo = calcular_precios_lote(resultado['costo_maximo'], np.zeros(len(precio)), margen, iva, metodo)
+    np.testing.assert_allclose(directo['precio_con_iva'], precio, rtol=1e-12)
+    np.testing.assert_allclose(directo['ganancia'], resultado['ganancia'], rtol=1e-9, atol=1e-6)
+
+
+def test_objetivos_inalcanzables():
+    margen = margen_para_precio_lote([0.0, -100.0, 1000.0, 1000.0], [500.0, 500.0, 0.0, -5.0], 19.0, 'margen')
+    assert not margen['alcanzable'].any()
+    assert np.isnan(margen['margen']).all()
+
+    costo = costo_maximo_lote([0.0, 1000.0, 1000.0, 1000.0], [30.0, 100.0, -100.0, 120.0], 19.0,
+                              ['margen', 'margen', 'markup', 'margen'])
+    assert not costo['alcanzable'].any()
+    assert np.isnan(costo['costo_maximo']).all()
+    # Un markup de -100% o menos no se logra, uno apenas mayor sí
+    assert costo_maximo_lote(1000.0, -99.0, 19.0, 'markup')['alcanzable']
+
+
+def test_resolver_desde_csv():
+    datos = (
+        b'nombre,precio_objetivo,costo_base,margen,transporte\n'
+        b'Tornillo,1190,600,,100\n'
+        b'Tuerca,2380,1000,20,\n'
+        b',500,100,,\n'
+        b'Perno,0,100,,\n'
+    )
+    columnas = leer_precios_objetivo(io.BytesIO(datos))
+    assert columnas['nombre'].tolist() == ['Tornillo', 'Tuerca', 'Perno']
+    np.testing.assert_array_equal(columnas['costo_total'], [700.0, 1000.0, 100.0])
+
+    implicito = resolver_precios_objetivo(columnas, 'margen', 19.0, 'markup', 30.0)
+    assert implicito['Markup % Implícito'].iloc[:2].tolist() == pytest.approx([1000 / 700 * 100 - 100, 100.0])
+    assert implicito['Alcanzable'].tolist() == [True, True, False]
+
+    maximo = resolver_precios_objetivo(columnas, 'costo', 19.0, 'margen', 30.0)
+    # Sin margen en el archivo se usa el margen por defecto
+    assert maximo['Margen % Objetivo'].tolist() == [30.0, 20.0, 30.0]
+    assert maximo['Costo Máximo'].iloc[:2].tolist() == pytest.approx([700.0, 1600.0])
+    assert maximo['Alcanzable'].tolist() == [True, True, False]
@@ -0,0 +1,53 @@
+"""Importación y exportación en varios procesos iguales a las de un solo proceso"""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculadora.catalogo import CatalogoProductos
+from calculadora.exportacion import crear_csv_productos
+from calculadora.importacion import importar_csv
+from calculadora.paralelo import exportar_csv_paralelo, importar_csv_paralelo
+
+# Fragmentos chicos, para que el CSV de prueba se reparta en varios
+TAMANO_FRAGMENTO = 16 * 1024
+
+
+def importar_un_proceso(datos, enteros):
+    catalogo = CatalogoProductos()
+    columnas = importar_csv(io.BytesIO(datos), catalogo.agregar_lote, 30.0, 19.0, 'margen', tamano_bloque=500,
+                            enteros=enteros)
+    return catalogo, columnas
+
+
+@pytest.mark.parametrize('enteros', [False, True])
+def test_importacion_paralela(csv_importacion, enteros):
+    esperado, columnas_esperadas = importar_un_proceso(csv_importacion, enteros)
+    catalogo = CatalogoProductos()
+    avances = []
+    columnas = importar_csv_paralelo(
+        csv_importacion, catalogo.agregar_lote, 30.0, 19.0, 'margen', trabajadores=2,
+        tamano_fragmento=TAMANO_FRAGMENTO, al_avanzar=lambda filas, productos: avances.append(productos),
+        enteros=enteros
+    )
+
+    assert len(avances) > 1
+    assert avances[-1] == len(esperado)
+    pd.testing.assert_frame_equal(catalogo.a_dataframe(), esperado.a_dataframe())
+    assert columnas.keys() == columnas_esperadas.keys()
+    for col in columnas:
+        np.testing.assert_array_equal(columnas[col], columnas_esperadas[col])
+
+
+@pytest.mark.parametrize('enteros', [False, True])
+def test_exportacion_paralela(csv_importacion, enteros):
+    esperado, _ = importar_un_proceso(csv_importacion, enteros)
+    salida = io.StringIO()
+    escritos = exportar_csv_paralelo(
+        csv_importacion, salida, 30.0, 19.0, 'margen', trabajadores=2,
+        tamano_fragmento=TAMANO_FRAGMENTO, enteros=enteros
+    )
+
+    assert escritos == len(esperado)
+    assert salida.getvalue() == crear_csv_productos(esperado).to_csv(index=False)
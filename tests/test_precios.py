@@ -0,0 +1,43 @@
+"""Motor de precios vectorizado: mismo resultado que calcular_precios, fila por fila"""
+import numpy as np
+
+from calculadora.precios import CAMPOS_COSTOS, calcular_precios, calcular_precios_lote
+
+
+def datos_prueba(filas=2000, semilla=3):
+    """Columnas con montos de hasta tres decimales, mitades exactas y márgenes en los bordes"""
+    aleatorio = np.random.default_rng(semilla)
+    costo_base = np.round(aleatorio.uniform(0, 500_000, filas), 2)
+    costos = np.round(aleatorio.uniform(0, 3_000, (filas, len(CAMPOS_COSTOS))), 3)
+    costos[aleatorio.random(costos.shape) < 0.7] = 0
+    margen = np.round(aleatorio.uniform(-20, 150, filas), 2)
+    costo_base[::9] = 0
+    costo_base[1::9] = 1000.5
+    costos[::5, 0] = 2.675
+    margen[::7] = 0
+    margen[1::7] = 100
+    margen[2::7] = 99.995
+    iva = np.where(np.arange(filas) % 3 == 0, 10.5, 19.0)
+    metodo = np.where(np.arange(filas) % 2 == 0, 'margen', 'markup')
+    return costo_base, costos, margen, iva, metodo
+
+
+def iguales(a, b):
+    return a == b or (a != a and b != b)
+
+
+def test_lote_igual_a_escalar():
+    costo_base, costos, margen, iva, metodo = datos_prueba()
+    lote = calcular_precios_lote(costo_base, costos, margen, iva, metodo)
+    for i in range(len(costo_base)):
+        escalar = calcular_precios(costo_base[i], sum(costos[i].tolist()), margen[i], iva[i], metodo[i])
+        for clave, valor in escalar.items():
+            assert iguales(lote[clave][i].item(), valor), (i, clave)
+
+
+def test_lote_con_costos_por_campo_igual_a_total():
+    costo_base, costos, margen, iva, metodo = datos_prueba()
+    por_campo = calcular_precios_lote(costo_base, costos, margen, iva, metodo)
+    total = calcular_precios_lote(costo_base, [sum(fila) for fila in costos.tolist()], margen, iva, metodo)
+    for clave in por_campo:
+        np.testing.assert_array_equal(por_campo[clave], total[clave])
@@ -0,0 +1,119 @@
+"""Motor de pesos enteros: mismos montos que una referencia con Decimal y ROUND_HALF_UP"""
+import io
+from decimal import ROUND_HALF_UP, Decimal, localcontext
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculadora.almacen import CatalogoSQLite
+from calculadora.catalogo import CatalogoProductos
+from calculadora.importacion import importar_csv
+from calculadora.precios import (CAMPOS_COSTOS, calcular_precios, calcular_precios_enteros,
+                                 calcular_precios_enteros_lote)
+
+MONTOS = ['costo_total', 'precio_sin_iva', 'valor_iva', 'precio_con_iva', 'ganancia']
+
+
+def datos_prueba(filas=2000, semilla=3):
+    """Columnas con montos de hasta tres decimales, mitades exactas y márgenes en los bordes"""
+    aleatorio = np.random.default_rng(semilla)
+    costo_base = np.round(aleatorio.uniform(0, 500_000, filas), 2)
+    costos = np.round(aleatorio.uniform(0, 3_000, (filas, len(CAMPOS_COSTOS))), 3)
+    costos[aleatorio.random(costos.shape) < 0.7] = 0
+    margen = np.round(aleatorio.uniform(-20, 150, filas), 2)
+    costo_base[::9] = 0
+    costo_base[1::9] = 1000.5
+    costos[::5, 0] = 2.675
+    margen[::7] = 0
+    margen[1::7] = 100
+    margen[2::7] = 99.995
+    iva = np.where(np.arange(filas) % 3 == 0, 10.5, 19.0)
+    metodo = np.where(np.arange(filas) % 2 == 0, 'margen', 'markup')
+    return costo_base, costos, margen, iva, metodo
+
+
+def a_entero(valor, escala=1):
+    return (Decimal(str(valor)) * escala).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+
+
+def referencia_entera(costo_base, costos, margen, iva, metodo):
+    """Montos esperados del motor entero, calculados con Decimal y ROUND_HALF_UP"""
+    with localcontext() as contexto:
+        contexto.prec = 50
+        costo = a_entero(costo_base) + sum(a_entero(costo) for costo in costos)
+        margen = a_entero(margen, 100)
+        if metodo == 'margen':
+            if margen >= 10000:
+                margen = Decimal(9900)
+            precio = costo * 10000 / (10000 - margen)
+        else:
+            precio = costo * (10000 + margen) / 10000
+        precio = precio.quantize(Decimal(1), rounding=ROUND_HALF_UP)
+        valor_iva = (precio * a_entero(iva, 100) / 10000).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+        return {
+            'costo_total': costo,
+            'precio_sin_iva': precio,
+            'valor_iva': valor_iva,
+            'precio_con_iva': precio + valor_iva,
+            'ganancia': precio - costo
+        }
+
+
+def test_motor_entero_igual_a_decimal():
+    costo_base, costos, margen, iva, metodo = datos_prueba()
+    lote = calcular_precios_enteros_lote(costo_base, costos, margen, iva, metodo)
+    for i in range(len(costo_base)):
+        esperado = referencia_entera(costo_base[i], costos[i].tolist(), margen[i], iva[i], metodo[i])
+        for clave in MONTOS:
+            assert lote[clave][i] == esperado[clave], (i, clave)
+
+
+@pytest.mark.parametrize('costo_base, costos, margen, iva, metodo, precio_con_iva', [
+    # 1000 / (1 - 0.3) = 1428.57 -> 1429; IVA 271.51 -> 272
+    (1000, [], 30, 19, 'margen', 1701),
+    # 0.5 -> 1 y 2.675 -> 3 antes de sumar: costo 5, precio 5 × 1.5 = 7.5 -> 8
+    (0.5, [0.5, 2.675], 50, 0, 'markup', 8),
+    # Margen de 100% acotado a 99%: 10 / 0.01 = 1000; IVA 190
+    (10, [], 100, 19, 'margen', 1190)
+])
+def test_motor_entero_escalar(costo_base, costos, margen, iva, metodo, precio_con_iva):
+    costos = costos + [0.0] * (len(CAMPOS_COSTOS) - len(costos))
+    resultado = calcular_precios_enteros(costo_base, costos, margen, iva, metodo)
+    assert resultado['precio_con_iva'] == precio_con_iva
+    assert set(resultado) == set(calcular_precios(costo_base, sum(costos), margen, iva, metodo))
+
+
+def test_motor_entero_escalar_con_arreglos():
+    costos = np.zeros(len(CAMPOS_COSTOS))
+    costos[0] = 2.675
+    resultado = calcular_precios_enteros(np.float64(0.5), costos, np.float64(50), np.float64(0), 'markup')
+    assert resultado['precio_con_iva'] == 6
+    assert calcular_precios_enteros(100, None, 30, 19, 'markup')['costo_total'] == 100
+
+
+@pytest.fixture(params=['memoria', 'sqlite'])
+def nuevo_catalogo(request, tmp_path):
+    def crear(nombre='catalogo'):
+        if request.param == 'memoria':
+            return CatalogoProductos()
+        return CatalogoSQLite(str(tmp_path / f'{nombre}.db'))
+    return crear
+
+
+def test_volver_a_decimales_no_arrastra_el_redondeo(nuevo_catalogo, csv_importacion):
+    catalogo = nuevo_catalogo()
+    importar_csv(io.BytesIO(csv_importacion), catalogo.agregar_lote, 30.0, 19.0, 'margen', tamano_bloque=700)
+    decimales = nuevo_catalogo('decimales')
+    importar_csv(io.BytesIO(csv_importacion), decimales.agregar_lote, 30.0, 19.0, 'margen')
+    enteros = nuevo_catalogo('enteros')
+    importar_csv(io.BytesIO(csv_importacion), enteros.agregar_lote, 30.0, 19.0, 'margen', enteros=True)
+
+    assert catalogo.revalorar(enteros=True)
+    pd.testing.assert_frame_equal(catalogo.a_dataframe(), enteros.a_dataframe())
+    assert catalogo.resumen() == enteros.resumen()
+
+    assert catalogo.revalorar(enteros=False)
+    pd.testing.assert_frame_equal(catalogo.a_dataframe(), decimales.a_dataframe())
+    assert catalogo.resumen() == decimales.resumen()
+    assert catalogo.desactualizados(19.0, 'margen') == 0
@@ -0,0 +1,121 @@
+"""Caché de listas de referencia: mismo contenido y contadores que un LRU recorrido a mano"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from calculadora.referencias import CacheReferencias, columnas_referencia, listar_referencias
+
+
+def columnas_de(kb):
+    """Columnas numéricas de kb kilobytes exactos"""
+    return {'costo_base': np.zeros(kb * 128)}
+
+
+def test_lru_igual_a_recorrer():
+    aleatorio = np.random.default_rng(21)
+    cache = CacheReferencias(memoria_maxima=64 * 1024)
+    # Modelo: claves en orden de uso, con su tamaño
+    modelo = OrderedDict()
+    contadores = {'aciertos': 0, 'fallos': 0, 'desalojos': 0}
+
+    for _ in range(3000):
+        clave = int(aleatorio.integers(20))
+        if aleatorio.random() < 0.5:
+            columnas = cache.obtener(clave)
+            if clave in modelo:
+                contadores['aciertos'] += 1
+                modelo.move_to_end(clave)
+                assert columnas['costo_base'].nbytes == modelo[clave]
+            else:
+                contadores['fallos'] += 1
+                assert columnas is None
+        else:
+            kb = int(aleatorio.integers(1, 24))
+            cache.guardar(clave, columnas_de(kb))
+            modelo.pop(clave, None)
+            modelo[clave] = kb * 1024
+            while sum(modelo.values()) > 64 * 1024:
+                modelo.popitem(last=False)
+                contadores['desalojos'] += 1
+
+        # Si el orden de uso difiriera, el siguiente desalojo sacaría otra clave
+        assert {k for k in range(20) if cache.obtener(k, contar=False) is not None} == set(modelo)
+    assert cache.contadores() == {
+        **contadores, 'listas': len(modelo), 'memoria': sum(modelo.values()), 'memoria_maxima': 64 * 1024
+    }
+    assert contadores['desalojos'] > 0
+
+
+def test_consulta_sin_contar_no_renueva():
+    cache = CacheReferencias(memoria_maxima=20 * 1024)
+    cache.guardar('a', columnas_de(8))
+    cache.guardar('b', columnas_de(8))
+    assert cache.obtener('a', contar=False) is not None
+    assert cache.obtener('c', contar=False) is None
+    cache.guardar('c', columnas_de(8))
+
+    # 'a' sigue siendo la menos usada y es la que se desaloja
+    assert cache.obtener('a', contar=False) is None
+    assert cache.obtener('b', contar=False) is not None
+    contadores = cache.contadores()
+    assert (contadores['aciertos'], contadores['fallos'], contadores['desalojos']) == (0, 0, 1)
+
+
+def test_lista_mas_grande_que_el_tope():
+    cache = CacheReferencias(memoria_maxima=16 * 1024)
+    cache.guardar('chica', columnas_de(8))
+    grande = columnas_de(32)
+    assert cache.guardar('grande', grande) is grande
+
+    assert cache.obtener('grande') is None
+    assert cache.obtener('chica') is not None
+    assert cache.contadores()['desalojos'] == 0
+    assert cache.contadores()['memoria'] == 8 * 1024
+    # Igual queda de solo lectura: otras sesiones pueden estar usándola
+    with pytest.raises(ValueError):
+        grande['costo_base'][0] = 1.0
+
+
+def test_cargar_lee_una_sola_vez():
+    cache = CacheReferencias()
+    lecturas = []
+
+    def leer():
+        lecturas.append(1)
+        time.sleep(0.05)
+        return columnas_de(4)
+
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(cache.cargar('lista', leer))) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(lecturas) == 1
+    assert all(columnas is resultados[0] for columnas in resultados)
+    assert cache.contadores()['fallos'] == 8
+
+
+def test_columnas_referencia(tmp_path):
+    ruta = tmp_path / 'proveedor.csv'
+    ruta.write_text('nombre,costo_base\nTornillo,100\nTuerca,50\n', encoding='utf-8')
+    (tmp_path / 'notas.txt').write_text('no es una lista', encoding='utf-8')
+    (tmp_path / 'carpeta.csv').mkdir()
+    assert listar_referencias(str(tmp_path)) == ['proveedor.csv']
+    assert listar_referencias(str(tmp_path / 'no_existe')) == []
+
+    cache = CacheReferencias()
+    columnas = columnas_referencia(cache, str(ruta))
+    assert columnas['nombre'].tolist() == ['Tornillo', 'Tuerca']
+    assert columnas_referencia(cache, str(ruta)) is columnas
+
+    # Un archivo modificado se vuelve a leer
+    ruta.write_text('nombre,costo_base\nPerno,75\n', encoding='utf-8')
+    os.utime(ruta, ns=(0, os.stat(ruta).st_mtime_ns + 1))
+    assert columnas_referencia(cache, str(ruta))['nombre'].tolist() == ['Perno']
+    assert cache.contadores()['aciertos'] == 1
@@ -0,0 +1,124 @@
+"""Servicio HTTP de precios: respuestas iguales al cálculo escalar de la app"""
+import json
+import threading
+import time
+from http.client import HTTPConnection
+
+import pytest
+
+from calculadora.precios import CAMPOS_COSTOS, calcular_precios
+from calculadora.servicio import ServidorPrecios
+
+PRODUCTOS = [
+    {'nombre': 'Tornillo', 'costo_base': 1234.5, 'costos': {CAMPOS_COSTOS[0]: 10.25, CAMPOS_COSTOS[3]: 7.0}},
+    {'costo_base': 990, 'margen': 45, 'metodo_calculo': 'markup'},
+    {'costo_base': 15000, 'costos_adicionales': 2500.75, 'iva': 10},
+    {'costo_base': 0.1, 'margen': 0}
+]
+
+
+@pytest.fixture
+def servidor():
+    servidor = ServidorPrecios(('127.0.0.1', 0), iva=19.0, metodo_calculo='margen', margen_defecto=30.0)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+    hilo.join()
+
+
+def solicitar(servidor, metodo, ruta, cuerpo=None):
+    conexion = HTTPConnection(*servidor.server_address, timeout=10)
+    try:
+        datos = None if cuerpo is None else json.dumps(cuerpo).encode('utf-8')
+        conexion.request(metodo, ruta, datos, {'Content-Type': 'application/json'})
+        respuesta = conexion.getresponse()
+        return respuesta.status, json.loads(respuesta.read())
+    finally:
+        conexion.close()
+
+
+def esperado(producto):
+    """Resultado de calcular_precios con los valores por defecto del servidor de prueba"""
+    costos = dict.fromkeys(CAMPOS_COSTOS, 0.0)
+    costos.update(producto.get('costos', {}))
+    if 'costos_adicionales' in producto:
+        costos['gastos_generales'] = producto['costos_adicionales']
+    resultado = calcular_precios(
+        producto['costo_base'],
+        sum(costos.values()),
+        producto.get('margen', 30.0),
+        producto.get('iva', 19.0),
+        producto.get('metodo_calculo', 'margen')
+    )
+    if 'nombre' in producto:
+        resultado['nombre'] = producto['nombre']
+    return resultado
+
+
+def test_un_producto_igual_al_calculo_escalar(servidor):
+    for producto in PRODUCTOS:
+        estado, datos = solicitar(servidor, 'POST', '/precios', producto)
+        assert estado == 200
+        assert datos == esperado(producto)
+
+
+def test_lote_en_el_mismo_orden(servidor):
+    estado, datos = solicitar(servidor, 'POST', '/precios/lote', {'productos': PRODUCTOS})
+    assert estado == 200
+    assert datos == {'productos': [esperado(producto) for producto in PRODUCTOS]}
+
+
+def test_null_toma_el_valor_por_defecto(servidor):
+    estado, datos = solicitar(servidor, 'POST', '/precios',
+                              {'costo_base': 990, 'margen': None, 'iva': None, 'metodo_calculo': None})
+    assert estado == 200
+    assert datos == esperado({'costo_base': 990})
+
+
+@pytest.mark.parametrize('ruta, cuerpo', [
+    ('/precios', {'margen': 30}),
+    ('/precios', {'costo_base': None}),
+    ('/precios', {'costo_base': 'mil'}),
+    ('/precios', {'costo_base': 100, 'costos': {'desconocido': 1}}),
+    ('/precios', {'costo_base': 100, 'metodo_calculo': 'otro'}),
+    ('/precios/lote', {'productos': [{'costo_base': 100}, {}]}),
+    ('/precios/lote', [1, 2])
+])
+def test_solicitudes_invalidas(servidor, ruta, cuerpo):
+    estado, datos = solicitar(servidor, 'POST', ruta, cuerpo)
+    assert estado == 400
+    assert datos['error']
+
+
+def test_content_length_negativo(servidor):
+    conexion = HTTPConnection(*servidor.server_address, timeout=10)
+    try:
+        conexion.putrequest('POST', '/precios')
+        conexion.putheader('Content-Length', '-1')
+        conexion.endheaders()
+        respuesta = conexion.getresponse()
+        assert respuesta.status == 400
+        assert respuesta.getheader('Connection') == 'close'
+    finally:
+        conexion.close()
+
+
+def test_metricas(servidor):
+    for producto in PRODUCTOS:
+        solicitar(servidor, 'POST', '/precios', producto)
+    solicitar(servidor, 'POST', '/precios/lote', {'productos': PRODUCTOS})
+
+    # La latencia se registra después de enviar la respuesta: se espera a que llegue la última
+    limite = time.monotonic() + 10
+    while True:
+        estado, datos = solicitar(servidor, 'GET', '/metricas')
+        if 'POST /precios/lote' in datos['latencias'] or time.monotonic() > limite:
+            break
+        time.sleep(0.01)
+    assert estado == 200
+    assert datos['configuracion'] == {'iva': 19.0, 'metodo_calculo': 'margen', 'margen_defecto': 30.0, 'enteros': False}
+    assert datos['latencias']['POST /precios']['solicitudes'] == len(PRODUCTOS)
+    assert datos['latencias']['POST /precios/lote']['solicitudes'] == 1
+    assert datos['micro_lotes']['productos'] == len(PRODUCTOS)
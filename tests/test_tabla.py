@@ -0,0 +1,32 @@
+"""Tabla paginada: cada página es la ventana de la tabla completa y no arrastra el catálogo"""
+import io
+
+import pandas as pd
+import pytest
+
+from calculadora.catalogo import CatalogoProductos
+from calculadora.formato import crear_tabla_productos
+from calculadora.importacion import importar_csv
+
+
+@pytest.fixture
+def catalogo(csv_importacion):
+    catalogo = CatalogoProductos()
+    importar_csv(io.BytesIO(csv_importacion), catalogo.agregar_lote, 30.0, 19.0, 'margen')
+    return catalogo
+
+
+def test_paginas_igual_a_tabla_completa(catalogo):
+    completa = crear_tabla_productos(catalogo)
+    paginas = [crear_tabla_productos(catalogo, inicio, inicio + 50) for inicio in range(0, len(catalogo), 50)]
+    pd.testing.assert_frame_equal(pd.concat(paginas), completa)
+
+    filas = [5, 0, len(catalogo) - 1, 5]
+    pd.testing.assert_frame_equal(crear_tabla_productos(catalogo, filas=filas), completa.iloc[filas])
+
+
+def test_pagina_sin_los_demas_nombres(catalogo):
+    pagina = catalogo.a_dataframe(100, 150)
+    assert not isinstance(pagina['nombre'].dtype, pd.CategoricalDtype)
+    assert not isinstance(catalogo.seleccionar([3, 1])['nombre'].dtype, pd.CategoricalDtype)
+    assert pagina['nombre'].tolist() == catalogo.a_dataframe()['nombre'].iloc[100:150].tolist()
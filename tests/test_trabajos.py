@@ -0,0 +1,98 @@
+"""Importación en segundo plano: confirmar agrega lo mismo que importar directo, cancelar no agrega nada"""
+import io
+import threading
+import time
+from functools import partial
+
+import pandas as pd
+
+from calculadora.catalogo import CatalogoProductos
+from calculadora.importacion import importar_csv
+from calculadora.perfilado import Perfilador
+from calculadora.trabajos import TrabajoImportacion
+
+
+def importar_directo(datos, catalogo=None):
+    catalogo = catalogo if catalogo is not None else CatalogoProductos()
+    importar_csv(io.BytesIO(datos), catalogo.agregar_lote, 30.0, 19.0, 'margen', 400)
+    return catalogo
+
+
+def funcion_importacion(datos):
+    return partial(importar_csv, io.BytesIO(datos), margen_defecto=30.0, iva=19.0, metodo_calculo='margen',
+                   tamano_bloque=400)
+
+
+def test_confirmar_igual_a_importar(csv_importacion):
+    trabajo = TrabajoImportacion(funcion_importacion(csv_importacion), huella='abc')
+    assert trabajo.esperar(30)
+    assert trabajo.estado == 'lista'
+    assert trabajo.contexto == {'huella': 'abc'}
+    assert trabajo.filas_leidas == 3000
+
+    # El catálogo de destino ya tiene productos: lo importado se agrega al final
+    catalogo = importar_directo(csv_importacion)
+    assert trabajo.confirmar(catalogo) == trabajo.productos
+    esperado = importar_directo(csv_importacion, importar_directo(csv_importacion))
+    pd.testing.assert_frame_equal(catalogo.a_dataframe(), esperado.a_dataframe())
+    assert trabajo.descartadas == 3000 - trabajo.productos
+    # Solo se confirma una vez
+    assert trabajo.confirmar(catalogo) == 0
+    assert len(catalogo) == len(esperado)
+
+
+def test_cancelar_no_agrega_nada(csv_importacion):
+    pausa = threading.Event()
+
+    def funcion(agregar_lote, al_avanzar):
+        def avanzar(filas, productos):
+            al_avanzar(filas, productos)
+            # Se detiene después del primer bloque hasta que el test cancele
+            pausa.wait(30)
+        return importar_csv(io.BytesIO(csv_importacion), agregar_lote, 30.0, 19.0, 'margen', 400, avanzar)
+
+    trabajo = TrabajoImportacion(funcion)
+    while trabajo.filas_leidas == 0:
+        time.sleep(0.01)
+    assert trabajo.en_curso
+    trabajo.cancelar()
+    pausa.set()
+    assert trabajo.esperar(30)
+
+    assert trabajo.estado == 'cancelada'
+    assert trabajo.filas_leidas == 400
+    catalogo = CatalogoProductos()
+    assert trabajo.confirmar(catalogo) == 0
+    assert len(catalogo) == 0
+
+
+def test_error_no_agrega_nada():
+    def funcion(agregar_lote, al_avanzar):
+        raise ValueError('archivo dañado')
+
+    trabajo = TrabajoImportacion(funcion)
+    assert trabajo.esperar(30)
+    assert trabajo.estado == 'error'
+    assert trabajo.error == 'archivo dañado'
+    assert trabajo.confirmar(CatalogoProductos()) == 0
+
+
+def test_perfilado_del_hilo(csv_importacion):
+    sin_perfil = TrabajoImportacion(funcion_importacion(csv_importacion))
+    assert sin_perfil.esperar(30)
+    assert sin_perfil.perfilador is None
+
+    trabajo = TrabajoImportacion(funcion_importacion(csv_importacion), perfilar=True)
+    assert trabajo.esperar(30)
+    fases = trabajo.perfilador.fases
+    # Una llamada por bloque de 400 filas, más la lectura que encuentra el fin del archivo
+    assert {nombre: llamadas for nombre, (_, llamadas) in fases.items()} == {
+        'lectura': 9, 'calculo_precios': 8, 'catalogo': 8
+    }
+
+    # La ejecución que confirma suma esas fases a las suyas
+    perfilador = Perfilador()
+    perfilador.sumar('lectura', 1.0)
+    perfilador.incorporar(trabajo.perfilador)
+    assert perfilador.fases['lectura'] == [1.0 + fases['lectura'][0], 10]
+    assert perfilador.fases['catalogo'] == fases['catalogo']